@@ -0,0 +1,70 @@
+import functools
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import crud
+
+# Awaitable versions of the crud functions, for the async routes.
+#
+# Each one takes whatever `database.get_db_session` yielded. With an
+# AsyncSession the crud function runs through `AsyncSession.run_sync`, so
+# all I/O happens on the event loop through the async driver. With a
+# regular Session it runs on the threadpool, so the event loop is never
+# blocked either way. The crud module stays the single implementation.
+
+
+async def run(db, func, *args, **kwargs):
+    """Awaits any `func(db, *args, **kwargs)` without blocking the event loop."""
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(func, *args, **kwargs)
+    return await run_in_threadpool(func, db, *args, **kwargs)
+
+def _awaitable(func):
+    @functools.wraps(func)
+    async def wrapper(db, *args, **kwargs):
+        return await run(db, func, *args, **kwargs)
+    return wrapper
+
+# Admin
+get_admin_by_username = _awaitable(crud.get_admin_by_username)
+update_admin_password_hash = _awaitable(crud.update_admin_password_hash)
+
+# Sukhi profile
+get_sukhi_profile = _awaitable(crud.get_sukhi_profile)
+update_sukhi_profile = _awaitable(crud.update_sukhi_profile)
+
+# Agents
+create_agent = _awaitable(crud.create_agent)
+get_agent = _awaitable(crud.get_agent)
+get_agents = _awaitable(crud.get_agents)
+get_agents_page = _awaitable(crud.get_agents_page)
+get_agents_validators = _awaitable(crud.get_agents_validators)
+update_agent = _awaitable(crud.update_agent)
+delete_agent = _awaitable(crud.delete_agent)
+get_agent_bundles = _awaitable(crud.get_agent_bundles)
+
+# Prompts
+get_prompt = _awaitable(crud.get_prompt)
+get_prompt_validator = _awaitable(crud.get_prompt_validator)
+get_prompts = _awaitable(crud.get_prompts)
+get_prompts_page = _awaitable(crud.get_prompts_page)
+search_prompts = _awaitable(crud.search_prompts)
+create_prompt = _awaitable(crud.create_prompt)
+update_prompt = _awaitable(crud.update_prompt)
+delete_prompt = _awaitable(crud.delete_prompt)
+get_prompt_revisions = _awaitable(crud.get_prompt_revisions)
+get_prompt_revision = _awaitable(crud.get_prompt_revision)
+rollback_prompt = _awaitable(crud.rollback_prompt)
+
+# Assignments
+assign_prompt_to_agent = _awaitable(crud.assign_prompt_to_agent)
+remove_prompt_from_agent = _awaitable(crud.remove_prompt_from_agent)
+bulk_assign_prompts = _awaitable(crud.bulk_assign_prompts)
+bulk_remove_prompts = _awaitable(crud.bulk_remove_prompts)
+get_unassigned_prompts_for_agent = _awaitable(crud.get_unassigned_prompts_for_agent)
+
+# Change log
+close_session = _awaitable(crud.close_session)
+get_change_head = _awaitable(crud.get_change_head)
+get_changes = _awaitable(crud.get_changes)
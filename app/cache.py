@@ -0,0 +1,181 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+from .config import get_settings, once
+
+
+class TTLCache:
+    """
+    A small thread-safe, size-bounded cache whose entries expire after a TTL.
+    The least recently used entry is evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for `key`, or `default` if missing or expired."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Stores `value` under `key` for `ttl` seconds (defaults to the cache TTL)."""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key: Hashable) -> None:
+        """Drops a single entry, if present."""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drops every entry for which `predicate(key, value)` is true."""
+        with self._lock:
+            stale = [k for k, (_, v) in self._data.items() if predicate(k, v)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Returns size and hit/miss counters for monitoring."""
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+class VersionedValue:
+    """
+    Caches a single value together with the database version it was read at.
+
+    Within `max_staleness` seconds the value is served as-is. After that the
+    caller-supplied version check is run (a single narrow query), and the
+    value is kept only if the version is unchanged. This bounds how long a
+    worker can serve data that another worker has already updated.
+    """
+
+    def __init__(self, max_staleness: float = 5.0):
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self._value: Any = None
+        self._version: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, load_version: Callable[[], Optional[int]]) -> Any:
+        """Returns the cached value, or None if it is missing or out of date."""
+        with self._lock:
+            value, version, checked_at = self._value, self._version, self._checked_at
+        if value is None:
+            self.misses += 1
+            return None
+        if time.monotonic() - checked_at < self.max_staleness:
+            self.hits += 1
+            return value
+
+        self.revalidations += 1
+        if load_version() != version:
+            self.invalidate()
+            self.misses += 1
+            return None
+        with self._lock:
+            if self._version == version:
+                self._checked_at = time.monotonic()
+        self.hits += 1
+        return value
+
+    def set(self, value: Any, version: int) -> None:
+        with self._lock:
+            self._value, self._version = value, version
+            self._checked_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._value, self._version = None, None
+
+    def stats(self) -> dict:
+        return {
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
+
+
+# ==================================
+# Authenticated Admin Cache
+# ==================================
+# Maps a verified JWT to the admin it identifies (a schemas.Admin snapshot,
+# never an ORM instance), so protected routes don't need to decode the
+# token and query the admins table every time.
+@once
+def get_admin_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(maxsize=settings.ADMIN_CACHE_MAX_SIZE, ttl=settings.ADMIN_CACHE_TTL_SECONDS)
+
+def invalidate_admin(username: str) -> int:
+    """Drops every cached token belonging to the given admin."""
+    return get_admin_cache().invalidate_where(lambda _, admin: admin.username == username)
+
+# ==================================
+# Sukhi Profile Cache
+# ==================================
+# The profile is a single, rarely changed row read by every frontend poll.
+@once
+def get_profile_cache() -> VersionedValue:
+    return VersionedValue(max_staleness=get_settings().PROFILE_CACHE_MAX_STALENESS_SECONDS)
+
+# ==================================
+# Agent Bundle Cache
+# ==================================
+# Maps an agent ID to its stored bundle: (version, document, document_gzip).
+# Dropped in every worker after a commit that changes the bundle (see
+# app/invalidation.py); the TTL only bounds staleness if a message is lost.
+@once
+def get_bundle_cache() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(maxsize=settings.BUNDLE_CACHE_MAX_SIZE, ttl=settings.BUNDLE_CACHE_TTL_SECONDS)
+
+# ==================================
+# Recent Writers
+# ==================================
+# Admins who committed a write in the last READ_YOUR_WRITES_SECONDS, filled
+# in every worker by app/invalidation.py. A key of None stands for every
+# admin, when a broadcast was collapsed or lost.
+@once
+def get_recent_writers() -> TTLCache:
+    settings = get_settings()
+    return TTLCache(maxsize=settings.ADMIN_CACHE_MAX_SIZE, ttl=settings.READ_YOUR_WRITES_SECONDS)
+
+def is_recent_writer(username: str) -> bool:
+    writers = get_recent_writers()
+    return writers.get(username) is not None or writers.get(None) is not None
@@ -0,0 +1,69 @@
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable
+
+from .config import get_settings, once
+
+# Wake-ups for change feed clients (see routers/changes.py). Waiting
+# clients never hold a database connection: commits in this worker wake
+# them immediately, and commits in other workers are noticed by re-reading
+# the log's head at most once per poll interval, shared by every waiter.
+
+
+class ChangeFeed:
+    """Tracks the newest change-log seq known to this worker."""
+
+    def __init__(self, poll_interval: float = 0.5):
+        self.poll_interval = poll_interval
+        self._head = 0
+        self._checked_at = 0.0
+        self._waiters: set = set()
+        self._lock = threading.Lock()
+
+    def committed(self, seq: int) -> None:
+        """Called after a commit that wrote the log up to `seq`; wakes every waiter."""
+        with self._lock:
+            self._head = max(self._head, seq)
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            loop.call_soon_threadsafe(event.set)
+
+    async def head(self, load_head: Callable[[], Awaitable[int]]) -> int:
+        """The newest seq, re-read with `load_head` once the poll interval has passed."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.poll_interval:
+            self._checked_at = now
+            seq = await load_head()
+            with self._lock:
+                self._head = max(self._head, seq)
+        return self._head
+
+    async def wait(self, load_head: Callable[[], Awaitable[int]], since: int, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for changes after `since`; True if there are any."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waiter = (loop, asyncio.Event())
+        with self._lock:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                # Cleared before checking, so a commit in between isn't missed
+                waiter[1].clear()
+                if await self.head(load_head) > since:
+                    return True
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return False
+                try:
+                    await asyncio.wait_for(waiter[1].wait(), min(remaining, self.poll_interval))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._lock:
+                self._waiters.discard(waiter)
+
+
+@once
+def get_change_feed() -> ChangeFeed:
+    return ChangeFeed(poll_interval=get_settings().CHANGE_FEED_POLL_SECONDS)
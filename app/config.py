@@ -1,27 +1,127 @@
+import functools
+import threading
+from functools import lru_cache
+from typing import Callable, TypeVar
 from pydantic_settings import BaseSettings, SettingsConfigDict
 import os
-from dotenv import load_dotenv
 
-# # Get the directory of the current file (config.py)
-# # This will be sukhi_admin_backend/app/
-# current_dir = os.path.dirname(os.path.abspath(__file__))
+T = TypeVar("T")
 
-# # Go one level up to get to the project root (sukhi_admin_backend/)
-# # This is where the .env file is located.
-# env_path = os.path.join(current_dir, "..", ".env")
-load_dotenv()
+# The .env file at the project root (one level above app/). Settings reads it
+# directly, so it is parsed once and os.environ is left untouched.
+ENV_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".env")
 
 
 class Settings(BaseSettings):
     DATABASE_URL: str
     SECRET_KEY: str
+
+    # Serve requests through an AsyncSession (asyncpg / aiosqlite) instead of
+    # running sync sessions on the threadpool. ASYNC_DATABASE_URL defaults to
+    # DATABASE_URL with the matching async driver.
+    ASYNC_DATABASE: bool = False
+    ASYNC_DATABASE_URL: str = ""
+
+    # Connection pool (per worker process; see app/database.py)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    # pool_pre_ping costs a round trip on every checkout; by default only
+    # connections idle for longer than DB_POOL_PING_IDLE_SECONDS are pinged.
+    DB_POOL_PRE_PING: bool = False
+    DB_POOL_PING_IDLE_SECONDS: float = 60.0
+    # Connections the database accepts from this deployment in total; caps
+    # the gunicorn worker count (see gunicorn.conf.py)
+    DB_MAX_CONNECTIONS: int = 100
+    # Threads per worker for sync database work (0 = DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    THREADPOOL_SIZE: int = 0
     
+    # Read replicas, comma-separated (see app/database.py). Read-only
+    # requests read from them round-robin; async URLs are derived from these
+    # like ASYNC_DATABASE_URL.
+    DATABASE_REPLICA_URLS: str = ""
+    REPLICA_HEALTH_CHECK_SECONDS: float = 5.0
+    # After committing a write, an admin's reads go to the primary this long
+    READ_YOUR_WRITES_SECONDS: int = 5
+
     # New S3 settings
     AWS_ACCESS_KEY_ID: str = ""
     AWS_SECRET_ACCESS_KEY: str = ""
     S3_BUCKET_NAME: str = ""
 
-    model_config = SettingsConfigDict(env_file="../.env")
+    # Authenticated admin cache (see app/cache.py)
+    ADMIN_CACHE_TTL_SECONDS: int = 60
+    ADMIN_CACHE_MAX_SIZE: int = 1024
+    # How long a worker serves its cached Sukhi profile before re-checking the version
+    PROFILE_CACHE_MAX_STALENESS_SECONDS: float = 5.0
+
+    # Password hashing (see app/security.py)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_LIMIT: int = 16
+
+    # Prometheus-format /metrics endpoint (unauthenticated, for scrapers)
+    METRICS_ENABLED: bool = True
+
+    # Prompt bodies at least this many bytes are stored zlib-compressed
+    # (0 disables). Compressed bodies are not covered by content search; on
+    # Postgres, TOAST already compresses large values and keeps them searchable.
+    PROMPT_BODY_COMPRESSION_MIN_BYTES: int = 0
+
+    # Every Nth prompt revision is stored in full; the rest are deltas, so
+    # rebuilding any revision reads at most this many rows.
+    PROMPT_REVISION_SNAPSHOT_INTERVAL: int = 20
+
+    # Agent bundles (see crud.get_agent_bundles): documents of at least this
+    # many bytes are also stored gzipped, for clients sending Accept-Encoding: gzip
+    BUNDLE_GZIP_MIN_BYTES: int = 1024
+    # Per-worker bundle cache; writes in another worker are seen within the TTL
+    BUNDLE_CACHE_TTL_SECONDS: float = 5.0
+    BUNDLE_CACHE_MAX_SIZE: int = 4096
+
+    # Cross-worker cache invalidation (see app/invalidation.py): "postgres"
+    # (LISTEN/NOTIFY) or "local" (in-process only); empty picks postgres
+    # when DATABASE_URL is Postgres
+    INVALIDATION_BUS: str = ""
+    INVALIDATION_CHANNEL: str = "cache_invalidation"
+
+    # Change feed (see app/changes.py): how often waiting clients re-check
+    # for commits made by other workers, and the longest long-poll allowed
+    CHANGE_FEED_POLL_SECONDS: float = 0.5
+    CHANGE_FEED_MAX_WAIT_SECONDS: float = 30.0
+
+    # NDJSON catalog import (see app/importer.py)
+    IMPORT_BATCH_SIZE: int = 500
+
+    model_config = SettingsConfigDict(env_file=ENV_FILE, extra="ignore")
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Reads the settings (environment and .env) on first call and returns the
+    same instance after that. Nothing is read at import; tests can call
+    get_settings.cache_clear() after changing the environment.
+    """
+    return Settings()
+
+def once(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Turns a no-argument factory into an accessor that builds its value on
+    the first call (once, even if several threads race to it) and returns
+    the same value after that. Process-wide state that depends on the
+    settings is built this way, so importing the app never reads them.
+    """
+    lock = threading.Lock()
+    built = []
+
+    @functools.wraps(factory)
+    def accessor() -> T:
+        if not built:
+            with lock:
+                if not built:
+                    built.append(factory())
+        return built[0]
 
-settings = Settings()
+    return accessor
 
@@ -1,5 +1,12 @@
-from sqlalchemy.orm import Session
-from . import models, schemas, security
+import gzip
+from collections import Counter, defaultdict
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, delete, event, exists, func, insert, literal, select, union, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, defer, joinedload, selectinload
+from . import cache, database, invalidation, models, pagination, prompt_bodies, revisions, schemas, search, security, serialization
+from .config import get_settings
 
 # ==================================
 # Admin CRUD Functions (No changes)
@@ -14,6 +21,15 @@ def create_admin(db: Session, admin: schemas.AdminCreate):
     hashed_password = security.get_password_hash(admin.password)
     db_admin = models.Admin(username=admin.username, hashed_password=hashed_password)
     db.add(db_admin)
+    invalidation.queue(db, "admin", admin.username)
+    db.commit()
+    db.refresh(db_admin)
+    return db_admin
+
+def update_admin_password_hash(db: Session, db_admin: models.Admin, hashed_password: str):
+    """Replaces an admin's stored password hash (e.g. after a rounds change)."""
+    db_admin.hashed_password = hashed_password
+    invalidation.queue(db, "admin", db_admin.username)
     db.commit()
     db.refresh(db_admin)
     return db_admin
@@ -21,62 +37,196 @@ def create_admin(db: Session, admin: schemas.AdminCreate):
 # ==================================
 # Sukhi Profile CRUD Functions (New)
 # ==================================
+def _profile_snapshot(profile: models.SukhiProfile) -> models.SukhiProfile:
+    """Copies the profile into a session-free instance that is safe to cache."""
+    columns = models.SukhiProfile.__table__.columns
+    return models.SukhiProfile(**{column.key: getattr(profile, column.key) for column in columns})
+
 def get_sukhi_profile(db: Session):
-    profile = db.query(models.SukhiProfile).filter(models.SukhiProfile.id == 1).first()
-    if not profile:
-        profile = models.SukhiProfile(id=1, name="Sukhi")
-        db.add(profile)
-        db.commit()
-        db.refresh(profile)
+    """
+    Returns the profile (seeded by migrations.upgrade), or None if missing.
+    Served from the in-process cache, which re-checks the row's version
+    once PROFILE_CACHE_MAX_STALENESS_SECONDS have passed.
+    """
+    profile = cache.get_profile_cache().get(lambda: get_sukhi_profile_version(db))
+    if profile is None:
+        db_profile = db.query(models.SukhiProfile).filter(models.SukhiProfile.id == 1).first()
+        if db_profile is None:
+            return None
+        profile = _profile_snapshot(db_profile)
+        cache.get_profile_cache().set(profile, profile.version)
     return profile
 
+def get_sukhi_profile_version(db: Session):
+    """Fetches only the profile's version counter (None if it doesn't exist yet)."""
+    return db.query(models.SukhiProfile.version).filter(models.SukhiProfile.id == 1).scalar()
+
 def update_sukhi_profile(db: Session, profile_update: schemas.SukhiProfileUpdate):
-    profile = get_sukhi_profile(db)
-    update_data = profile_update.model_dump(exclude_unset=True)
-    for key, value in update_data.items():
-        setattr(profile, key, value)
+    """
+    Updates the profile with a single UPDATE ... RETURNING (inserting it if
+    it was never seeded) and writes the new row through to the cache.
+    """
+    profiles = models.SukhiProfile.__table__
+    values = profile_update.model_dump(exclude_unset=True)
+    # Incremented in SQL so concurrent writers in other workers can't reuse a version
+    row = db.execute(
+        update(profiles).where(profiles.c.id == 1)
+        .values(**values, version=profiles.c.version + 1)
+        .returning(*profiles.c)
+    ).first()
+    if row is None:
+        row = db.execute(
+            insert(profiles).values(**{"id": 1, "name": "Sukhi", **values, "version": 1}).returning(*profiles.c)
+        ).one()
+    _log_changes(db, [("sukhi_profile", "updated", str(row.id))])
+    invalidation.queue(db, "profile")
     db.commit()
-    db.refresh(profile)
-    return profile
+    # Other workers drop their copy; this one gets the new row straight away
+    snapshot = models.SukhiProfile(**row._mapping)
+    cache.get_profile_cache().set(snapshot, snapshot.version)
+    return snapshot
 
 # ==================================
 # Agent CRUD Functions (Replaces Sukhi functions)
 # ==================================
 
+def _agent_result(row, prompts: list) -> schemas.Agent:
+    return schemas.Agent.model_validate({**row._mapping, "prompts": prompts}, from_attributes=True)
+
+def _agent_prompts(db: Session, agent_id: str) -> list:
+    assoc = models.agent_prompt_association
+    return (
+        db.query(models.Prompt)
+        .join(assoc, assoc.c.prompt_id == models.Prompt.id)
+        .filter(assoc.c.agent_id == agent_id)
+        .all()
+    )
+
 def create_agent(db: Session, agent: schemas.AgentCreate):
-    """Creates a new AI Agent with a custom string ID."""
-    db_agent = models.Agent(**agent.model_dump())
-    db.add(db_agent)
-    db.commit()
-    db.refresh(db_agent)
-    return db_agent
+    """
+    Creates a new AI Agent with a custom string ID, in a single
+    INSERT ... RETURNING. Returns None if the ID is already taken.
+    """
+    agents = models.Agent.__table__
+    try:
+        row = db.execute(insert(agents).values(**agent.model_dump()).returning(*agents.c)).one()
+        _touch_bundles(db, agent_ids=[agent.id]) # A re-created agent continues its old bundle's versions
+        _log_changes(db, [("agent", "created", agent.id)])
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return None
+    return _agent_result(row, [])
 
 def get_agent(db: Session, agent_id: str):
-    """Fetches a single agent by its custom string ID."""
-    return db.query(models.Agent).filter(models.Agent.id == agent_id).first()
+    """
+    Fetches a single agent by its custom string ID.
+    Its prompts are joined into the same query, since one row is cheap to widen.
+    """
+    return (
+        db.query(models.Agent)
+        .options(joinedload(models.Agent.prompts))
+        .filter(models.Agent.id == agent_id)
+        .first()
+    )
 
 def get_agents(db: Session, skip: int = 0, limit: int = 100):
-    """Fetches a list of all agents with pagination."""
-    return db.query(models.Agent).offset(skip).limit(limit).all()
+    """
+    Fetches a list of all agents with pagination.
+    Prompts for the whole page are loaded with a single extra IN query
+    rather than one lazy query per agent.
+    """
+    return (
+        db.query(models.Agent)
+        .options(selectinload(models.Agent.prompts))
+        .order_by(models.Agent.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+def get_agents_page(db: Session, after_id: Optional[str] = None, limit: int = 100):
+    """
+    Fetches a page of agents ordered by ID, starting after `after_id`.
+    Returns the agents and the cursor for the next page.
+    """
+    query = db.query(models.Agent).options(selectinload(models.Agent.prompts))
+    return pagination.keyset_page(query, models.Agent.id, after_id, limit)
+
+def get_agents_validators(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    after_id: Optional[str] = None,
+    keyset: bool = False,
+):
+    """
+    Fetches just enough to build the ETag for a page of agents: each agent's
+    ID and version plus the IDs, creation times and versions of its prompts.
+    Selects the same page as get_agents / get_agents_page and returns
+    (entries, next_cursor).
+    """
+    page_query = db.query(models.Agent.id, models.Agent.version)
+    if keyset:
+        rows, next_cursor = pagination.keyset_page(page_query, models.Agent.id, after_id, limit)
+    else:
+        rows = page_query.order_by(models.Agent.id).offset(skip).limit(limit).all()
+        next_cursor = None
+
+    prompts_by_agent = defaultdict(list)
+    if rows:
+        assoc = models.agent_prompt_association
+        prompt_rows = (
+            db.query(assoc.c.agent_id, models.Prompt.id, models.Prompt.created_at, models.Prompt.version)
+            .join(models.Prompt, models.Prompt.id == assoc.c.prompt_id)
+            .filter(assoc.c.agent_id.in_([row.id for row in rows]))
+        )
+        for agent_id, prompt_id, created_at, version in prompt_rows:
+            prompts_by_agent[agent_id].append((prompt_id, created_at, version))
+    return [(row.id, row.version, prompts_by_agent[row.id]) for row in rows], next_cursor
 
 def update_agent(db: Session, agent_id: str, agent_update: schemas.AgentUpdate):
-    """Updates an existing agent's details."""
-    db_agent = get_agent(db, agent_id)
-    if db_agent:
-        update_data = agent_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_agent, key, value)
-        db.commit()
-        db.refresh(db_agent)
-    return db_agent
+    """
+    Updates an agent's details with a single UPDATE ... RETURNING, then
+    loads its prompts for the response. Returns None if it doesn't exist.
+    """
+    agents = models.Agent.__table__
+    row = db.execute(
+        update(agents).where(agents.c.id == agent_id)
+        .values(**agent_update.model_dump(exclude_unset=True), version=agents.c.version + 1)
+        .returning(*agents.c)
+    ).first()
+    if row is None:
+        return None
+    _touch_bundles(db, agent_ids=[agent_id])
+    _log_changes(db, [("agent", "updated", agent_id)])
+    # Built before the commit expires the loaded prompts
+    result = _agent_result(row, _agent_prompts(db, agent_id))
+    db.commit()
+    return result
 
 def delete_agent(db: Session, agent_id: str):
-    """Deletes an agent."""
-    db_agent = get_agent(db, agent_id)
-    if db_agent:
-        db.delete(db_agent)
-        db.commit()
-    return db_agent
+    """
+    Deletes an agent and its prompt assignments with DELETE ... RETURNING.
+    Returns the deleted agent, or None if it doesn't exist.
+    """
+    assoc = models.agent_prompt_association
+    agents = models.Agent.__table__
+    prompt_ids = db.execute(
+        delete(assoc).where(assoc.c.agent_id == agent_id).returning(assoc.c.prompt_id)
+    ).scalars().all()
+    row = db.execute(delete(agents).where(agents.c.id == agent_id).returning(*agents.c)).first()
+    if row is None:
+        db.rollback()
+        return None
+    _touch_bundles(db, agent_ids=[agent_id])
+    prompts = []
+    if prompt_ids:
+        prompts = db.query(models.Prompt).filter(models.Prompt.id.in_(prompt_ids)).all()
+    _log_changes(db, [("agent", "deleted", agent_id)])
+    result = _agent_result(row, prompts)
+    db.commit()
+    return result
 
 # ==================================
 # Prompt CRUD Functions (No changes)
@@ -86,36 +236,401 @@ def get_prompt(db: Session, prompt_id: str):
     """Fetches a single prompt by its ID."""
     return db.query(models.Prompt).filter(models.Prompt.id == prompt_id).first()
 
+def get_prompt_validator(db: Session, prompt_id: str):
+    """Fetches only a prompt's ID, creation time and version, for building its ETag."""
+    return (
+        db.query(models.Prompt.id, models.Prompt.created_at, models.Prompt.version)
+        .filter(models.Prompt.id == prompt_id)
+        .first()
+    )
+
 def get_prompts(db: Session, skip: int = 0, limit: int = 100):
     """Fetches a list of all prompts with pagination."""
     return db.query(models.Prompt).offset(skip).limit(limit).all()
 
+def get_prompts_page(db: Session, after_id: Optional[str] = None, limit: int = 100):
+    """
+    Fetches a page of prompts ordered by ID, starting after `after_id`.
+    Returns the prompts and the cursor for the next page.
+    """
+    return pagination.keyset_page(db.query(models.Prompt), models.Prompt.id, after_id, limit)
+
+def search_prompts(db: Session, query: str, skip: int = 0, limit: int = 20):
+    """
+    Full-text searches prompt titles and content, best match first.
+    The index is maintained by the database, so creates and updates are
+    searchable as soon as they commit.
+    """
+    return search.search_prompts(db, query, skip=skip, limit=limit)
+
+_PROMPT_RETURNING = (
+    models.Prompt.id, models.Prompt.title, models.Prompt.content_hash,
+    models.Prompt.created_at, models.Prompt.updated_at,
+)
+
+def _prompt_result(row, content: str) -> schemas.Prompt:
+    return schemas.Prompt(
+        id=row.id, title=row.title, content=content,
+        created_at=row.created_at, updated_at=row.updated_at,
+    )
+
 def create_prompt(db: Session, prompt: schemas.PromptCreate):
-    """Creates a new prompt."""
-    db_prompt = models.Prompt(**prompt.model_dump())
-    db.add(db_prompt)
-    db.commit()
-    db.refresh(db_prompt)
-    return db_prompt
-
-def update_prompt(db: Session, prompt_id: int, prompt_update: schemas.PromptUpdate):
-    """Updates an existing prompt."""
-    db_prompt = get_prompt(db, prompt_id)
-    if db_prompt:
-        update_data = prompt_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_prompt, key, value)
-        db.commit()
-        db.refresh(db_prompt)
-    return db_prompt
-
-def delete_prompt(db: Session, prompt_id: int):
-    """Deletes a prompt."""
-    db_prompt = get_prompt(db, prompt_id)
-    if db_prompt:
-        db.delete(db_prompt)
+    """
+    Creates a new prompt with INSERT ... RETURNING, sharing its body with
+    identical prompts. Returns None if the ID is already taken.
+    """
+    try:
+        content_hash, = acquire_prompt_bodies(db, [prompt.content])
+        row = db.execute(
+            insert(models.Prompt.__table__)
+            .values(id=prompt.id, title=prompt.title, content_hash=content_hash)
+            .returning(*_PROMPT_RETURNING)
+        ).one()
+        _record_revisions(db, [(prompt.id, None, (prompt.title, prompt.content))])
+        _log_changes(db, [("prompt", "created", prompt.id)])
         db.commit()
-    return db_prompt
+    except IntegrityError:
+        db.rollback()
+        return None
+    return _prompt_result(row, prompt.content)
+
+def update_prompt(db: Session, prompt_id: str, prompt_update: schemas.PromptUpdate):
+    """
+    Updates a prompt with UPDATE ... RETURNING and records a revision if
+    anything changed. Returns None if the prompt doesn't exist.
+    """
+    # The previous state is needed for the revision delta and the old body's
+    # reference; locking the row gives concurrent edits consecutive revisions.
+    current = db.execute(
+        select(*_PROMPT_RETURNING, models.PromptBody.text, models.PromptBody.compressed)
+        .outerjoin(models.PromptBody, models.PromptBody.hash == models.Prompt.content_hash)
+        .where(models.Prompt.id == prompt_id)
+        .with_for_update(of=models.Prompt)
+    ).first()
+    if current is None:
+        return None
+    old = (current.title, prompt_bodies.decode_body(current.text, current.compressed))
+
+    update_data = prompt_update.model_dump(exclude_unset=True)
+    content = update_data.pop("content", None)
+    values = {key: value for key, value in update_data.items() if getattr(current, key) != value}
+    if content is not None and prompt_bodies.body_hash(content) != current.content_hash:
+        values["content_hash"], = acquire_prompt_bodies(db, [content])
+    if not values:
+        return _prompt_result(current, old[1])
+
+    prompts = models.Prompt.__table__
+    row = db.execute(
+        update(prompts)
+        .where(prompts.c.id == prompt_id)
+        .values(**values, version=prompts.c.version + 1)
+        .returning(*_PROMPT_RETURNING)
+    ).one()
+    if "content_hash" in values:
+        release_prompt_bodies(db, [current.content_hash])
+    _touch_bundles(db, prompt_ids=[prompt_id])
+    new = (row.title, old[1] if content is None else content)
+    if new != old:
+        _record_revisions(db, [(prompt_id, old, new)])
+    _log_changes(db, [("prompt", "updated", prompt_id)])
+    db.commit()
+    return _prompt_result(row, new[1])
+
+def delete_prompt(db: Session, prompt_id: str):
+    """
+    Deletes a prompt with its history and assignments (DELETE ... RETURNING)
+    and drops its body if no other prompt uses it. Returns the deleted
+    prompt, or None if it doesn't exist.
+    """
+    assoc = models.agent_prompt_association
+    revisions_table = models.PromptRevision.__table__
+    prompts = models.Prompt.__table__
+    _touch_bundles(db, prompt_ids=[prompt_id])
+    db.execute(delete(revisions_table).where(revisions_table.c.prompt_id == prompt_id))
+    db.execute(delete(assoc).where(assoc.c.prompt_id == prompt_id))
+    row = db.execute(delete(prompts).where(prompts.c.id == prompt_id).returning(*_PROMPT_RETURNING)).first()
+    if row is None:
+        db.rollback()
+        return None
+    contents = release_prompt_bodies(db, [row.content_hash], with_content=True)
+    _log_changes(db, [("prompt", "deleted", prompt_id)])
+    db.commit()
+    return _prompt_result(row, contents.get(row.content_hash, ""))
+
+# ==================================
+# Prompt Body Storage
+# ==================================
+# Bodies are content-addressed (see models.PromptBody). Both functions
+# only adjust reference counts in SQL; the caller commits.
+
+def acquire_prompt_bodies(db: Session, texts: list) -> list:
+    """
+    Stores each distinct text once and adds a reference per occurrence,
+    with a single INSERT ... ON CONFLICT. Returns the hashes in order.
+    """
+    hashes = [prompt_bodies.body_hash(text) for text in texts]
+    texts_by_hash = dict(zip(hashes, texts))
+    rows = [
+        {"hash": body_hash, "ref_count": count, **prompt_bodies.encode_body(texts_by_hash[body_hash])}
+        for body_hash, count in Counter(hashes).items()
+    ]
+    if not rows:
+        return hashes
+
+    table = models.PromptBody.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["hash"],
+            set_={"ref_count": table.c.ref_count + stmt.excluded.ref_count},
+        ))
+    else:
+        for row in rows:
+            db_body = db.get(models.PromptBody, row["hash"])
+            if db_body is None:
+                db.add(models.PromptBody(**row))
+            else:
+                db_body.ref_count += row["ref_count"]
+        db.flush()
+    return hashes
+
+def release_prompt_bodies(db: Session, hashes: list, with_content: bool = False) -> dict:
+    """
+    Drops a reference per hash and deletes bodies nothing refers to any
+    more. With `with_content`, returns {hash: text} for the released bodies
+    (read by the same UPDATE ... RETURNING).
+    """
+    counts = Counter(body_hash for body_hash in hashes if body_hash)
+    if not counts:
+        return {}
+    table = models.PromptBody.__table__
+    by_count = defaultdict(list)
+    for body_hash, count in counts.items():
+        by_count[count].append(body_hash)
+    contents = {}
+    for count, group in by_count.items():
+        stmt = update(table).where(table.c.hash.in_(group)).values(ref_count=table.c.ref_count - count)
+        if with_content:
+            for row in db.execute(stmt.returning(table.c.hash, table.c.text, table.c.compressed)):
+                contents[row.hash] = prompt_bodies.decode_body(row.text, row.compressed)
+        else:
+            db.execute(stmt)
+    db.execute(delete(table).where(table.c.hash.in_(list(counts)), table.c.ref_count <= 0))
+    return contents
+
+# ==================================
+# Prompt Revision Functions
+# ==================================
+
+def _record_revisions(db: Session, changes: list) -> None:
+    """
+    Appends a revision per (prompt_id, old, new) change, where old and new
+    are (title, content) and old is None for a new prompt. The revision is
+    a delta against `old` unless a snapshot is due. A prompt without any
+    history first gets `old` as its baseline snapshot. The caller commits.
+    """
+    if not changes:
+        return
+    revision_table = models.PromptRevision
+    heads = {}
+    # New prompts have no history to continue
+    existing_ids = [prompt_id for prompt_id, old, _ in changes if old is not None]
+    if existing_ids:
+        latest = (
+            db.query(revision_table.prompt_id, func.max(revision_table.revision).label("revision"))
+            .filter(revision_table.prompt_id.in_(existing_ids))
+            .group_by(revision_table.prompt_id)
+            .subquery()
+        )
+        heads = {
+            row.prompt_id: (row.revision, row.snapshot_revision)
+            for row in db.query(
+                revision_table.prompt_id, revision_table.revision, revision_table.snapshot_revision
+            ).join(latest, and_(
+                revision_table.prompt_id == latest.c.prompt_id,
+                revision_table.revision == latest.c.revision,
+            ))
+        }
+
+    interval = max(1, get_settings().PROMPT_REVISION_SNAPSHOT_INTERVAL)
+    rows = []
+    for prompt_id, old, new in changes:
+        revision, snapshot = heads.get(prompt_id, (0, 0))
+        if revision == 0 and old is not None:
+            revision = snapshot = 1
+            rows.append({
+                "prompt_id": prompt_id, "revision": 1, "snapshot_revision": 1,
+                "title": old[0], "data": revisions.encode_snapshot(old[1]),
+            })
+        revision += 1
+        if old is None or revision - snapshot >= interval:
+            snapshot = revision
+            data = revisions.encode_snapshot(new[1])
+        else:
+            data = revisions.make_delta(old[1], new[1])
+        rows.append({
+            "prompt_id": prompt_id, "revision": revision, "snapshot_revision": snapshot,
+            "title": new[0], "data": data,
+        })
+    db.execute(insert(models.PromptRevision.__table__), rows)
+
+def get_prompt_revisions(db: Session, prompt_id: str, skip: int = 0, limit: int = 100):
+    """Lists a prompt's revisions, newest first, without their stored content."""
+    return (
+        db.query(models.PromptRevision)
+        .options(defer(models.PromptRevision.data))
+        .filter(models.PromptRevision.prompt_id == prompt_id)
+        .order_by(models.PromptRevision.revision.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+def get_prompt_revision(db: Session, prompt_id: str, revision: int):
+    """
+    Rebuilds one revision of a prompt, or returns None if it doesn't exist.
+    A single query reads the revision's delta chain back to its snapshot,
+    so at most PROMPT_REVISION_SNAPSHOT_INTERVAL rows are decoded.
+    """
+    revision_table = models.PromptRevision
+    chain_start = (
+        db.query(revision_table.snapshot_revision)
+        .filter(revision_table.prompt_id == prompt_id, revision_table.revision == revision)
+        .scalar_subquery()
+    )
+    chain = (
+        db.query(revision_table)
+        .filter(revision_table.prompt_id == prompt_id, revision_table.revision.between(chain_start, revision))
+        .order_by(revision_table.revision)
+        .all()
+    )
+    if not chain:
+        return None
+    content = None
+    for row in chain:
+        if row.is_snapshot:
+            content = revisions.decode_snapshot(row.data)
+        else:
+            content = revisions.apply_delta(content, row.data)
+    return {
+        "prompt_id": prompt_id,
+        "revision": revision,
+        "title": chain[-1].title,
+        "content": content,
+        "created_at": chain[-1].created_at,
+    }
+
+def rollback_prompt(db: Session, prompt_id: str, revision: int):
+    """
+    Restores a prompt's title and content from an earlier revision. The
+    rollback itself is recorded as a new revision. Returns None if the
+    revision doesn't exist.
+    """
+    target = get_prompt_revision(db, prompt_id, revision)
+    if target is None:
+        return None
+    return update_prompt(
+        db, prompt_id, schemas.PromptUpdate(title=target["title"], content=target["content"])
+    )
+
+# ==================================
+# Bulk Upsert Functions (Catalog Import)
+# ==================================
+
+def _upsert_rows(db: Session, model, rows: list, existing: set, touch_updated_at: bool = False) -> None:
+    """
+    Inserts or replaces a batch of rows keyed by `id` with a single
+    INSERT ... ON CONFLICT DO UPDATE. `existing` holds the IDs the caller
+    found (and locked) beforehand; a row inserted by someone else since
+    then is replaced rather than failing the batch. The caller commits.
+    """
+    # A statement may only touch each row once, so the last duplicate wins
+    rows = list({row["id"]: row for row in rows}.values())
+
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(table).values(rows)
+        update_columns = {key: stmt.excluded[key] for key in rows[0] if key != "id"}
+        if touch_updated_at:
+            update_columns["updated_at"] = func.now()
+        if "version" in table.c:
+            update_columns["version"] = table.c.version + 1
+        db.execute(stmt.on_conflict_do_update(index_elements=["id"], set_=update_columns))
+    else:
+        for row in rows:
+            if row["id"] not in existing:
+                db.add(model(**row))
+                continue
+            db_obj = db.get(model, row["id"])
+            for key, value in row.items():
+                setattr(db_obj, key, value)
+            if hasattr(db_obj, "version"):
+                db_obj.version += 1
+        db.flush()
+
+def _log_upserts(db: Session, entity: str, ids: list, existing: set) -> tuple:
+    """Logs each upserted row as created or updated; returns (inserted, updated)."""
+    ids = _unique(ids)
+    _log_changes(db, [(entity, "updated" if id_ in existing else "created", id_) for id_ in ids])
+    updated = len(existing)
+    return len(ids) - updated, updated
+
+def upsert_prompts(db: Session, prompts: list):
+    """
+    Creates or replaces a batch of prompts (schemas.PromptCreate). Bodies
+    are shared with identical prompts; replaced bodies lose a reference.
+    """
+    prompts = list({prompt.id: prompt for prompt in prompts}.values())
+    ids = [prompt.id for prompt in prompts]
+    # Locked, so the bodies released and revisions recorded below match
+    # what the upsert replaces
+    existing = {
+        db_prompt.id: (db_prompt.content_hash, db_prompt.title, db_prompt.content)
+        for db_prompt in (
+            db.query(models.Prompt).filter(models.Prompt.id.in_(ids)).with_for_update(of=models.Prompt)
+        )
+    }
+    hashes = acquire_prompt_bodies(db, [prompt.content for prompt in prompts])
+    rows = [
+        {"id": prompt.id, "title": prompt.title, "content_hash": content_hash}
+        for prompt, content_hash in zip(prompts, hashes)
+    ]
+    _upsert_rows(db, models.Prompt, rows, set(existing), touch_updated_at=True)
+    release_prompt_bodies(db, [content_hash for content_hash, _, _ in existing.values()])
+
+    revised = []
+    for prompt in prompts:
+        old = existing[prompt.id][1:] if prompt.id in existing else None
+        new = (prompt.title, prompt.content)
+        if old != new:
+            revised.append((prompt.id, old, new))
+    _record_revisions(db, revised)
+    if existing:
+        _touch_bundles(db, prompt_ids=list(existing))
+    counts = _log_upserts(db, "prompt", ids, set(existing))
+    db.commit()
+    return counts
+
+def upsert_agents(db: Session, agents: list):
+    """Creates or replaces a batch of agents (schemas.AgentCreate). Prompt assignments are kept."""
+    rows = [agent.model_dump() for agent in agents]
+    ids = [row["id"] for row in rows]
+    existing = {row.id for row in db.query(models.Agent.id).filter(models.Agent.id.in_(ids)).with_for_update()}
+    _upsert_rows(db, models.Agent, rows, existing, touch_updated_at=True)
+    _touch_bundles(db, agent_ids=ids)
+    counts = _log_upserts(db, "agent", ids, existing)
+    db.commit()
+    return counts
 
 # ==================================
 # Prompt Assignment Functions (Updated for Agents)
@@ -128,32 +643,428 @@ def assign_prompt_to_agent(db: Session, agent_id: str, prompt_id: str):
     
     if agent and prompt_to_assign and prompt_to_assign not in agent.prompts:
         agent.prompts.append(prompt_to_assign)
+        _touch_bundles(db, agent_ids=[agent_id])
+        _log_changes(db, [("assignment", "assigned", agent_id, prompt_id)])
         db.commit()
         db.refresh(agent)
     return agent
 
-def remove_prompt_from_agent(db: Session, agent_id: str, prompt_id: int):
+def remove_prompt_from_agent(db: Session, agent_id: str, prompt_id: str):
     """Removes a prompt assignment from a specific agent."""
     agent = get_agent(db, agent_id)
     prompt_to_remove = get_prompt(db, prompt_id)
 
     if agent and prompt_to_remove and prompt_to_remove in agent.prompts:
         agent.prompts.remove(prompt_to_remove)
+        _touch_bundles(db, agent_ids=[agent_id])
+        _log_changes(db, [("assignment", "removed", agent_id, prompt_id)])
         db.commit()
         db.refresh(agent)
     return agent
 
-def get_unassigned_prompts_for_agent(db: Session, agent_id: str):
+def _unique(ids):
+    """De-duplicates IDs while keeping the caller's order."""
+    return list(dict.fromkeys(ids))
+
+def _insert_ignoring_conflicts(db: Session, table):
+    """Builds an INSERT that skips rows already present, where the dialect supports it."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing()
+    return table.insert()
+
+def _resolve_bulk_assignment(db: Session, agent_ids, prompt_ids):
     """
-    Gets all prompts that are not currently assigned to the specified agent.
+    Looks up which agents, prompts and assignments exist, using one
+    set-based query each instead of a lookup per pair.
     """
-    agent = get_agent(db, agent_id)
-    if not agent:
+    assoc = models.agent_prompt_association
+    found_agents = {
+        row.id for row in db.query(models.Agent.id).filter(models.Agent.id.in_(agent_ids))
+    }
+    found_prompts = {
+        row.id for row in db.query(models.Prompt.id).filter(models.Prompt.id.in_(prompt_ids))
+    }
+    existing_pairs = set()
+    if found_agents and found_prompts:
+        existing_pairs = set(
+            db.query(assoc.c.agent_id, assoc.c.prompt_id)
+            .filter(assoc.c.agent_id.in_(found_agents), assoc.c.prompt_id.in_(found_prompts))
+            .all()
+        )
+    return found_agents, found_prompts, existing_pairs
+
+def bulk_assign_prompts(db: Session, agent_ids, prompt_ids):
+    """
+    Assigns every prompt to every agent in a single transaction.
+    Missing rows are written with one multi-row INSERT; returns an outcome per pair.
+    """
+    agent_ids, prompt_ids = _unique(agent_ids), _unique(prompt_ids)
+    found_agents, found_prompts, existing_pairs = _resolve_bulk_assignment(db, agent_ids, prompt_ids)
+
+    results, new_rows = [], []
+    for agent_id in agent_ids:
+        for prompt_id in prompt_ids:
+            if agent_id not in found_agents:
+                status = "agent_not_found"
+            elif prompt_id not in found_prompts:
+                status = "prompt_not_found"
+            elif (agent_id, prompt_id) in existing_pairs:
+                status = "already_assigned"
+            else:
+                status = "assigned"
+                new_rows.append({"agent_id": agent_id, "prompt_id": prompt_id})
+            results.append({"agent_id": agent_id, "prompt_id": prompt_id, "status": status})
+
+    if new_rows:
+        db.execute(_insert_ignoring_conflicts(db, models.agent_prompt_association).values(new_rows))
+        _touch_bundles(db, agent_ids=_unique(row["agent_id"] for row in new_rows))
+        _log_changes(db, [("assignment", "assigned", row["agent_id"], row["prompt_id"]) for row in new_rows])
+    db.commit()
+    return results
+
+def bulk_remove_prompts(db: Session, agent_ids, prompt_ids):
+    """
+    Removes every prompt from every agent with a single DELETE.
+    Returns an outcome per pair.
+    """
+    agent_ids, prompt_ids = _unique(agent_ids), _unique(prompt_ids)
+    found_agents, found_prompts, existing_pairs = _resolve_bulk_assignment(db, agent_ids, prompt_ids)
+
+    results = []
+    for agent_id in agent_ids:
+        for prompt_id in prompt_ids:
+            if agent_id not in found_agents:
+                status = "agent_not_found"
+            elif prompt_id not in found_prompts:
+                status = "prompt_not_found"
+            elif (agent_id, prompt_id) in existing_pairs:
+                status = "removed"
+            else:
+                status = "not_assigned"
+            results.append({"agent_id": agent_id, "prompt_id": prompt_id, "status": status})
+
+    if existing_pairs:
+        assoc = models.agent_prompt_association
+        db.execute(
+            assoc.delete().where(
+                assoc.c.agent_id.in_(found_agents), assoc.c.prompt_id.in_(found_prompts)
+            )
+        )
+        _touch_bundles(db, agent_ids=_unique(agent_id for agent_id, _ in existing_pairs))
+        _log_changes(db, [
+            ("assignment", "removed", outcome["agent_id"], outcome["prompt_id"])
+            for outcome in results if outcome["status"] == "removed"
+        ])
+    db.commit()
+    return results
+
+def get_unassigned_prompts_for_agent(
+    db: Session,
+    agent_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    title: Optional[str] = None,
+    after_id: Optional[str] = None,
+    keyset: bool = False,
+):
+    """
+    Gets the prompts that are not currently assigned to the specified agent.
+
+    The filtering is done in SQL with a NOT EXISTS anti-join against the
+    association table, so only the requested page is ever loaded. `title`
+    narrows the result to prompts whose title contains it (case-insensitive).
+    With `keyset=True` the page starts after `after_id` and the next page's
+    cursor is returned alongside the prompts.
+    """
+    agent_found = db.query(models.Agent.id).filter(models.Agent.id == agent_id).first()
+    if not agent_found:
         return None # Agent not found
-    
-    all_prompts = get_prompts(db, limit=1000) # Assuming a reasonable limit
-    assigned_prompt_ids = {p.id for p in agent.prompts}
-    
-    unassigned_prompts = [p for p in all_prompts if p.id not in assigned_prompt_ids]
-    return unassigned_prompts
 
+    assoc = models.agent_prompt_association
+    is_assigned = exists().where(
+        assoc.c.agent_id == agent_id,
+        assoc.c.prompt_id == models.Prompt.id,
+    )
+    query = db.query(models.Prompt).filter(~is_assigned)
+    if title:
+        query = query.filter(models.Prompt.title.icontains(title, autoescape=True))
+
+    if keyset:
+        return pagination.keyset_page(query, models.Prompt.id, after_id, limit)
+    return query.order_by(models.Prompt.id).offset(skip).limit(limit).all()
+
+# ==================================
+# Agent Bundle Functions
+# ==================================
+# See models.AgentBundle. Writes mark the bundles they affect with
+# _touch_bundles; the marked bundles are re-rendered in the same
+# transaction, just before it commits, so reads only ever fetch stored
+# documents and never write.
+
+_TOUCHED_BUNDLES = "touched_bundles"
+
+def _touch_bundles(db: Session, agent_ids=None, prompt_ids=None) -> None:
+    """
+    Marks the bundles of the given agents, or of every agent the given
+    prompts are assigned to, for rebuilding when `db` commits. Call before
+    the assignments go away.
+    """
+    bundles = models.AgentBundle.__table__
+    assoc = models.agent_prompt_association
+    columns = ["agent_id", "version", "change_count", "built_change_count"]
+    if prompt_ids is None:
+        agent_ids = _unique(agent_ids)
+        if not agent_ids:
+            return
+    dialect = db.get_bind().dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        # Creates missing bundle rows and bumps the rest in one statement,
+        # which also locks them until commit: concurrent writers to the same
+        # agent rebuild its bundle one after the other, each seeing the last
+        if prompt_ids is not None:
+            stmt = insert(bundles).from_select(columns, select(
+                assoc.c.agent_id, literal(0), literal(1), literal(0)
+            ).where(assoc.c.prompt_id.in_(prompt_ids)).distinct())
+        else:
+            stmt = insert(bundles).values([dict(zip(columns, (agent_id, 0, 1, 0))) for agent_id in agent_ids])
+        touched = db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["agent_id"], set_={"change_count": bundles.c.change_count + 1}
+            ).returning(bundles.c.agent_id, bundles.c.version, bundles.c.change_count)
+        ).all()
+    else:
+        if prompt_ids is not None:
+            agent_ids = db.execute(
+                select(assoc.c.agent_id).where(assoc.c.prompt_id.in_(prompt_ids)).distinct()
+            ).scalars().all()
+            if not agent_ids:
+                return
+        known = set(db.execute(select(bundles.c.agent_id).where(bundles.c.agent_id.in_(agent_ids))).scalars())
+        missing = [agent_id for agent_id in agent_ids if agent_id not in known]
+        if missing:
+            db.execute(bundles.insert().values([dict(zip(columns, (agent_id, 0, 0, 0))) for agent_id in missing]))
+        db.execute(
+            update(bundles).where(bundles.c.agent_id.in_(agent_ids))
+            .values(change_count=bundles.c.change_count + 1)
+        )
+        touched = db.execute(
+            select(bundles.c.agent_id, bundles.c.version, bundles.c.change_count)
+            .where(bundles.c.agent_id.in_(agent_ids))
+        ).all()
+    # A later touch in the same transaction replaces the counts
+    db.info.setdefault(_TOUCHED_BUNDLES, {}).update((row.agent_id, row) for row in touched)
+    for row in touched:
+        invalidation.queue(db, "bundle", row.agent_id)
+
+def _encode_bundle(agent: models.Agent, version: int) -> bytes:
+    prompt_encoder, memo = serialization.encoder_for(schemas.Prompt), {}
+    return serialization.dumps({
+        "name": agent.name,
+        "about": agent.about,
+        "photo_url": agent.photo_url,
+        "id": agent.id,
+        "version": version,
+        "prompts": [
+            prompt_encoder.encode(prompt, memo)
+            for prompt in sorted(agent.prompts, key=lambda prompt: prompt.id)
+        ],
+    })
+
+def _rebuild_bundles(db: Session, rows: list) -> None:
+    """
+    Re-renders bundles, given their touched (agent_id, version,
+    change_count) rows, from what the transaction sees, each under the next
+    version. An agent that no longer exists keeps its row with the document
+    cleared. The caller commits.
+    """
+    database.use_primary(db)
+    bundles = models.AgentBundle.__table__
+    agents = {
+        agent.id: agent
+        for agent in db.query(models.Agent)
+        .options(selectinload(models.Agent.prompts))
+        .populate_existing() # Objects loaded earlier may predate this transaction's writes
+        .filter(models.Agent.id.in_([row.agent_id for row in rows]))
+    }
+    built = []
+    for row in rows:
+        agent = agents.get(row.agent_id)
+        version, document, document_gzip = row.version, None, None
+        if agent is not None:
+            version += 1
+            document = _encode_bundle(agent, version)
+            if len(document) >= get_settings().BUNDLE_GZIP_MIN_BYTES:
+                document_gzip = gzip.compress(document)
+        built.append({
+            "bundle_agent_id": row.agent_id, "version": version, "built_change_count": row.change_count,
+            "document": document, "document_gzip": document_gzip,
+        })
+    # One executemany, however many agents share a touched prompt
+    db.execute(
+        update(bundles)
+        .where(bundles.c.agent_id == bindparam("bundle_agent_id"))
+        .values(built_at=func.now()),
+        built,
+    )
+
+@event.listens_for(Session, "before_commit")
+def _rebuild_touched_bundles(session: Session) -> None:
+    touched = session.info.pop(_TOUCHED_BUNDLES, None)
+    if touched:
+        session.flush() # e.g. assignments appended to agent.prompts
+        _rebuild_bundles(session, [touched[agent_id] for agent_id in sorted(touched)])
+
+@event.listens_for(Session, "after_rollback")
+def _forget_touched_bundles(session: Session) -> None:
+    session.info.pop(_TOUCHED_BUNDLES, None)
+
+def get_agent_bundles(db: Session, agent_ids) -> dict:
+    """
+    Returns {agent_id: (version, document, document_gzip)} for the agents
+    that exist: from the cache, or else with a single SELECT. Bundles are
+    built by the writes, so nothing is rendered or written here.
+    """
+    agent_ids = _unique(agent_ids)
+    result = {}
+    for agent_id in agent_ids:
+        bundle = cache.get_bundle_cache().get(agent_id)
+        if bundle is not None:
+            result[agent_id] = bundle
+    uncached = [agent_id for agent_id in agent_ids if agent_id not in result]
+    if not uncached:
+        return result
+
+    bundles = models.AgentBundle.__table__
+    rows = db.execute(
+        select(bundles.c.agent_id, bundles.c.version, bundles.c.document, bundles.c.document_gzip)
+        .where(bundles.c.agent_id.in_(uncached), bundles.c.document.is_not(None))
+    )
+    for row in rows:
+        result[row.agent_id] = (row.version, row.document, row.document_gzip)
+        cache.get_bundle_cache().set(row.agent_id, result[row.agent_id])
+    return result
+
+def build_missing_bundles(db: Session, batch_size: int = 1000) -> int:
+    """
+    Builds the bundles of agents that have none yet, and rebuilds any left
+    stale (including those of deleted agents), one batch per transaction.
+    Returns the number built.
+    """
+    bundles = models.AgentBundle.__table__
+    pending = union(
+        select(models.Agent.id.label("agent_id"))
+        .outerjoin(bundles, bundles.c.agent_id == models.Agent.id)
+        .where(bundles.c.agent_id.is_(None)),
+        select(bundles.c.agent_id).where(bundles.c.built_change_count != bundles.c.change_count),
+    ).limit(batch_size)
+    built = 0
+    while True:
+        agent_ids = db.execute(pending).scalars().all()
+        if not agent_ids:
+            return built
+        _touch_bundles(db, agent_ids=agent_ids)
+        db.commit()
+        built += len(agent_ids)
+
+# ==================================
+# Change Log Functions
+# ==================================
+# Every write logs what it changed via _log_changes, just before its commit.
+
+# On Postgres, seqs are kept in commit order with advisory locks: one key
+# per entity type, under this (arbitrary) namespace. See _log_changes.
+_CHANGE_LOG_LOCK = 0x5C4A
+CHANGE_LOG_ENTITIES = ("agent", "assignment", "prompt", "sukhi_profile")
+
+def _log_changes(db: Session, entries: list) -> None:
+    """
+    Appends (entity, action, entity_id[, related_id]) entries to the change
+    log. On Postgres, writers hold the advisory lock of each entity type
+    they log from here until commit, so writers of different entity types
+    don't wait for each other. Readers wait for those locks first (see
+    _wait_for_logging_writers).
+    """
+    if not entries:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        # In key order, as readers take them, so the two can't deadlock
+        for key in sorted({CHANGE_LOG_ENTITIES.index(entry[0]) for entry in entries}):
+            db.execute(select(func.pg_advisory_xact_lock(_CHANGE_LOG_LOCK, key)))
+    table = models.ChangeLogEntry.__table__
+    seqs = db.execute(
+        insert(table).returning(table.c.seq),
+        [
+            {"entity": entity, "action": action, "entity_id": entity_id, "related_id": related[0] if related else None}
+            for entity, action, entity_id, *related in entries
+        ],
+    ).scalars().all()
+    # Wakes change feed clients in every worker after the commit
+    invalidation.queue(db, "change_feed", max(seqs))
+
+def _wait_for_logging_writers(db: Session) -> None:
+    """
+    On Postgres, takes every entity type's change-log lock in shared mode,
+    until the reading transaction ends. This waits out writers that already
+    have their seqs, and any writer after them gets a larger seq than
+    everything the read sees. So a consumer that has seen seq N never later
+    finds a smaller one.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        database.use_primary(db)
+        db.execute(select(*(
+            func.pg_advisory_xact_lock_shared(_CHANGE_LOG_LOCK, key)
+            for key in range(len(CHANGE_LOG_ENTITIES))
+        )))
+
+def close_session(db: Session) -> None:
+    """
+    Returns the session's connection to the pool ahead of a long wait.
+    Objects it loaded stay readable (detached), and it can be used again.
+    """
+    db.close()
+
+def get_change_head(db: Session) -> int:
+    """The newest seq in the change log (0 if it is empty)."""
+    _wait_for_logging_writers(db)
+    return db.query(func.max(models.ChangeLogEntry.seq)).scalar() or 0
+
+def get_changes(db: Session, since: int, limit: int = 100):
+    """
+    Returns up to `limit` change-log entries after `since`, oldest first, or
+    None if entries after `since` have already been pruned (the caller has
+    to resynchronize from the full lists).
+    """
+    _wait_for_logging_writers(db)
+    entries = (
+        db.query(models.ChangeLogEntry)
+        .filter(models.ChangeLogEntry.seq > since)
+        .order_by(models.ChangeLogEntry.seq)
+        .limit(limit)
+        .all()
+    )
+    if not entries or entries[0].seq != since + 1:
+        oldest = db.query(func.min(models.ChangeLogEntry.seq)).scalar()
+        if oldest is not None and since < oldest - 1:
+            return None
+    return entries
+
+def prune_change_log(db: Session, older_than) -> int:
+    """Deletes entries created before `older_than`, always keeping the newest. Returns the count."""
+    table = models.ChangeLogEntry.__table__
+    deleted = db.execute(
+        delete(table).where(
+            table.c.created_at < older_than,
+            table.c.seq < select(func.max(table.c.seq)).scalar_subquery(),
+        )
+    ).rowcount
+    db.commit()
+    return deleted
@@ -1,17 +1,203 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
-from .config import settings
+import itertools
+import logging
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional, Union
 
-SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+from sqlalchemy import Select, create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
+from sqlalchemy.sql.elements import TextClause
+from starlette.requests import Request
 
-# We will add the pool_pre_ping=True argument here.
-# This instructs the engine to test connections for liveness before using them.
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    pool_pre_ping=True
-)
+from .cache import get_admin_cache, is_recent_writer
+from .config import get_settings
+from .db_pool import TimedAsyncQueuePool, TimedQueuePool, enable_idle_ping
+from .metrics import instrument_engine
+from .security import token_subject
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+logger = logging.getLogger(__name__)
+
+# Engines, pools and the replica set are created on first use, never at
+# import: importing the app reads no settings and builds no pools, so a
+# preloading server (gunicorn) and the scripts only create what they use.
+_create_lock = threading.RLock()
+
+def pool_options(async_engine: bool = False) -> dict:
+    """Pool arguments for create_engine / create_async_engine, from Settings."""
+    settings = get_settings()
+    return {
+        "poolclass": TimedAsyncQueuePool if async_engine else TimedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+def _create_engine(url: str):
+    # Connections are recycled after DB_POOL_RECYCLE seconds, and (unless
+    # DB_POOL_PRE_PING is set) tested for liveness only after sitting idle.
+    settings = get_settings()
+    db_engine = create_engine(url, **pool_options())
+    if not settings.DB_POOL_PRE_PING:
+        enable_idle_ping(db_engine, settings.DB_POOL_PING_IDLE_SECONDS)
+    instrument_engine(db_engine)
+    return db_engine
+
+_engine = None
+
+def get_engine():
+    """Returns the primary engine (DATABASE_URL), creating it on first use."""
+    global _engine
+    if _engine is None:
+        with _create_lock:
+            if _engine is None:
+                _engine = _create_engine(get_settings().DATABASE_URL)
+    return _engine
+
+# ==================================
+# Read Replicas
+# ==================================
+# With DATABASE_REPLICA_URLS set, sessions opened for read-only requests
+# (see open_session) send their SELECTs to a replica. Everything else goes
+# to the primary: writes, SELECT ... FOR UPDATE, and every statement after
+# a session's first write, so crud functions that read back what they
+# wrote stay consistent without knowing about replicas.
+
+_REPLICA_BIND = "replica_bind"
+
+def _is_read(clause) -> bool:
+    """A plain SELECT, as a construct or as raw SQL (such as the search queries)."""
+    if isinstance(clause, Select):
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        statement = clause.text.lstrip().upper()
+        return statement.startswith(("SELECT", "WITH")) and "FOR UPDATE" not in statement
+    return False
+
+class RoutingSession(Session):
+    """
+    A Session that reads from `info["replica_bind"]` until it first writes.
+    Without an explicit bind it uses the primary engine, created on first use.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        replica = self.info.get(_REPLICA_BIND)
+        if replica is not None:
+            if not self._flushing and _is_read(clause):
+                return replica
+            if clause is not None or self._flushing:
+                # Stays on the primary from its first write on
+                del self.info[_REPLICA_BIND]
+        if self.bind is None:
+            return get_engine()
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+def use_primary(db: "AnySession") -> bool:
+    """
+    Sends the session's remaining statements to the primary, e.g. before
+    reading to write. Returns True if it had been reading from a replica.
+    """
+    return db.info.pop(_REPLICA_BIND, None) is not None
+
+
+class ReplicaSet:
+    """
+    The replicas named in DATABASE_REPLICA_URLS, chosen round-robin among
+    those that passed their last health check (a `SELECT 1` every
+    REPLICA_HEALTH_CHECK_SECONDS, on a background thread). A replica that
+    drops a connection is skipped at once, until it passes a check again.
+    """
+
+    def __init__(self, urls: list):
+        self.urls = urls
+        self.engines = [_create_engine(url) for url in urls]
+        self.async_engines = None
+        self.healthy = [True] * len(urls)
+        self._next = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        for index, replica in enumerate(self.engines):
+            self._watch_disconnects(replica, index)
+
+    def _watch_disconnects(self, replica, index: int) -> None:
+        @event.listens_for(replica, "handle_error")
+        def _mark_down(context):
+            if context.is_disconnect:
+                self.healthy[index] = False
+
+    def choose(self, use_async: bool = False):
+        """The next healthy replica (its sync engine, even in async mode), or None."""
+        candidates = [index for index, up in enumerate(self.healthy) if up]
+        if not candidates:
+            return None
+        index = candidates[next(self._next) % len(candidates)]
+        if use_async:
+            return self._async_engines()[index].sync_engine
+        return self.engines[index]
+
+    def _async_engines(self):
+        if self.async_engines is None:
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            settings = get_settings()
+            self.async_engines = []
+            for index, url in enumerate(self.urls):
+                replica = create_async_engine(_async_url(url), **pool_options(async_engine=True))
+                if not settings.DB_POOL_PRE_PING:
+                    enable_idle_ping(replica.sync_engine, settings.DB_POOL_PING_IDLE_SECONDS)
+                instrument_engine(replica.sync_engine)
+                self._watch_disconnects(replica.sync_engine, index)
+                self.async_engines.append(replica)
+        return self.async_engines
+
+    def check(self) -> None:
+        for index, replica in enumerate(self.engines):
+            try:
+                with replica.connect() as conn:
+                    conn.exec_driver_sql("SELECT 1")
+                self.healthy[index] = True
+            except Exception:
+                if self.healthy[index]:
+                    logger.warning("Read replica %s failed its health check", index, exc_info=True)
+                self.healthy[index] = False
+
+    def start(self) -> None:
+        if self.engines and self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="replica-health", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopping.wait(get_settings().REPLICA_HEALTH_CHECK_SECONDS):
+            self.check()
+
+
+def replica_urls() -> list:
+    return [url.strip() for url in get_settings().DATABASE_REPLICA_URLS.split(",") if url.strip()]
+
+_replicas: Optional[ReplicaSet] = None
+
+def get_replicas() -> ReplicaSet:
+    """Returns the replica set (empty without DATABASE_REPLICA_URLS), creating it on first use."""
+    global _replicas
+    if _replicas is None:
+        with _create_lock:
+            if _replicas is None:
+                _replicas = ReplicaSet(replica_urls())
+    return _replicas
+
+# Unbound: RoutingSession falls back to the primary engine when it first
+# needs a connection
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=RoutingSession)
 
 Base = declarative_base()
 
@@ -23,3 +209,160 @@ def get_db():
     finally:
         db.close()
 
+# ==================================
+# Async Database Support
+# ==================================
+# Async drivers used when ASYNC_DATABASE is on and no ASYNC_DATABASE_URL is given
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+def _async_url(sync_url: str) -> str:
+    """The same database with the matching async driver."""
+    url = make_url(sync_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver known for '{backend}'; set ASYNC_DATABASE_URL.")
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}").render_as_string(hide_password=False)
+
+def get_async_database_url() -> str:
+    """Returns the async URL, deriving it from DATABASE_URL if not set explicitly."""
+    settings = get_settings()
+    return settings.ASYNC_DATABASE_URL or _async_url(settings.DATABASE_URL)
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+def get_async_engine():
+    """Returns the async engine if it has been created, else None."""
+    return _async_engine
+
+def get_async_sessionmaker():
+    """
+    Creates the async engine and session factory on first use, so the async
+    driver is only imported when ASYNC_DATABASE is enabled.
+    """
+    global _async_engine, _AsyncSessionLocal
+    if _AsyncSessionLocal is not None:
+        return _AsyncSessionLocal
+    with _create_lock:
+        if _AsyncSessionLocal is None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+            settings = get_settings()
+            _async_engine = create_async_engine(get_async_database_url(), **pool_options(async_engine=True))
+            if not settings.DB_POOL_PRE_PING:
+                enable_idle_ping(_async_engine.sync_engine, settings.DB_POOL_PING_IDLE_SECONDS)
+            instrument_engine(_async_engine.sync_engine)
+            # Objects stay loaded after commit: they are serialized after the
+            # session's greenlet context has gone, where lazy loads can't run.
+            _AsyncSessionLocal = async_sessionmaker(
+                _async_engine, autoflush=False, expire_on_commit=False, sync_session_class=RoutingSession
+            )
+    return _AsyncSessionLocal
+
+def created_engines() -> list:
+    """(label, sync Engine) for every engine created so far in this process, replicas included."""
+    engines = []
+    if _engine is not None:
+        engines.append(("sync", _engine))
+    if _async_engine is not None:
+        engines.append(("async", _async_engine.sync_engine))
+    if _replicas is not None:
+        engines += [(f"replica{index}", replica) for index, replica in enumerate(_replicas.engines)]
+        for index, replica in enumerate(_replicas.async_engines or ()):
+            engines.append((f"replica{index}-async", replica.sync_engine))
+    return engines
+
+async def dispose_engines():
+    """Closes every pooled connection of the engines created so far."""
+    if _engine is not None:
+        _engine.dispose()
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _replicas is not None:
+        for replica in _replicas.engines:
+            replica.dispose()
+        for replica in _replicas.async_engines or ():
+            await replica.dispose()
+
+def dispose_after_fork():
+    """
+    Resets the pools in a freshly forked worker. The connections inherited
+    from the parent are dropped without being closed, because the parent
+    (or a sibling) still owns their sockets.
+    """
+    for _, db_engine in created_engines():
+        db_engine.dispose(close=False)
+
+async def get_async_db():
+    """Dependency that yields an AsyncSession for each request."""
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+# What get_db_session yields, depending on ASYNC_DATABASE
+AnySession = Union[Session, AsyncSession]
+
+@asynccontextmanager
+async def open_session(read_replica: bool = False):
+    """
+    Opens an AsyncSession when ASYNC_DATABASE is enabled, otherwise a
+    regular Session. For work outside a request's own session, such as a
+    long-lived response that must not hold a connection while it waits.
+    With `read_replica`, its reads go to a replica (if any is configured
+    and healthy) until it writes.
+    """
+    use_async = get_settings().ASYNC_DATABASE
+    replica = get_replicas().choose(use_async=use_async) if read_replica else None
+    if use_async:
+        async with get_async_sessionmaker()() as db:
+            if replica is not None:
+                db.info[_REPLICA_BIND] = replica
+            yield db
+    else:
+        db = SessionLocal()
+        if replica is not None:
+            db.info[_REPLICA_BIND] = replica
+        try:
+            yield db
+        finally:
+            db.close()
+
+# Read-your-writes: a write request's session records the admin making it
+# (see app/dependencies.py), and each of its commits marks that admin as a
+# recent writer in every worker (see app/invalidation.py). Their reads then
+# go to the primary for READ_YOUR_WRITES_SECONDS, whichever worker or client
+# they come from, while the replicas catch up.
+PRINCIPAL = "principal"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def request_principal(request: Request) -> Optional[str]:
+    """The admin named by the request's bearer token, if it is valid."""
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    admin = get_admin_cache().get(token)
+    return admin.username if admin is not None else token_subject(token)
+
+def reads_from_replica(request: Request) -> bool:
+    if request.method not in SAFE_METHODS:
+        return False
+    username = request_principal(request)
+    return username is None or not is_recent_writer(username)
+
+def record_principal(db: "AnySession", request: Request, username: str) -> None:
+    """Marks `username` as a recent writer once `db` commits, for write requests."""
+    if request.method not in SAFE_METHODS and get_replicas().engines:
+        db.info[PRINCIPAL] = username
+
+async def get_db_session(request: Request):
+    """
+    Dependency used by the async routes: yields an AsyncSession when
+    ASYNC_DATABASE is enabled, otherwise a regular Session. Pass the result
+    to the `async_crud` functions, which handle both. Read-only requests
+    read from a replica when one is configured, unless their admin wrote
+    in the last READ_YOUR_WRITES_SECONDS.
+    """
+    async with open_session(read_replica=reads_from_replica(request)) as db:
+        yield db
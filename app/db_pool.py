@@ -0,0 +1,82 @@
+import os
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from .metrics import Histogram
+
+
+class _CheckoutTimingMixin:
+    """Records how long each checkout waited for a connection (including connect time)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_latency = Histogram()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.checkout_latency.observe(time.perf_counter() - start)
+
+    def recreate(self):
+        # Keep the histogram when the pool is rebuilt (e.g. after dispose())
+        pool = super().recreate()
+        pool.checkout_latency = self.checkout_latency
+        return pool
+
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def enable_idle_ping(engine, idle_seconds: float) -> None:
+    """
+    Cheaper alternative to pool_pre_ping: only connections that have sat
+    idle in the pool for longer than `idle_seconds` are pinged on checkout.
+    Busy connections, which are the vast majority under load, skip the extra
+    round trip. A failed ping makes the pool replace the connection.
+    """
+    @event.listens_for(engine, "checkin")
+    def _record_checkin(dbapi_connection, connection_record):
+        connection_record.info["checked_in_at"] = time.monotonic()
+
+    @event.listens_for(engine, "checkout")
+    def _ping_if_idle(dbapi_connection, connection_record, connection_proxy):
+        checked_in_at = connection_record.info.get("checked_in_at")
+        if checked_in_at is None or time.monotonic() - checked_in_at < idle_seconds:
+            return
+        try:
+            cursor = dbapi_connection.cursor()
+            try:
+                cursor.execute("SELECT 1")
+            finally:
+                cursor.close()
+        except Exception:
+            raise exc.DisconnectionError()
+
+
+def pool_status(engine) -> dict:
+    """Reports the current state of an engine's pool for this worker process."""
+    pool = engine.pool
+    status = {"pid": os.getpid(), "pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+            timeout=pool.timeout(),
+            recycle=pool._recycle,
+        )
+    latency = getattr(pool, "checkout_latency", None)
+    if latency is not None:
+        status["checkout_latency_seconds"] = latency.snapshot()
+    return status
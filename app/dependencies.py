@@ -1,24 +1,37 @@
-from fastapi import Depends, HTTPException, status
+import time
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 
-from . import crud, schemas, models
-from .database import get_db
-from .config import settings
+from . import async_crud, schemas
+from .cache import get_admin_cache
+from .database import AnySession, get_db_session, record_principal
+from .config import get_settings
 from .security import ALGORITHM
 
 # This tells FastAPI that the token should be sent in the header as:
 # Authorization: Bearer <your_token>
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_admin(
-    db: Session = Depends(get_db), token: str = Depends(oauth2_scheme)
-) -> models.Admin:
+async def get_current_admin(
+    request: Request, db: AnySession = Depends(get_db_session), token: str = Depends(oauth2_scheme)
+) -> schemas.Admin:
     """
     Decodes the JWT token to get the current user.
     This function will be used as a dependency in protected endpoints.
+    Verified tokens are cached until they expire (bounded by the cache TTL),
+    so repeat requests skip both the decode and the database lookup.
+    The admin is returned (and cached) as a session-free snapshot, which
+    stays readable after the request's session commits or closes.
+    The request's writes are recorded against the admin, for read-your-writes.
     """
+    admin_cache = get_admin_cache()
+    cached_admin = admin_cache.get(token)
+    if cached_admin is not None:
+        record_principal(db, request, cached_admin.username)
+        return cached_admin
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -27,8 +40,9 @@ def get_current_admin(
     
     try:
         # Decode the token
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, get_settings().SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
+        expires_at = payload.get("exp")
         if username is None:
             raise credentials_exception
         token_data = schemas.TokenData(username=username)
@@ -36,8 +50,17 @@ def get_current_admin(
         raise credentials_exception
     
     # Get the admin from the database
-    admin = crud.get_admin_by_username(db, username=token_data.username)
-    if admin is None:
+    db_admin = await async_crud.get_admin_by_username(db, username=token_data.username)
+    if db_admin is None:
         raise credentials_exception
-        
-    return admin
\ No newline at end of file
+    admin = schemas.Admin.model_validate(db_admin)
+
+    # Never cache a token past its own expiry
+    ttl = admin_cache.ttl
+    if expires_at is not None:
+        ttl = min(ttl, expires_at - time.time())
+    if ttl > 0:
+        admin_cache.set(token, admin, ttl=ttl)
+
+    record_principal(db, request, admin.username)
+    return admin
@@ -0,0 +1,56 @@
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+# Conditional GET helpers. ETags are derived from row versions only, so they can be checked with narrow queries before (or instead of)
+# loading and serializing the full response.
+
+
+def make_etag(*parts) -> str:
+    """Builds a strong ETag from any reprs that uniquely describe a response."""
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest() + '"'
+
+def prompt_etag(prompt_id: str, created_at, version: int) -> str:
+    # created_at tells a re-created prompt apart from the deleted one
+    return make_etag("prompt", prompt_id, created_at, version)
+
+def profile_etag(version: int) -> str:
+    return make_etag("sukhi-profile", version)
+
+def bundle_etag(agent_id: str, version: int) -> str:
+    return make_etag("agent-bundle", agent_id, version)
+
+def agents_etag(agents: Iterable) -> str:
+    """
+    Builds the ETag for a list of agents from
+    (agent_id, version, [(prompt_id, created_at, prompt_version), ...])
+    entries, covering the agent rows, their assignments and the nested prompts.
+    """
+    return make_etag("agents", [
+        (agent_id, version, sorted(prompts))
+        for agent_id, version, prompts in agents
+    ])
+
+def agent_entries(agents) -> list:
+    """Converts loaded Agent rows into the entries agents_etag expects."""
+    return [
+        (a.id, a.version, [(p.id, p.created_at, p.version) for p in a.prompts])
+        for a in agents
+    ]
+
+def is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers
+
+def matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match header matches `etag` (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
@@ -0,0 +1,72 @@
+from typing import Iterator
+
+from sqlalchemy import select
+
+from . import models, serialization
+from .database import SessionLocal
+from .prompt_bodies import decode_body
+
+# Rows fetched from the server-side cursor per round trip.
+EXPORT_YIELD_PER = 1000
+
+# (row type, statement) in the order they are written. Agents and prompts
+# come before assignments so the dump can be replayed top to bottom.
+_EXPORTED = (
+    ("prompt", select(
+        models.Prompt.id, models.Prompt.title,
+        models.PromptBody.text, models.PromptBody.compressed, models.Prompt.legacy_content,
+        models.Prompt.created_at, models.Prompt.updated_at,
+    ).outerjoin(models.PromptBody, models.PromptBody.hash == models.Prompt.content_hash)
+     .order_by(models.Prompt.id)),
+    ("agent", select(
+        models.Agent.id, models.Agent.name, models.Agent.about, models.Agent.photo_url,
+    ).order_by(models.Agent.id)),
+    ("assignment", select(
+        models.agent_prompt_association.c.agent_id,
+        models.agent_prompt_association.c.prompt_id,
+    ).order_by(
+        models.agent_prompt_association.c.agent_id,
+        models.agent_prompt_association.c.prompt_id,
+    )),
+)
+
+
+def _record(row_type: str, row) -> dict:
+    if row_type != "prompt":
+        # str(): table column names are a str subclass orjson rejects as keys
+        return {"type": row_type, **{str(key): value for key, value in row._mapping.items()}}
+    # Reassemble the (possibly shared, possibly compressed) body
+    if row.text is None and row.compressed is None:
+        content = row.legacy_content
+    else:
+        content = decode_body(row.text, row.compressed)
+    return {
+        "type": row_type, "id": row.id, "title": row.title, "content": content,
+        "created_at": row.created_at, "updated_at": row.updated_at,
+    }
+
+
+def iter_catalog_ndjson() -> Iterator[bytes]:
+    """
+    Yields the whole catalog (prompts, agents, then assignments) as NDJSON lines.
+
+    Plain column rows are streamed with a server-side cursor, so no ORM
+    objects are built and memory stays flat however large the catalog is.
+    The generator owns its session because it outlives the request handler.
+
+    On Postgres all three SELECTs run in one REPEATABLE READ, read-only
+    transaction, so the dump is a single snapshot: an assignment always
+    refers to an agent and a prompt that are in it, even if they are
+    changed or deleted mid-export.
+    """
+    db = SessionLocal()
+    try:
+        if db.get_bind().dialect.name == "postgresql":
+            # Must be set before the transaction's first statement
+            db.connection(execution_options={"isolation_level": "REPEATABLE READ", "postgresql_readonly": True})
+        for row_type, stmt in _EXPORTED:
+            stmt = stmt.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER)
+            for row in db.execute(stmt):
+                yield serialization.dumps(_record(row_type, row)) + b"\n"
+    finally:
+        db.close()
@@ -0,0 +1,78 @@
+import json
+from typing import Iterable, List, Optional
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+from . import crud, schemas
+
+# Only this many rejected rows are described in the report; the rest are just counted.
+MAX_REPORTED_ERRORS = 100
+
+# Catalog kinds that can be imported, with their row schema and batch writer.
+IMPORTERS = {
+    "prompts": (schemas.PromptCreate, crud.upsert_prompts),
+    "agents": (schemas.AgentCreate, crud.upsert_agents),
+}
+
+
+class NdjsonBatcher:
+    """
+    Validates NDJSON rows one line at a time and groups them into batches,
+    so an import never holds more than `batch_size` rows in memory.
+    """
+
+    def __init__(self, kind: str, batch_size: int):
+        self.schema, self.upsert = IMPORTERS[kind]
+        self.batch_size = batch_size
+        self.report = schemas.ImportReport()
+        self._batch: list = []
+        self._line_no = 0
+
+    def add_line(self, line) -> Optional[List]:
+        """
+        Validates one line. Returns a full batch when one is ready to be
+        written, otherwise None. Blank lines are skipped.
+        """
+        self._line_no += 1
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        if not line.strip():
+            return None
+        try:
+            self._batch.append(self.schema.model_validate(json.loads(line)))
+        except (ValueError, ValidationError) as e:
+            self._reject(str(e))
+            return None
+        if len(self._batch) >= self.batch_size:
+            return self.take_batch()
+        return None
+
+    def take_batch(self) -> List:
+        """Returns and clears the rows collected so far."""
+        batch, self._batch = self._batch, []
+        return batch
+
+    def write(self, db: Session, batch: List) -> None:
+        """Upserts one batch and adds its counts to the report."""
+        if not batch:
+            return
+        inserted, updated = self.upsert(db, batch)
+        self.report.inserted += inserted
+        self.report.updated += updated
+
+    def _reject(self, error: str) -> None:
+        self.report.rejected += 1
+        if len(self.report.errors) < MAX_REPORTED_ERRORS:
+            self.report.errors.append(schemas.ImportRowError(line=self._line_no, error=error))
+
+
+def import_lines(db: Session, kind: str, lines: Iterable, batch_size: int) -> schemas.ImportReport:
+    """Imports NDJSON rows from any iterable of lines (e.g. an open file)."""
+    batcher = NdjsonBatcher(kind, batch_size)
+    for line in lines:
+        batch = batcher.add_line(line)
+        if batch:
+            batcher.write(db, batch)
+    batcher.write(db, batcher.take_batch())
+    return batcher.report
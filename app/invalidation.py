@@ -0,0 +1,266 @@
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+from typing import Iterable, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from . import cache, changes
+from .config import get_settings, once
+from .database import PRINCIPAL, get_engine
+from .metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Cross-worker cache invalidation. Writers queue (cache, key) pairs on
+# their session with `queue`; once the transaction commits, the pairs are
+# applied to this worker's caches immediately and broadcast to every other
+# worker, whose background listener applies them too. A key of None clears
+# the whole cache.
+
+# Upper bounds (seconds) for the publish-to-apply lag histogram
+PROPAGATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+# Postgres rejects NOTIFY payloads of 8000 bytes or more
+MAX_PAYLOAD_BYTES = 7900
+
+_PENDING = "pending_invalidations"
+
+
+def _invalidate_bundle(agent_id: Optional[str]) -> None:
+    if agent_id is None:
+        cache.get_bundle_cache().clear()
+    else:
+        cache.get_bundle_cache().invalidate(agent_id)
+
+def _invalidate_admin(username: Optional[str]) -> None:
+    if username is None:
+        cache.get_admin_cache().clear()
+    else:
+        cache.invalidate_admin(username)
+
+def _wake_change_feed(seq: Optional[int]) -> None:
+    if seq is not None:
+        changes.get_change_feed().committed(seq)
+
+# What each queued key does when it is applied, in any worker
+HANDLERS = {
+    "admin": _invalidate_admin,
+    "profile": lambda _: cache.get_profile_cache().invalidate(),
+    "bundle": _invalidate_bundle,
+    "change_feed": _wake_change_feed,
+    "recent_writer": lambda username: cache.get_recent_writers().set(username, True),
+}
+
+
+def queue(db: Session, name: str, key=None) -> None:
+    """Invalidates `key` of cache `name` in every worker once `db` commits."""
+    db.info.setdefault(_PENDING, set()).add((name, key))
+
+def apply(keys: Iterable) -> None:
+    for name, key in keys:
+        HANDLERS[name](key)
+
+def encode(origin: str, keys: set) -> str:
+    """
+    Serializes a message. Too many keys for one NOTIFY collapse into
+    clearing the caches concerned (keeping the change feed's newest seq).
+    """
+    message = {"origin": origin, "sent_at": time.time(), "keys": sorted(keys, key=repr)}
+    payload = json.dumps(message, separators=(",", ":"))
+    if len(payload.encode()) <= MAX_PAYLOAD_BYTES:
+        return payload
+    seqs = [key for name, key in keys if name == "change_feed" and key is not None]
+    collapsed = {(name, None) for name, _ in keys if name != "change_feed"}
+    if seqs:
+        collapsed.add(("change_feed", max(seqs)))
+    message["keys"] = sorted(collapsed, key=repr)
+    return json.dumps(message, separators=(",", ":"))
+
+
+class InvalidationBus:
+    """
+    Base class for the backends. `publish` runs inside the committing
+    transaction, `committed` right after it; `deliver` applies a message
+    received from another worker and records how long it took to arrive.
+    """
+
+    name = "none"
+
+    def __init__(self):
+        self.received = 0
+        self.reconnects = 0
+        self.lag = Histogram(PROPAGATION_BUCKETS)
+
+    @property
+    def origin(self) -> str:
+        # Per process, not per import: gunicorn forks workers after preloading
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def publish(self, session: Session, keys: set) -> None:
+        pass
+
+    def committed(self, keys: set) -> None:
+        apply(keys)
+
+    def deliver(self, payload: str) -> None:
+        message = json.loads(payload)
+        if message["origin"] == self.origin:
+            return # Already applied by `committed`
+        apply(tuple(key) for key in message["keys"])
+        self.received += 1
+        # Wall clocks: only meaningful between hosts whose clocks are synced
+        self.lag.observe(max(0.0, time.time() - message["sent_at"]))
+
+    def start(self) -> None:
+        pass
+
+    def stop(self) -> None:
+        pass
+
+    def listening(self) -> bool:
+        return True
+
+
+class LocalBus(InvalidationBus):
+    """
+    In-process backend, for a single worker and for tests: every LocalBus
+    instance in the process plays one worker, and commits are delivered to
+    all the others.
+    """
+
+    name = "local"
+    _instances: list = []
+
+    def __init__(self, origin: Optional[str] = None):
+        super().__init__()
+        self._origin = origin
+        LocalBus._instances.append(self)
+
+    @property
+    def origin(self) -> str:
+        return self._origin or super().origin
+
+    def committed(self, keys: set) -> None:
+        super().committed(keys)
+        payload = encode(self.origin, keys)
+        for bus in list(LocalBus._instances):
+            if bus is not self:
+                bus.deliver(payload)
+
+
+class PostgresBus(InvalidationBus):
+    """
+    LISTEN/NOTIFY backend. The NOTIFY is sent inside the writing
+    transaction, so Postgres delivers it exactly when (and only if) the
+    transaction commits. Each worker listens on a dedicated psycopg2
+    connection, outside the pool, from a daemon thread.
+    """
+
+    name = "postgres"
+
+    def __init__(self, engine, channel: str):
+        super().__init__()
+        self.engine = engine
+        self.channel = channel
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._connected = False
+
+    def publish(self, session: Session, keys: set) -> None:
+        # session.connection() is the primary connection of the committing
+        # transaction; session.execute would route a SELECT to a replica
+        session.connection().execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": self.channel, "payload": encode(self.origin, keys)},
+        )
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._listen, name="invalidation-listener", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def listening(self) -> bool:
+        return self._connected
+
+    def _connect(self):
+        dialect = self.engine.dialect
+        cargs, cparams = dialect.create_connect_args(self.engine.url)
+        conn = dialect.connect(*cargs, **cparams)
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        return conn
+
+    def _listen(self) -> None:
+        first = True
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = self._connect()
+                self._connected = True
+                if not first:
+                    # Anything sent while disconnected was lost
+                    apply((name, None) for name in HANDLERS)
+                first = False
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 1.0)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self.deliver(conn.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Invalidation listener lost its connection; reconnecting")
+                self.reconnects += 1
+                self._stopping.wait(1.0)
+            finally:
+                self._connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+
+
+@once
+def get_bus() -> InvalidationBus:
+    """Builds the backend named by INVALIDATION_BUS (default: postgres on Postgres, else local)."""
+    settings, engine = get_settings(), get_engine()
+    backend = settings.INVALIDATION_BUS or (
+        "postgres" if engine.dialect.name == "postgresql" else "local"
+    )
+    if backend == "postgres":
+        return PostgresBus(engine, settings.INVALIDATION_CHANNEL)
+    if backend == "local":
+        return LocalBus()
+    raise RuntimeError(f"Unknown INVALIDATION_BUS '{backend}'; use 'postgres' or 'local'.")
+
+
+@event.listens_for(Session, "before_commit")
+def _publish(session) -> None:
+    username = session.info.get(PRINCIPAL)
+    if username is not None:
+        queue(session, "recent_writer", username)
+    keys = session.info.get(_PENDING)
+    if keys:
+        get_bus().publish(session, keys)
+
+@event.listens_for(Session, "after_commit")
+def _apply_committed(session) -> None:
+    keys = session.info.pop(_PENDING, None)
+    if keys:
+        get_bus().committed(keys)
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session) -> None:
+    session.info.pop(_PENDING, None)
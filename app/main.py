@@ -1,38 +1,79 @@
+from contextlib import asynccontextmanager
+
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from .database import engine
-from . import models
-from .routers import auth, prompts, agents, sukhi_profile # Import the new router
-
-# This command creates/updates all database tables defined in models.py
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI(
-    title="Sukhi Multi-Agent Admin Backend",
-    description="API for managing the global Sukhi Profile and multiple AI Agents.",
-    version="3.0.0", # Version updated for new features
-)
-
-# CORS Middleware
-origins = ["*"]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=origins,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include all the API routers
-app.include_router(auth.router)
-app.include_router(sukhi_profile.router)
-app.include_router(agents.router)
-app.include_router(prompts.router)
-
-@app.get("/", tags=["Root"])
-def read_root():
-    """A simple root endpoint to confirm the API is running."""
-    return {"message": "Welcome to the Sukhi Multi-Agent Admin Backend API!"}
+from . import database, invalidation, pagination
+from .config import get_settings
+from .metrics import MetricsMiddleware
+from .routers import auth, prompts, agents, sukhi_profile, catalog, changes, system, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Sync sessions run on this threadpool; more threads than pooled
+    # connections would only wait for a connection.
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    settings = get_settings()
+    limiter.total_tokens = settings.THREADPOOL_SIZE or (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+    # Runs in each worker, after the fork: every worker needs its own listener
+    bus, replicas = invalidation.get_bus(), database.get_replicas()
+    bus.start()
+    replicas.start()
+    yield
+    replicas.stop()
+    bus.stop()
+    # Close pooled connections cleanly on shutdown
+    await database.dispose_engines()
+
+
+def create_app() -> FastAPI:
+    """
+    Builds the FastAPI application.
+
+    Importing this module reads no settings, and neither it nor calling
+    the factory creates engines or touches the database; pools, caches
+    and listeners are built on first use in each worker. The schema is
+    created and upgraded by `python migrate.py`, which must run before the
+    server starts (and after every deploy). Serve it with
+    `uvicorn --factory app.main:create_app` (gunicorn.conf.py does the same).
+    """
+    app = FastAPI(
+        title="Sukhi Multi-Agent Admin Backend",
+        description="API for managing the global Sukhi Profile and multiple AI Agents.",
+        version="3.0.0", # Version updated for new features
+        lifespan=lifespan,
+    )
+
+    # CORS Middleware
+    origins = ["*"]
+
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        expose_headers=[pagination.NEXT_CURSOR_HEADER, "ETag"],
+    )
+
+    # Per-route latency and SQL statement/DB time accounting, served at /metrics
+    app.add_middleware(MetricsMiddleware)
+
+    # Include all the API routers
+    app.include_router(auth.router)
+    app.include_router(sukhi_profile.router)
+    app.include_router(agents.router)
+    app.include_router(prompts.router)
+    app.include_router(catalog.router)
+    app.include_router(changes.router)
+    app.include_router(system.router)
+    app.include_router(metrics.router)
+
+    @app.get("/", tags=["Root"])
+    def read_root():
+        """A simple root endpoint to confirm the API is running."""
+        return {"message": "Welcome to the Sukhi Multi-Agent Admin Backend API!"}
 
+    return app
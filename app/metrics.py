@@ -0,0 +1,190 @@
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+# Upper bounds (seconds) for latency histograms, Prometheus-style.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds for the number of SQL statements a request runs.
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+
+
+class Histogram:
+    """A thread-safe, fixed-bucket histogram, cheap enough to update on every request."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1) # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self) -> dict:
+        """Returns count, sum and cumulative bucket counts keyed by upper bound."""
+        with self._lock:
+            counts, count, total = list(self._counts), self.count, self.sum
+        cumulative, buckets = 0, {}
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            buckets[repr(bound)] = cumulative
+        buckets["+Inf"] = count
+        return {"count": count, "sum": total, "buckets": buckets}
+
+
+# ==================================
+# Per-request SQL Accounting
+# ==================================
+
+class RequestStats:
+    """SQL statements and database time attributed to one request."""
+    __slots__ = ("queries", "db_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# The stats object for the request being handled. It is mutable and shared
+# by reference, so statements run on the threadpool or inside
+# AsyncSession.run_sync (which both copy the context) still count.
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """
+    Attributes every statement run on `engine` (a sync Engine) to the current
+    request, including statements that fail. The start time is kept on the
+    statement's own execution context, so an error can't leave it behind.
+    """
+    def _record(context) -> None:
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        context._metrics_started = None
+        stats = current_request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += time.perf_counter() - started
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            _record(context)
+
+    @event.listens_for(engine, "handle_error")
+    def _stop_timer_on_error(exception_context):
+        if exception_context.execution_context is not None:
+            _record(exception_context.execution_context)
+
+# ==================================
+# Per-route Metrics
+# ==================================
+
+class RouteMetrics:
+    """Latency, SQL count and DB time histograms, and status counters, per route."""
+
+    def __init__(self):
+        self.latency = defaultdict(Histogram)
+        self.db_time = defaultdict(Histogram)
+        self.queries = defaultdict(lambda: Histogram(QUERY_COUNT_BUCKETS))
+        self.responses = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, status: int, duration: float, stats: RequestStats) -> None:
+        key = (method, route)
+        self.latency[key].observe(duration)
+        self.db_time[key].observe(stats.db_time)
+        self.queries[key].observe(stats.queries)
+        with self._lock:
+            self.responses[(method, route, status)] += 1
+
+    def render_prometheus(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        lines += _render_histograms(
+            "http_request_duration_seconds", "Request latency by route.", self.latency
+        )
+        lines += _render_histograms(
+            "http_request_db_queries", "SQL statements run per request.", self.queries
+        )
+        lines += _render_histograms(
+            "http_request_db_seconds", "Time spent in SQL per request.", self.db_time
+        )
+        lines.append("# HELP http_responses_total Responses by route and status code.")
+        lines.append("# TYPE http_responses_total counter")
+        with self._lock:
+            responses = dict(self.responses)
+        for (method, route, status), count in sorted(responses.items()):
+            lines.append(f'http_responses_total{{{_labels(method, route)},status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _labels(method: str, route: str) -> str:
+    route = route.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",route="{route}"'
+
+def _render_histograms(name: str, help_text: str, histograms: dict) -> list:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for (method, route), histogram in sorted(list(histograms.items())):
+        labels = _labels(method, route)
+        snapshot = histogram.snapshot()
+        for bound, count in snapshot["buckets"].items():
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f"{name}_sum{{{labels}}} {snapshot['sum']}")
+        lines.append(f"{name}_count{{{labels}}} {snapshot['count']}")
+    return lines
+
+
+route_metrics = RouteMetrics()
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that times every HTTP request and records it, together
+    with the SQL statements it ran, under its route template (e.g.
+    "/agents/{agent_id}") so that label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            current_request_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "<unmatched>"
+            route_metrics.record(scope["method"], route_path, status_code, duration, stats)
@@ -0,0 +1,115 @@
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from . import crud, models, search
+
+
+def add_missing_columns(engine: Engine) -> list:
+    """
+    Adds columns that exist on the models but not yet in the database.
+
+    `create_all` only creates missing tables, so columns introduced on an
+    existing table (e.g. version counters) are added here. Only nullable
+    columns or columns with a server default can be added this way.
+    Returns the "table.column" names that were added.
+    """
+    added = []
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in models.Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+                default = column.server_default.arg if column.server_default is not None else None
+                if isinstance(default, str):
+                    ddl += f" DEFAULT '{default}'"
+                elif default is not None and engine.dialect.name != "sqlite":
+                    # SQLite cannot add a column with a non-constant default such as now()
+                    ddl += f" DEFAULT {default.compile(dialect=engine.dialect)}"
+                if not column.nullable:
+                    ddl += " NOT NULL"
+                conn.execute(text(ddl))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def seed_sukhi_profile(engine: Engine) -> bool:
+    """
+    Creates the singleton Sukhi profile row if it doesn't exist yet, so the
+    read path never has to write. Returns True if the row was created.
+    """
+    profile = models.SukhiProfile.__table__
+    with engine.connect() as conn:
+        if conn.execute(select(profile.c.id).where(profile.c.id == 1)).first():
+            return False
+        try:
+            conn.execute(profile.insert().values(id=1, name="Sukhi", version=1))
+            conn.commit()
+        except IntegrityError:
+            # Another worker seeded it first
+            return False
+    return True
+
+
+def dedupe_prompt_bodies(engine: Engine, batch_size: int = 1000) -> int:
+    """
+    Moves content still stored inline on prompts into the shared
+    prompt_bodies table, one batch per transaction, and empties the old
+    column. Safe to re-run. Returns the number of prompts moved.
+    """
+    prompts = models.Prompt.__table__
+    move = (
+        update(prompts)
+        .where(prompts.c.id == bindparam("prompt_id"))
+        # Keep updated_at (and with it the prompt's ETag) unchanged
+        .values(content_hash=bindparam("content_hash"), content="", updated_at=prompts.c.updated_at)
+    )
+    moved = 0
+    with Session(engine) as db:
+        while True:
+            rows = db.execute(
+                select(prompts.c.id, prompts.c.content)
+                .where(prompts.c.content_hash.is_(None))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                return moved
+            hashes = crud.acquire_prompt_bodies(db, [row.content for row in rows])
+            db.execute(move, [
+                {"prompt_id": row.id, "content_hash": content_hash}
+                for row, content_hash in zip(rows, hashes)
+            ])
+            db.commit()
+            moved += len(rows)
+
+
+def build_agent_bundles(engine: Engine) -> int:
+    """
+    Builds the bundles of agents that predate them (or were left stale by
+    the older build-on-read scheme). Safe to re-run. Returns the number built.
+    """
+    with Session(engine) as db:
+        return crud.build_missing_bundles(db)
+
+
+def upgrade(engine: Engine) -> list:
+    """
+    Brings the schema up to date with the models, deduplicates prompt
+    bodies, creates the prompt full-text indexes (replacing the older
+    prompts-only index), builds missing agent bundles and seeds required rows.
+    """
+    models.Base.metadata.create_all(bind=engine)
+    added = add_missing_columns(engine)
+    dedupe_prompt_bodies(engine)
+    search.setup_search_index(engine)
+    search.drop_legacy_search_index(engine)
+    build_agent_bundles(engine)
+    seed_sukhi_profile(engine)
+    return added
@@ -1,8 +1,9 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Table, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, Text, DateTime, Table, ForeignKey, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
 from .database import Base
+from .prompt_bodies import decode_body
 
 # Association Table Updated: prompt_id is now a String
 agent_prompt_association = Table(
@@ -27,6 +28,9 @@ class SukhiProfile(Base):
     name = Column(String, default="Sukhi", nullable=False)
     about = Column(Text, nullable=True)
     photo_url = Column(String, nullable=True)
+    # Bumped on every change; used to build the profile's ETag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
 class Agent(Base):
     __tablename__ = "agents"
@@ -34,25 +38,116 @@ class Agent(Base):
     name = Column(String, index=True, nullable=False)
     about = Column(Text, nullable=True)
     photo_url = Column(String, nullable=True)
+    # Bumped on every change to the agent's own fields; used to build ETags
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Always loaded eagerly: every Agent response includes its prompts, and
+    # with an AsyncSession they can't be lazy-loaded during serialization.
     prompts = relationship(
         "Prompt",
         secondary=agent_prompt_association,
-        back_populates="assigned_to_agents"
+        back_populates="assigned_to_agents",
+        lazy="selectin",
     )
 
+class PromptBody(Base):
+    """
+    A prompt's content, stored once per distinct text and shared by every
+    prompt with that content. Keyed by the SHA-256 of the text; `ref_count`
+    tracks how many prompts point at it, and the row is deleted at zero.
+    """
+    __tablename__ = "prompt_bodies"
+    hash = Column(String(64), primary_key=True)
+    text = Column(Text, nullable=True) # Set for uncompressed bodies
+    compressed = Column(LargeBinary, nullable=True) # zlib, set instead of text for large bodies
+    size = Column(Integer, nullable=False) # Length of the UTF-8 text in bytes
+    ref_count = Column(Integer, nullable=False, default=0)
+
+    def get_text(self) -> str:
+        return decode_body(self.text, self.compressed)
+
 class Prompt(Base):
     """
     Represents an AI prompt with a custom, user-provided primary key.
+    The content lives in prompt_bodies and is reassembled by `content`.
     """
     __tablename__ = "prompts"
     id = Column(String, primary_key=True, index=True) # <-- Changed to String
     title = Column(String, index=True, nullable=False)
-    content = Column(Text, nullable=False)
+    content_hash = Column(String(64), ForeignKey("prompt_bodies.hash"), nullable=True, index=True)
+    # Pre-deduplication copy of the content; emptied by migrations.upgrade
+    legacy_content = Column("content", Text, nullable=False, default="", server_default="")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # Bumped on every change; used to build ETags (updated_at has only
+    # one-second resolution on SQLite)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    body = relationship("PromptBody", lazy="joined")
     assigned_to_agents = relationship(
         "Agent",
         secondary=agent_prompt_association,
         back_populates="prompts"
     )
 
+    @property
+    def content(self) -> str:
+        if self.body is not None:
+            return self.body.get_text()
+        return self.legacy_content
+
+
+class PromptRevision(Base):
+    """
+    One saved version of a prompt. `data` holds the full content for
+    snapshots and a delta against the previous revision otherwise (see
+    app/revisions.py); `snapshot_revision` is the snapshot a revision's
+    delta chain starts from.
+    """
+    __tablename__ = "prompt_revisions"
+    __table_args__ = (UniqueConstraint("prompt_id", "revision"),)
+    id = Column(Integer, primary_key=True)
+    prompt_id = Column(String, ForeignKey("prompts.id"), nullable=False)
+    revision = Column(Integer, nullable=False)
+    snapshot_revision = Column(Integer, nullable=False)
+    title = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    @property
+    def is_snapshot(self) -> bool:
+        return self.revision == self.snapshot_revision
+
+
+class AgentBundle(Base):
+    """
+    An agent and its prompts as one pre-serialized JSON document, served
+    to the runtime fleet as-is. Writes affecting the agent bump
+    `change_count` and rebuild the bundle (incrementing `version`) in the
+    same transaction (see crud._touch_bundles). Rows outlive their agent
+    (`document` is then NULL), so versions never go backwards.
+    """
+    __tablename__ = "agent_bundles"
+    agent_id = Column(String, primary_key=True) # No FK: kept after the agent is deleted
+    version = Column(Integer, nullable=False, default=0)
+    change_count = Column(Integer, nullable=False, default=1)
+    built_change_count = Column(Integer, nullable=False, default=0)
+    document = Column(LargeBinary, nullable=True)
+    document_gzip = Column(LargeBinary, nullable=True) # Set for documents of BUNDLE_GZIP_MIN_BYTES and up
+    built_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class ChangeLogEntry(Base):
+    """
+    One create/update/delete/assign/remove, written in the same transaction
+    as the change itself. `seq` increases in commit order (see
+    crud._log_changes), so consumers can resume from the last seq they saw.
+    """
+    __tablename__ = "change_log"
+    # AUTOINCREMENT keeps SQLite from reusing the seqs of pruned rows
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False) # agent, prompt, assignment or sukhi_profile
+    entity_id = Column(String, nullable=False) # The agent ID for assignments
+    related_id = Column(String, nullable=True) # The prompt ID for assignments
+    action = Column(String, nullable=False) # created, updated, deleted, assigned or removed
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -0,0 +1,53 @@
+import base64
+import binascii
+import json
+from typing import Optional, Tuple
+
+# Response header carrying the cursor for the next page in cursor mode.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# Largest `limit` the list endpoints accept.
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue."""
+
+
+def encode_cursor(last_id: str) -> str:
+    """Encodes the key of the last row on a page into an opaque cursor."""
+    raw = json.dumps({"id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Optional[str]:
+    """
+    Decodes a cursor back into the key to continue after.
+    An empty cursor means "start from the first page".
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_id = json.loads(base64.urlsafe_b64decode(padded))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursor(cursor)
+    if not isinstance(last_id, str):
+        raise InvalidCursor(cursor)
+    return last_id
+
+def keyset_page(query, key_column, after: Optional[str], limit: int) -> Tuple[list, Optional[str]]:
+    """
+    Returns one page of `query` ordered by `key_column`, starting after `after`,
+    plus the cursor for the following page (None on the last page).
+
+    Unlike OFFSET, the database seeks straight to the first row through the
+    key's index, so every page costs the same regardless of depth.
+    """
+    if limit < 1:
+        return [], None
+    if after is not None:
+        query = query.filter(key_column > after)
+    rows = query.order_by(key_column).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(getattr(rows[-1], key_column.key))
@@ -0,0 +1,28 @@
+import hashlib
+import zlib
+from typing import Optional
+
+from .config import get_settings
+
+# Prompt bodies are stored once per distinct text, keyed by the SHA-256 of
+# the UTF-8 bytes (see models.PromptBody). Bodies at least
+# PROMPT_BODY_COMPRESSION_MIN_BYTES long are zlib-compressed when that
+# setting is non-zero.
+
+
+def body_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+def encode_body(text: str) -> dict:
+    """Returns the prompt_bodies column values for `text`."""
+    raw = text.encode("utf-8")
+    threshold = get_settings().PROMPT_BODY_COMPRESSION_MIN_BYTES
+    if threshold and len(raw) >= threshold:
+        return {"text": None, "compressed": zlib.compress(raw), "size": len(raw)}
+    return {"text": text, "compressed": None, "size": len(raw)}
+
+def decode_body(text: Optional[str], compressed: Optional[bytes]) -> str:
+    """Reassembles a body from its stored columns."""
+    if compressed is not None:
+        return zlib.decompress(compressed).decode("utf-8")
+    return text or ""
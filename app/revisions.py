@@ -0,0 +1,51 @@
+import difflib
+import json
+import re
+import zlib
+from typing import List
+
+# Prompt revisions are stored as a full snapshot every
+# PROMPT_REVISION_SNAPSHOT_INTERVAL revisions, with the ones in between
+# stored as deltas against the previous revision (see models.PromptRevision).
+#
+# A delta is a list of operations over the previous text split into word
+# tokens: [start, end] copies those tokens, a string inserts new text.
+# Both kinds of payload are zlib-compressed JSON.
+
+_TOKEN = re.compile(r"\s+|\S+\s*")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text)
+
+def _pack(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+def _unpack(data: bytes):
+    return json.loads(zlib.decompress(data))
+
+def encode_snapshot(text: str) -> bytes:
+    return _pack(text)
+
+def make_delta(old: str, new: str) -> bytes:
+    """Encodes `new` as edits to `old`."""
+    old_tokens, new_tokens = _tokens(old), _tokens(new)
+    matcher = difflib.SequenceMatcher(None, old_tokens, new_tokens, autojunk=False)
+    ops = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append("".join(new_tokens[j1:j2]))
+    return _pack(ops)
+
+def apply_delta(old: str, delta: bytes) -> str:
+    """Rebuilds the text a delta was made from, given the previous text."""
+    old_tokens = _tokens(old)
+    parts = []
+    for op in _unpack(delta):
+        parts.append(op if isinstance(op, str) else "".join(old_tokens[op[0]:op[1]]))
+    return "".join(parts)
+
+def decode_snapshot(data: bytes) -> str:
+    return _unpack(data)
@@ -2,15 +2,14 @@
 # from fastapi import File, UploadFile
 # import boto3
 # from botocore.exceptions import NoCredentialsError
-# from ..config import settings
+# from ..config import get_settings
 
 
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from .. import crud, schemas
-from ..database import get_db
+from .. import async_crud, etag, pagination, schemas, serialization
+from ..database import AnySession, get_db_session
 from ..dependencies import get_current_admin
 
 
@@ -26,8 +25,8 @@ from ..dependencies import get_current_admin
 #
 #     s3_client = boto3.client(
 #         's3',
-#         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-#         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+#         aws_access_key_id=get_settings().AWS_ACCESS_KEY_ID,
+#         aws_secret_access_key=get_settings().AWS_SECRET_ACCESS_KEY
 #     )
 #     try:
 #         s3_client.upload_fileobj(file.file, bucket_name, object_name)
@@ -50,99 +49,225 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Agent, status_code=status.HTTP_201_CREATED)
-def create_new_agent(agent: schemas.AgentCreate, db: Session = Depends(get_db)):
+async def create_new_agent(agent: schemas.AgentCreate, db: AnySession = Depends(get_db_session)):
     """
     Create a new AI Agent with a custom, user-provided string ID.
     """
-    db_agent = crud.get_agent(db, agent_id=agent.id)
-    if db_agent:
+    db_agent = await async_crud.create_agent(db=db, agent=agent)
+    if db_agent is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Agent with ID '{agent.id}' already exists.",
         )
-    return crud.create_agent(db=db, agent=agent)
+    return db_agent
 
 @router.get("/", response_model=List[schemas.Agent])
-def read_all_agents(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_all_agents(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AnySession = Depends(get_db_session),
+):
     """
     Retrieve a list of all agents.
+
+    Pass `cursor` (empty for the first page) to page by ID instead of
+    skip/limit; the next page's cursor is returned in the X-Next-Cursor
+    header and is absent on the last page.
+
+    Supports If-None-Match; an unchanged page returns 304 without loading
+    the agents or their prompts.
     """
-    agents = crud.get_agents(db, skip=skip, limit=limit)
-    return agents
+    keyset = cursor is not None
+    after_id = None
+    if keyset:
+        try:
+            after_id = pagination.decode_cursor(cursor)
+        except pagination.InvalidCursor:
+            raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+    if etag.is_conditional(request):
+        entries, next_cursor = await async_crud.get_agents_validators(
+            db, skip=skip, limit=limit, after_id=after_id, keyset=keyset
+        )
+        tag = etag.agents_etag(entries)
+        if etag.matches(request, tag):
+            headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+            return etag.not_modified(tag, headers)
+
+    headers = {}
+    if keyset:
+        agents, next_cursor = await async_crud.get_agents_page(db, after_id=after_id, limit=limit)
+        if next_cursor:
+            headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+    else:
+        agents = await async_crud.get_agents(db, skip=skip, limit=limit)
+    headers["ETag"] = etag.agents_etag(etag.agent_entries(agents))
+    return serialization.list_response(agents, schemas.Agent, headers)
+
+@router.post("/bundles", response_model=schemas.AgentBundleBatch)
+async def read_agent_bundles(request: schemas.AgentBundleRequest, db: AnySession = Depends(get_db_session)):
+    """
+    Fetch the bundles of many agents in one call.
+
+    Map each agent ID to the bundle version you already have (or null).
+    Bundles with a newer version are returned in full; the rest are only
+    listed under `unchanged`, and unknown agents under `missing`.
+    """
+    bundles = await async_crud.get_agent_bundles(db, list(request.agents))
+    documents, unchanged, missing = [], [], []
+    for agent_id, known_version in request.agents.items():
+        bundle = bundles.get(agent_id)
+        if bundle is None:
+            missing.append(agent_id)
+        elif known_version is not None and bundle[0] <= known_version:
+            unchanged.append(agent_id)
+        else:
+            documents.append(bundle[1])
+    return Response(
+        content=serialization.bundle_batch(documents, unchanged, missing),
+        media_type="application/json",
+    )
+
+@router.get("/{agent_id}/bundle", response_model=schemas.AgentBundle)
+async def read_agent_bundle(agent_id: str, request: Request, db: AnySession = Depends(get_db_session)):
+    """
+    Retrieve an agent's bundle: the agent and its prompts as one
+    precompiled document, versioned so runtimes can skip unchanged ones.
+
+    Supports If-None-Match, and is sent gzipped (without re-compressing)
+    to clients that accept it.
+    """
+    bundle = (await async_crud.get_agent_bundles(db, [agent_id])).get(agent_id)
+    if bundle is None:
+        raise HTTPException(status_code=404, detail="Agent not found")
+    version, document, document_gzip = bundle
+    tag = etag.bundle_etag(agent_id, version)
+    if etag.matches(request, tag):
+        return etag.not_modified(tag)
+
+    headers = {"ETag": tag, "Vary": "Accept-Encoding"}
+    if document_gzip is not None and "gzip" in request.headers.get("accept-encoding", ""):
+        document = document_gzip
+        headers["Content-Encoding"] = "gzip"
+    return Response(content=document, media_type="application/json", headers=headers)
 
 @router.get("/{agent_id}", response_model=schemas.Agent)
-def read_single_agent(agent_id: str, db: Session = Depends(get_db)):
+async def read_single_agent(agent_id: str, db: AnySession = Depends(get_db_session)):
     """
     Retrieve a single agent by its custom ID.
     """
-    db_agent = crud.get_agent(db, agent_id=agent_id)
+    db_agent = await async_crud.get_agent(db, agent_id=agent_id)
     if db_agent is None:
         raise HTTPException(status_code=404, detail="Agent not found")
     return db_agent
 
 @router.put("/{agent_id}", response_model=schemas.Agent)
-def update_existing_agent(
-    agent_id: str, agent_update: schemas.AgentUpdate, db: Session = Depends(get_db)
+async def update_existing_agent(
+    agent_id: str, agent_update: schemas.AgentUpdate, db: AnySession = Depends(get_db_session)
 ):
     """
     Update an agent's details (name, about, photo_url).
     """
-    db_agent = crud.get_agent(db, agent_id=agent_id)
+    db_agent = await async_crud.update_agent(db=db, agent_id=agent_id, agent_update=agent_update)
     if db_agent is None:
         raise HTTPException(status_code=404, detail="Agent not found")
-    return crud.update_agent(db=db, agent_id=agent_id, agent_update=agent_update)
+    return db_agent
 
 @router.delete("/{agent_id}", response_model=schemas.Agent)
-def delete_existing_agent(agent_id: str, db: Session = Depends(get_db)):
+async def delete_existing_agent(agent_id: str, db: AnySession = Depends(get_db_session)):
     """
     Delete an agent from the database.
     """
-    db_agent = crud.get_agent(db, agent_id=agent_id)
+    db_agent = await async_crud.delete_agent(db=db, agent_id=agent_id)
     if db_agent is None:
         raise HTTPException(status_code=404, detail="Agent not found")
-    crud.delete_agent(db=db, agent_id=agent_id)
     return db_agent
 
 @router.post("/{agent_id}/assign-prompt/{prompt_id}", response_model=schemas.Agent)
-def assign_prompt_to_agent_endpoint(agent_id: str, prompt_id: str, db: Session = Depends(get_db)):
+async def assign_prompt_to_agent_endpoint(agent_id: str, prompt_id: str, db: AnySession = Depends(get_db_session)):
     """
     Assign an existing prompt to a specific agent.
     """
-    db_agent = crud.get_agent(db, agent_id=agent_id)
+    db_agent = await async_crud.get_agent(db, agent_id=agent_id)
     if db_agent is None:
         raise HTTPException(status_code=404, detail="Agent not found")
     
-    db_prompt = crud.get_prompt(db, prompt_id=prompt_id)
+    db_prompt = await async_crud.get_prompt(db, prompt_id=prompt_id)
     if db_prompt is None:
         raise HTTPException(status_code=404, detail="Prompt not found")
         
-    return crud.assign_prompt_to_agent(db, agent_id=agent_id, prompt_id=prompt_id)
+    return await async_crud.assign_prompt_to_agent(db, agent_id=agent_id, prompt_id=prompt_id)
+
+@router.post("/bulk-assign", response_model=schemas.BulkAssignmentResult)
+async def bulk_assign_prompts_endpoint(assignment: schemas.BulkAssignment, db: AnySession = Depends(get_db_session)):
+    """
+    Assign every listed prompt to every listed agent in one transaction.
+    Pairs that are already assigned or reference unknown IDs are reported, not rejected.
+    """
+    results = await async_crud.bulk_assign_prompts(db, assignment.agent_ids, assignment.prompt_ids)
+    return {"results": results}
+
+@router.post("/bulk-unassign", response_model=schemas.BulkAssignmentResult)
+async def bulk_unassign_prompts_endpoint(assignment: schemas.BulkAssignment, db: AnySession = Depends(get_db_session)):
+    """
+    Remove every listed prompt from every listed agent in one transaction.
+    """
+    results = await async_crud.bulk_remove_prompts(db, assignment.agent_ids, assignment.prompt_ids)
+    return {"results": results}
 
 @router.get("/{agent_id}/unassigned-prompts", response_model=List[schemas.Prompt])
-def read_unassigned_prompts(agent_id: str, db: Session = Depends(get_db)):
+async def read_unassigned_prompts(
+    agent_id: str,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    title: Optional[str] = None,
+    cursor: Optional[str] = None,
+    db: AnySession = Depends(get_db_session),
+):
     """
     Retrieve a list of prompts that are not assigned to this agent.
+
+    Optionally filter by `title` (substring match). Supports the same
+    skip/limit and cursor pagination as the prompt list.
     """
-    unassigned = crud.get_unassigned_prompts_for_agent(db, agent_id=agent_id)
-    if unassigned is None:
+    if cursor is None:
+        unassigned = await async_crud.get_unassigned_prompts_for_agent(
+            db, agent_id=agent_id, skip=skip, limit=limit, title=title
+        )
+        if unassigned is None:
+            raise HTTPException(status_code=404, detail="Agent not found")
+        return serialization.list_response(unassigned, schemas.Prompt)
+
+    try:
+        after_id = pagination.decode_cursor(cursor)
+    except pagination.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    page = await async_crud.get_unassigned_prompts_for_agent(
+        db, agent_id=agent_id, limit=limit, title=title, after_id=after_id, keyset=True
+    )
+    if page is None:
         raise HTTPException(status_code=404, detail="Agent not found")
-    return unassigned
+    unassigned, next_cursor = page
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return serialization.list_response(unassigned, schemas.Prompt, headers)
 
 @router.delete("/{agent_id}/remove-prompt/{prompt_id}", response_model=schemas.Agent)
-def remove_prompt_from_agent_endpoint(agent_id: str, prompt_id: int, db: Session = Depends(get_db)):
+async def remove_prompt_from_agent_endpoint(agent_id: str, prompt_id: str, db: AnySession = Depends(get_db_session)):
     """
     Remove a prompt assignment from a specific agent.
     """
-    db_agent = crud.get_agent(db, agent_id=agent_id)
+    db_agent = await async_crud.get_agent(db, agent_id=agent_id)
     if db_agent is None:
         raise HTTPException(status_code=404, detail="Agent not found")
 
     # We also check if the prompt exists to provide a clear error message.
-    db_prompt = crud.get_prompt(db, prompt_id=prompt_id)
+    db_prompt = await async_crud.get_prompt(db, prompt_id=prompt_id)
     if db_prompt is None:
         raise HTTPException(status_code=404, detail="Prompt not found")
         
-    return crud.remove_prompt_from_agent(db, agent_id=agent_id, prompt_id=prompt_id)
+    return await async_crud.remove_prompt_from_agent(db, agent_id=agent_id, prompt_id=prompt_id)
 
 # ==============================================================================
 # S3 Photo Upload Endpoint for a specific Agent (Commented out for future use)
@@ -154,10 +279,10 @@ def remove_prompt_from_agent_endpoint(agent_id: str, prompt_id: int, db: Session
 #     if db_agent is None:
 #         raise HTTPException(status_code=404, detail="Agent not found")
 #
-#     if not settings.S3_BUCKET_NAME:
+#     if not get_settings().S3_BUCKET_NAME:
 #         raise HTTPException(status_code=500, detail="S3 bucket name is not configured on the server.")
 #
-#     file_url = upload_file_to_s3(file, settings.S3_BUCKET_NAME)
+#     file_url = upload_file_to_s3(file, get_settings().S3_BUCKET_NAME)
 #    
 #     if file_url is None:
 #         raise HTTPException(status_code=500, detail="Could not upload file to S3. Check server credentials and configuration.")
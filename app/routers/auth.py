@@ -1,10 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
-# We need to import models and our dependency
-from .. import crud, schemas, security, models
-from ..database import get_db
+# We need to import schemas and our dependency
+from .. import async_crud, schemas, security
+from ..database import AnySession, get_db_session
 from ..dependencies import get_current_admin
 
 router = APIRouter(
@@ -12,19 +11,42 @@ router = APIRouter(
 )
 
 @router.post("/token", response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(db: AnySession = Depends(get_db_session), form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Authenticates a user and returns a JWT access token.
+
+    Password verification runs on a dedicated, size-limited pool so a burst
+    of logins cannot starve the other endpoints. When that pool is saturated
+    the request is rejected with 503 and a Retry-After header.
     """
-    admin = crud.get_admin_by_username(db, username=form_data.username)
-    
-    if not admin or not security.verify_password(form_data.password, admin.hashed_password):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Incorrect username or password",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+    admin = await async_crud.get_admin_by_username(db, username=form_data.username)
+    if not admin:
+        raise credentials_exception
+
+    try:
+        verified, new_hash = await security.run_in_hash_pool(
+            security.verify_and_update_password, form_data.password, admin.hashed_password
+        )
+    except security.PasswordHasherBusy:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect username or password",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many login attempts in progress, please retry shortly.",
+            headers={"Retry-After": "1"},
         )
-        
+
+    if not verified:
+        raise credentials_exception
+
+    # Transparently upgrade hashes created with different bcrypt settings
+    if new_hash:
+        await async_crud.update_admin_password_hash(db, admin, new_hash)
+
     access_token = security.create_access_token(
         data={"sub": admin.username}
     )
@@ -33,7 +55,7 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
 
 
 @router.get("/me", response_model=schemas.Admin)
-def read_users_me(current_admin: models.Admin = Depends(get_current_admin)):
+async def read_users_me(current_admin: schemas.Admin = Depends(get_current_admin)):
     """
     Get the current logged-in admin's details.
     
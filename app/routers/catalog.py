@@ -0,0 +1,67 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from .. import async_crud, exporter, importer, schemas
+from ..config import get_settings
+from ..database import AnySession, get_db_session
+from ..dependencies import get_current_admin
+
+router = APIRouter(
+    prefix="/catalog",
+    tags=["Catalog"],
+    dependencies=[Depends(get_current_admin)],
+)
+
+async def _iter_lines(request: Request):
+    """Splits the streamed request body into lines without buffering all of it."""
+    pending = b""
+    async for chunk in request.stream():
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            yield line
+    if pending:
+        yield pending
+
+@router.post("/import/{kind}", response_model=schemas.ImportReport)
+async def import_catalog(
+    kind: str,
+    request: Request,
+    batch_size: Optional[int] = Query(default=None, ge=1, le=5000),
+    db: AnySession = Depends(get_db_session),
+):
+    """
+    Bulk create-or-replace `prompts` or `agents` from an NDJSON body
+    (one PromptCreate / AgentCreate object per line).
+
+    The body is read as a stream and written in batches of `batch_size`
+    rows (IMPORT_BATCH_SIZE by default). Each batch is committed on its own. Invalid rows are counted and
+    reported, and they do not stop the import.
+    """
+    if kind not in importer.IMPORTERS:
+        raise HTTPException(status_code=404, detail=f"Unknown catalog kind '{kind}'")
+
+    batcher = importer.NdjsonBatcher(kind, batch_size or get_settings().IMPORT_BATCH_SIZE)
+    async for line in _iter_lines(request):
+        batch = batcher.add_line(line)
+        if batch:
+            await async_crud.run(db, batcher.write, batch)
+    await async_crud.run(db, batcher.write, batcher.take_batch())
+    return batcher.report
+
+@router.get("/export")
+def export_catalog():
+    """
+    Stream every prompt, agent and prompt assignment as NDJSON.
+
+    Each line is an object with a "type" of "prompt", "agent" or
+    "assignment". Prompt and agent rows can be fed back to
+    /catalog/import/{kind}.
+    """
+    return StreamingResponse(
+        exporter.iter_catalog_ndjson(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="catalog.ndjson"'},
+    )
@@ -0,0 +1,113 @@
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from .. import async_crud, changes, schemas, serialization
+from ..config import get_settings
+from ..database import AnySession, get_db_session, open_session
+from ..dependencies import get_current_admin
+
+# Seconds between SSE comments that keep idle proxies from closing the stream
+SSE_KEEPALIVE_SECONDS = 15.0
+
+router = APIRouter(
+    prefix="/changes",
+    tags=["Changes"],
+    dependencies=[Depends(get_current_admin)],
+)
+
+# Clients may wait for a long time, so the feed never holds the request's
+# session while waiting: every read opens its own short-lived session.
+
+async def _load_head() -> int:
+    async with open_session() as db:
+        return await async_crud.get_change_head(db)
+
+async def _read_changes(since: int, limit: int):
+    async with open_session() as db:
+        return await async_crud.get_changes(db, since=since, limit=limit)
+
+def _pruned() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_410_GONE,
+        detail="Changes after `since` were pruned; reload the full lists and resume from a fresh `last_seq`.",
+    )
+
+@router.get("/", response_model=schemas.ChangeBatch)
+async def read_changes(
+    since: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    wait: float = Query(0, ge=0),
+    db: AnySession = Depends(get_db_session),
+):
+    """
+    Retrieve changes to agents, prompts, assignments and the Sukhi profile
+    made after the change with seq `since`, oldest first.
+
+    Without `since`, only the current `last_seq` is returned: load the full
+    lists, then follow the feed from there. With `wait`, the request is held
+    (long-poll, up to CHANGE_FEED_MAX_WAIT_SECONDS) until a change arrives.
+    Returns 410 if the changes after `since` are no longer kept.
+    """
+    # The auth check may have used the request's session; let its
+    # connection go back to the pool before waiting.
+    await async_crud.close_session(db)
+    if since is None:
+        return {"changes": [], "last_seq": await _load_head()}
+
+    if wait:
+        await changes.get_change_feed().wait(_load_head, since, min(wait, get_settings().CHANGE_FEED_MAX_WAIT_SECONDS))
+    entries = await _read_changes(since, limit)
+    if entries is None:
+        raise _pruned()
+    last_seq = entries[-1].seq if entries else since
+    return {"changes": entries, "last_seq": last_seq}
+
+@router.get("/stream", response_class=StreamingResponse)
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = None,
+    last_event_id: Optional[str] = Header(None),
+    db: AnySession = Depends(get_db_session),
+):
+    """
+    Stream changes as Server-Sent Events (`event: change`, the entry as
+    JSON in `data`, its seq as the event `id`).
+
+    Starts after `since`, after the Last-Event-ID header a reconnecting
+    EventSource sends, or otherwise at the current end of the log. If the
+    position has been pruned, a single `event: reset` is sent and the
+    stream ends.
+    """
+    await async_crud.close_session(db)
+    if last_event_id:
+        try:
+            since = int(last_event_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+    if since is None:
+        since = await _load_head()
+
+    encoder = serialization.encoder_for(schemas.ChangeEntry)
+
+    async def events():
+        position = since
+        while not await request.is_disconnected():
+            if not await changes.get_change_feed().wait(_load_head, position, SSE_KEEPALIVE_SECONDS):
+                yield b": keepalive\n\n"
+                continue
+            entries = await _read_changes(position, 100)
+            if entries is None:
+                yield b"event: reset\ndata: {}\n\n"
+                return
+            for entry in entries:
+                data = serialization.dumps(encoder.encode(entry, {}))
+                yield b"id: %d\nevent: change\ndata: %s\n\n" % (entry.seq, data)
+                position = entry.seq
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
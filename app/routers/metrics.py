@@ -0,0 +1,77 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from .. import cache, invalidation
+from ..config import get_settings
+from ..database import created_engines, get_replicas
+from ..db_pool import pool_status
+from ..metrics import route_metrics
+
+router = APIRouter(tags=["System"])
+
+def _gauge(lines: list, name: str, help_text: str, samples: list) -> None:
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} gauge")
+    for labels, value in samples:
+        lines.append(f"{name}{{{labels}}} {value}")
+
+def _runtime_metrics() -> str:
+    """Pool and cache state for this worker, in Prometheus text format."""
+    pools = [(label, pool_status(db_engine)) for label, db_engine in created_engines()]
+
+    lines = []
+    for field, help_text in (
+        ("checked_out", "Connections currently checked out."),
+        ("idle", "Idle connections in the pool."),
+        ("overflow", "Overflow connections in use."),
+    ):
+        samples = [(f'engine="{label}"', status[field]) for label, status in pools if field in status]
+        _gauge(lines, f"db_pool_{field}", help_text, samples)
+    replicas = get_replicas()
+    if replicas.engines:
+        _gauge(lines, "db_replica_healthy", "1 if the read replica passed its last health check.",
+               [(f'replica="{index}"', int(up)) for index, up in enumerate(replicas.healthy)])
+
+    caches = [
+        ("admin", cache.get_admin_cache().stats()),
+        ("profile", cache.get_profile_cache().stats()),
+        ("bundle", cache.get_bundle_cache().stats()),
+    ]
+    for field in ("hits", "misses"):
+        lines.append(f"# HELP cache_{field}_total Cache {field} since the worker started.")
+        lines.append(f"# TYPE cache_{field}_total counter")
+        for name, stats in caches:
+            lines.append(f'cache_{field}_total{{cache="{name}"}} {stats[field]}')
+
+    bus = invalidation.get_bus()
+    labels = f'bus="{bus.name}"'
+    _gauge(lines, "invalidation_listener_up", "1 while this worker receives invalidations.",
+           [(labels, int(bus.listening()))])
+    for name, help_text, value in (
+        ("invalidation_messages_received_total", "Invalidations received from other workers.", bus.received),
+        ("invalidation_listener_reconnects_total", "Times the invalidation listener had to reconnect.", bus.reconnects),
+    ):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{{{labels}}} {value}")
+    snapshot = bus.lag.snapshot()
+    lines.append("# HELP invalidation_propagation_seconds Time from commit to applying an invalidation here.")
+    lines.append("# TYPE invalidation_propagation_seconds histogram")
+    for bound, count in snapshot["buckets"].items():
+        lines.append(f'invalidation_propagation_seconds_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f"invalidation_propagation_seconds_sum{{{labels}}} {snapshot['sum']}")
+    lines.append(f"invalidation_propagation_seconds_count{{{labels}}} {snapshot['count']}")
+    return "\n".join(lines) + "\n"
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """
+    Prometheus scrape endpoint: per-route latency, SQL statements and DB
+    time per request, plus pool and cache state for this worker.
+    """
+    if not get_settings().METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(
+        route_metrics.render_prometheus() + _runtime_metrics(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,9 +1,8 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 
-from .. import crud, schemas
-from ..database import get_db
+from .. import async_crud, etag, pagination, schemas, serialization
+from ..database import AnySession, get_db_session
 from ..dependencies import get_current_admin
 
 router = APIRouter(
@@ -14,56 +13,133 @@ router = APIRouter(
 )
 
 @router.post("/", response_model=schemas.Prompt, status_code=status.HTTP_201_CREATED)
-def create_new_prompt(prompt: schemas.PromptCreate, db: Session = Depends(get_db)):
+async def create_new_prompt(prompt: schemas.PromptCreate, db: AnySession = Depends(get_db_session)):
     """
     Create a new AI prompt with a custom, user-provided string ID.
     """
-    db_prompt = crud.get_prompt(db, prompt_id=prompt.id)
-    if db_prompt:
+    db_prompt = await async_crud.create_prompt(db=db, prompt=prompt)
+    if db_prompt is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Prompt with ID '{prompt.id}' already exists.",
         )
-    return crud.create_prompt(db=db, prompt=prompt)
+    return db_prompt
 
 @router.get("/", response_model=List[schemas.Prompt])
-def read_all_prompts(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+async def read_all_prompts(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: AnySession = Depends(get_db_session),
+):
     """
     Retrieve a list of all prompts.
+
+    Pass `cursor` (empty for the first page) to page by ID instead of
+    skip/limit; the next page's cursor is returned in the X-Next-Cursor
+    header and is absent on the last page.
     """
-    prompts = crud.get_prompts(db, skip=skip, limit=limit)
-    return prompts
+    if cursor is None:
+        prompts = await async_crud.get_prompts(db, skip=skip, limit=limit)
+        return serialization.list_response(prompts, schemas.Prompt)
+
+    try:
+        after_id = pagination.decode_cursor(cursor)
+    except pagination.InvalidCursor:
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+    prompts, next_cursor = await async_crud.get_prompts_page(db, after_id=after_id, limit=limit)
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return serialization.list_response(prompts, schemas.Prompt, headers)
+
+@router.get("/search", response_model=List[schemas.PromptSearchResult])
+async def search_all_prompts(
+    q: str = Query(..., min_length=1),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=20, ge=1, le=100),
+    db: AnySession = Depends(get_db_session),
+):
+    """
+    Full-text search over prompt titles and content, best match first.
+    Title matches rank above content matches. Each result has a content
+    snippet with the matched terms wrapped in <mark> tags.
+    """
+    return await async_crud.search_prompts(db, q, skip=skip, limit=limit)
 
 @router.get("/{prompt_id}", response_model=schemas.Prompt)
-def read_single_prompt(prompt_id: str, db: Session = Depends(get_db)):
+async def read_single_prompt(
+    prompt_id: str, request: Request, response: Response, db: AnySession = Depends(get_db_session)
+):
     """
     Retrieve a single prompt by its custom ID.
+    Supports If-None-Match; an unchanged prompt returns 304 without loading its content.
     """
-    db_prompt = crud.get_prompt(db, prompt_id=prompt_id)
+    if etag.is_conditional(request):
+        validator = await async_crud.get_prompt_validator(db, prompt_id=prompt_id)
+        if validator is None:
+            raise HTTPException(status_code=404, detail="Prompt not found")
+        tag = etag.prompt_etag(*validator)
+        if etag.matches(request, tag):
+            return etag.not_modified(tag)
+
+    db_prompt = await async_crud.get_prompt(db, prompt_id=prompt_id)
     if db_prompt is None:
         raise HTTPException(status_code=404, detail="Prompt not found")
+    response.headers["ETag"] = etag.prompt_etag(db_prompt.id, db_prompt.created_at, db_prompt.version)
     return db_prompt
 
 @router.put("/{prompt_id}", response_model=schemas.Prompt)
-def update_existing_prompt(
-    prompt_id: str, prompt: schemas.PromptUpdate, db: Session = Depends(get_db)
+async def update_existing_prompt(
+    prompt_id: str, prompt: schemas.PromptUpdate, db: AnySession = Depends(get_db_session)
 ):
     """
     Update an existing prompt's title or content.
     """
-    db_prompt = crud.get_prompt(db, prompt_id=prompt_id)
+    db_prompt = await async_crud.update_prompt(db=db, prompt_id=prompt_id, prompt_update=prompt)
     if db_prompt is None:
         raise HTTPException(status_code=404, detail="Prompt not found")
-    return crud.update_prompt(db=db, prompt_id=prompt_id, prompt_update=prompt)
+    return db_prompt
+
+@router.get("/{prompt_id}/revisions", response_model=List[schemas.PromptRevisionSummary])
+async def read_prompt_revisions(
+    prompt_id: str,
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=100, ge=1, le=500),
+    db: AnySession = Depends(get_db_session),
+):
+    """
+    List a prompt's revisions, newest first.
+    """
+    if await async_crud.get_prompt_validator(db, prompt_id=prompt_id) is None:
+        raise HTTPException(status_code=404, detail="Prompt not found")
+    return await async_crud.get_prompt_revisions(db, prompt_id, skip=skip, limit=limit)
+
+@router.get("/{prompt_id}/revisions/{revision}", response_model=schemas.PromptRevision)
+async def read_prompt_revision(prompt_id: str, revision: int, db: AnySession = Depends(get_db_session)):
+    """
+    Retrieve the title and content a prompt had at a given revision.
+    """
+    db_revision = await async_crud.get_prompt_revision(db, prompt_id, revision)
+    if db_revision is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return db_revision
+
+@router.post("/{prompt_id}/revisions/{revision}/rollback", response_model=schemas.Prompt)
+async def rollback_prompt_to_revision(prompt_id: str, revision: int, db: AnySession = Depends(get_db_session)):
+    """
+    Restore a prompt to an earlier revision. The rollback is recorded as a new revision.
+    """
+    db_prompt = await async_crud.rollback_prompt(db, prompt_id, revision)
+    if db_prompt is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return db_prompt
 
 @router.delete("/{prompt_id}", response_model=schemas.Prompt)
-def delete_existing_prompt(prompt_id: str, db: Session = Depends(get_db)):
+async def delete_existing_prompt(prompt_id: str, db: AnySession = Depends(get_db_session)):
     """
     Delete a prompt from the database.
     """
-    db_prompt = crud.get_prompt(db, prompt_id=prompt_id)
+    db_prompt = await async_crud.delete_prompt(db=db, prompt_id=prompt_id)
     if db_prompt is None:
         raise HTTPException(status_code=404, detail="Prompt not found")
-    crud.delete_prompt(db=db, prompt_id=prompt_id)
     return db_prompt
 
@@ -2,7 +2,7 @@
 # from fastapi import File, UploadFile
 # import boto3
 # from botocore.exceptions import NoCredentialsError
-# from ..config import settings
+# from ..config import get_settings
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
@@ -22,8 +22,8 @@ from ..dependencies import get_current_admin
 #
 #     s3_client = boto3.client(
 #         's3',
-#         aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-#         aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+#         aws_access_key_id=get_settings().AWS_ACCESS_KEY_ID,
+#         aws_secret_access_key=get_settings().AWS_SECRET_ACCESS_KEY
 #     )
 #     try:
 #         s3_client.upload_fileobj(file.file, bucket_name, object_name)
@@ -68,10 +68,10 @@ def update_sukhi_details(sukhi_update: schemas.SukhiUpdate, db: Session = Depend
 # @router.post("/upload-photo", response_model=schemas.Sukhi)
 # def upload_sukhi_photo(db: Session = Depends(get_db), file: UploadFile = File(...)):
 #     """Upload a new photo for Sukhi to S3 and update the profile URL."""
-#     if not settings.S3_BUCKET_NAME:
+#     if not get_settings().S3_BUCKET_NAME:
 #         raise HTTPException(status_code=500, detail="S3 bucket name is not configured on the server.")
 #
-#     file_url = upload_file_to_s3(file, settings.S3_BUCKET_NAME)
+#     file_url = upload_file_to_s3(file, get_settings().S3_BUCKET_NAME)
 #    
 #     if file_url is None:
 #         raise HTTPException(status_code=500, detail="Could not upload file to S3. Check server credentials and configuration.")
@@ -1,7 +1,6 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from .. import crud, schemas
-from ..database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from .. import async_crud, etag, schemas
+from ..database import AnySession, get_db_session
 from ..dependencies import get_current_admin
 
 router = APIRouter(
@@ -12,17 +11,25 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=schemas.SukhiProfile)
-def read_sukhi_profile(db: Session = Depends(get_db)):
+async def read_sukhi_profile(request: Request, response: Response, db: AnySession = Depends(get_db_session)):
     """
     Retrieve the global Sukhi profile.
+    Served from the in-process profile cache and supports If-None-Match.
     """
-    return crud.get_sukhi_profile(db)
+    profile = await async_crud.get_sukhi_profile(db)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Sukhi profile not found")
+    tag = etag.profile_etag(profile.version)
+    if etag.matches(request, tag):
+        return etag.not_modified(tag)
+    response.headers["ETag"] = tag
+    return profile
 
 @router.put("/", response_model=schemas.SukhiProfile)
-def update_sukhi_profile_details(
-    profile_update: schemas.SukhiProfileUpdate, db: Session = Depends(get_db)
+async def update_sukhi_profile_details(
+    profile_update: schemas.SukhiProfileUpdate, db: AnySession = Depends(get_db_session)
 ):
     """
     Update the global Sukhi profile's details.
     """
-    return crud.update_sukhi_profile(db, profile_update=profile_update)
+    return await async_crud.update_sukhi_profile(db, profile_update=profile_update)
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends
+
+from ..database import get_async_engine, get_engine, get_replicas
+from ..db_pool import pool_status
+from ..dependencies import get_current_admin
+
+router = APIRouter(
+    prefix="/system",
+    tags=["System"],
+    dependencies=[Depends(get_current_admin)],
+)
+
+@router.get("/db-pool")
+async def read_db_pool_status():
+    """
+    Report this worker's connection pool usage: checked-out and idle
+    connections, overflow in use, and a histogram of checkout wait times.
+    Each gunicorn worker has its own pool, so repeated calls may hit
+    different workers (see "pid"). Each read replica has its own pools
+    too, reported with its last health check.
+    """
+    status = {"sync": pool_status(get_engine())}
+    async_engine = get_async_engine()
+    if async_engine is not None:
+        status["async"] = pool_status(async_engine.sync_engine)
+    replicas = get_replicas()
+    for index, replica in enumerate(replicas.engines):
+        status[f"replica{index}"] = {**pool_status(replica), "healthy": replicas.healthy[index]}
+    for index, replica in enumerate(replicas.async_engines or ()):
+        status[f"replica{index}-async"] = pool_status(replica.sync_engine)
+    return status
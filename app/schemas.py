@@ -1,5 +1,5 @@
-from pydantic import BaseModel, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Optional
 import datetime
 
 # ==================================
@@ -39,6 +39,24 @@ class Prompt(PromptBase):
     updated_at: Optional[datetime.datetime] = None
     model_config = ConfigDict(from_attributes=True)
 
+class PromptSearchResult(BaseModel):
+    id: str
+    title: str
+    rank: float # Higher is a better match
+    snippet: Optional[str] = None # Content excerpt with matches wrapped in <mark> tags
+
+class PromptRevisionSummary(BaseModel):
+    revision: int
+    title: str
+    is_snapshot: bool # Stored in full rather than as a delta
+    created_at: Optional[datetime.datetime] = None
+    model_config = ConfigDict(from_attributes=True)
+
+class PromptRevision(PromptBase):
+    prompt_id: str
+    revision: int
+    created_at: Optional[datetime.datetime] = None
+
 # ==================================
 # Agent Schemas (No changes needed)
 # ==================================
@@ -57,6 +75,69 @@ class Agent(AgentBase):
     prompts: List[Prompt] = []
     model_config = ConfigDict(from_attributes=True)
 
+# ==================================
+# Agent Bundle Schemas
+# ==================================
+class AgentBundle(AgentBase):
+    """An agent as delivered to the runtimes; prompts are ordered by ID."""
+    id: str
+    version: int
+    prompts: List[Prompt] = []
+
+class AgentBundleRequest(BaseModel):
+    """Maps each agent ID to the bundle version the caller already has (or null)."""
+    agents: Dict[str, Optional[int]] = Field(..., min_length=1, max_length=500)
+
+class AgentBundleBatch(BaseModel):
+    bundles: List[AgentBundle] # Only those newer than the caller's version
+    unchanged: List[str]
+    missing: List[str]
+
+# ==================================
+# Change Feed Schemas
+# ==================================
+class ChangeEntry(BaseModel):
+    seq: int
+    entity: str # agent, prompt, assignment or sukhi_profile
+    entity_id: str
+    related_id: Optional[str] = None # The prompt ID of an assignment
+    action: str # created, updated, deleted, assigned or removed
+    created_at: datetime.datetime
+    model_config = ConfigDict(from_attributes=True)
+
+class ChangeBatch(BaseModel):
+    changes: List[ChangeEntry]
+    last_seq: int # Pass as `since` on the next call
+
+# ==================================
+# Bulk Assignment Schemas
+# ==================================
+class BulkAssignment(BaseModel):
+    """Every listed prompt is (un)assigned to every listed agent."""
+    agent_ids: List[str] = Field(..., min_length=1, max_length=500)
+    prompt_ids: List[str] = Field(..., min_length=1, max_length=500)
+
+class AssignmentOutcome(BaseModel):
+    agent_id: str
+    prompt_id: str
+    status: str # assigned, already_assigned, removed, not_assigned, agent_not_found, prompt_not_found
+
+class BulkAssignmentResult(BaseModel):
+    results: List[AssignmentOutcome]
+
+# ==================================
+# Catalog Import Schemas
+# ==================================
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    errors: List[ImportRowError] = [] # Only the first few rejections are kept
+
 # ==================================
 # Admin & Token Schemas (No changes needed)
 # ==================================
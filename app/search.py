@@ -0,0 +1,268 @@
+import re
+
+from sqlalchemy import inspect, or_, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+from . import models
+from .prompt_bodies import decode_body
+
+# Full-text search over prompt titles and content.
+#
+# Content lives in the deduplicated prompt_bodies table, so titles and
+# bodies are indexed separately and a prompt matches when either does.
+# Postgres: generated, weighted tsvector columns with GIN indexes, kept
+# current by the database on every INSERT/UPDATE (including upserts).
+# SQLite (local runs): FTS5 indexes over both tables, kept current by
+# triggers. Other databases fall back to an unindexed substring match.
+# Snippets are cut from the reassembled body, so compressed bodies get
+# them too (they are not content-indexed, see PROMPT_BODY_COMPRESSION_MIN_BYTES).
+
+HIGHLIGHT_START, HIGHLIGHT_STOP = "<mark>", "</mark>"
+SNIPPET_CHARS = 160
+
+_POSTGRES_DDL = (
+    """
+    ALTER TABLE prompts ADD COLUMN IF NOT EXISTS title_vector tsvector
+    GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce(title, '')), 'A')) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_prompts_title_vector ON prompts USING GIN (title_vector)",
+    """
+    ALTER TABLE prompt_bodies ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (setweight(to_tsvector('english', coalesce(text, '')), 'B')) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_prompt_bodies_search_vector ON prompt_bodies USING GIN (search_vector)",
+)
+
+# External-content FTS5 tables keyed on rowid. SQLite may renumber rowids
+# of tables without an INTEGER PRIMARY KEY on VACUUM; run
+# rebuild_search_index() afterwards.
+_SQLITE_DDL = (
+    "CREATE VIRTUAL TABLE prompt_titles_fts USING fts5(title, content='prompts', content_rowid='rowid')",
+    """
+    CREATE TRIGGER prompt_titles_fts_insert AFTER INSERT ON prompts BEGIN
+        INSERT INTO prompt_titles_fts(rowid, title) VALUES (new.rowid, new.title);
+    END
+    """,
+    """
+    CREATE TRIGGER prompt_titles_fts_delete AFTER DELETE ON prompts BEGIN
+        INSERT INTO prompt_titles_fts(prompt_titles_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+    END
+    """,
+    """
+    CREATE TRIGGER prompt_titles_fts_update AFTER UPDATE OF title ON prompts BEGIN
+        INSERT INTO prompt_titles_fts(prompt_titles_fts, rowid, title) VALUES ('delete', old.rowid, old.title);
+        INSERT INTO prompt_titles_fts(rowid, title) VALUES (new.rowid, new.title);
+    END
+    """,
+    "CREATE VIRTUAL TABLE prompt_bodies_fts USING fts5(text, content='prompt_bodies', content_rowid='rowid')",
+    """
+    CREATE TRIGGER prompt_bodies_fts_insert AFTER INSERT ON prompt_bodies BEGIN
+        INSERT INTO prompt_bodies_fts(rowid, text) VALUES (new.rowid, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER prompt_bodies_fts_delete AFTER DELETE ON prompt_bodies BEGIN
+        INSERT INTO prompt_bodies_fts(prompt_bodies_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER prompt_bodies_fts_update AFTER UPDATE OF text ON prompt_bodies BEGIN
+        INSERT INTO prompt_bodies_fts(prompt_bodies_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+        INSERT INTO prompt_bodies_fts(rowid, text) VALUES (new.rowid, new.text);
+    END
+    """,
+    "INSERT INTO prompt_titles_fts(prompt_titles_fts) VALUES ('rebuild')",
+    "INSERT INTO prompt_bodies_fts(prompt_bodies_fts) VALUES ('rebuild')",
+)
+
+# The first version of search indexed prompts.content directly: one
+# weighted tsvector column on Postgres, one FTS5 table on SQLite. Content
+# has since moved to prompt_bodies, so these index empty strings; once the
+# indexes above exist, drop_legacy_search_index removes them.
+_POSTGRES_LEGACY_DDL = (
+    "DROP INDEX IF EXISTS ix_prompts_search_vector",
+    "ALTER TABLE prompts DROP COLUMN IF EXISTS search_vector",
+)
+_SQLITE_LEGACY_DDL = (
+    "DROP TRIGGER IF EXISTS prompts_fts_insert",
+    "DROP TRIGGER IF EXISTS prompts_fts_delete",
+    "DROP TRIGGER IF EXISTS prompts_fts_update",
+    "DROP TABLE IF EXISTS prompts_fts",
+)
+
+
+def setup_search_index(engine: Engine) -> bool:
+    """
+    Creates the full-text indexes for the engine's dialect if they are
+    missing. Returns False when the database has no supported full-text
+    engine.
+    """
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        with engine.begin() as conn:
+            for statement in _POSTGRES_DDL:
+                conn.execute(text(statement))
+        return True
+    if dialect == "sqlite":
+        with engine.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prompt_bodies_fts'")
+            ).first()
+            if exists:
+                return True
+            try:
+                for statement in _SQLITE_DDL:
+                    conn.execute(text(statement))
+            except OperationalError:
+                # SQLite built without FTS5
+                return False
+        return True
+    return False
+
+def drop_legacy_search_index(engine: Engine) -> bool:
+    """
+    Drops the prompts-only index of the first search version, if the
+    database still has it. Run after setup_search_index, so search is never
+    left without an index. Returns True if anything was dropped.
+    """
+    inspector = inspect(engine)
+    dialect = engine.dialect.name
+    if dialect == "postgresql":
+        present = any(column["name"] == "search_vector" for column in inspector.get_columns("prompts"))
+        ddl = _POSTGRES_LEGACY_DDL
+    elif dialect == "sqlite":
+        present = "prompts_fts" in inspector.get_table_names()
+        ddl = _SQLITE_LEGACY_DDL
+    else:
+        return False
+    if not present:
+        return False
+    with engine.begin() as conn:
+        for statement in ddl:
+            conn.execute(text(statement))
+    return True
+
+def rebuild_search_index(engine: Engine) -> None:
+    """Re-indexes every prompt (SQLite only; Postgres maintains its indexes itself)."""
+    if engine.dialect.name == "sqlite":
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO prompt_titles_fts(prompt_titles_fts) VALUES ('rebuild')"))
+            conn.execute(text("INSERT INTO prompt_bodies_fts(prompt_bodies_fts) VALUES ('rebuild')"))
+
+
+def make_snippet(content: str, query: str, width: int = SNIPPET_CHARS) -> str:
+    """
+    Returns about `width` characters of `content` around the first query
+    term, with every term wrapped in <mark> tags.
+    """
+    terms = [term for term in re.findall(r"\w+", query.lower()) if term]
+    lowered = content.lower()
+    positions = [pos for pos in (lowered.find(term) for term in terms) if pos >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    excerpt = content[start:start + width]
+    if terms:
+        pattern = "|".join(re.escape(term) for term in sorted(terms, key=len, reverse=True))
+        excerpt = re.sub(f"({pattern})", rf"{HIGHLIGHT_START}\1{HIGHLIGHT_STOP}", excerpt, flags=re.IGNORECASE)
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + width < len(content) else ""
+    return prefix + excerpt + suffix
+
+def _fts5_query(query: str) -> str:
+    """Quotes each word so user input can't use (or break) FTS5 query syntax."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in query.split())
+
+def _sqlite_has_index(db: Session) -> bool:
+    return db.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'prompt_bodies_fts'")
+    ).first() is not None
+
+def _results(rows, query: str) -> list:
+    return [
+        {
+            "id": row.id,
+            "title": row.title,
+            "rank": row.rank,
+            "snippet": make_snippet(decode_body(row.text, row.compressed), query),
+        }
+        for row in rows
+    ]
+
+def search_prompts(db: Session, query: str, skip: int = 0, limit: int = 20) -> list:
+    """
+    Returns one page of prompts matching `query`, best match first, as
+    dicts with id, title, rank (higher is better) and a snippet of the
+    content with the matched terms wrapped in <mark> tags.
+    """
+    dialect = db.get_bind().dialect.name
+    params = {"q": query, "skip": skip, "limit": limit}
+
+    if dialect == "postgresql":
+        # Each index finds its own candidates; only those are ranked
+        rows = db.execute(text("""
+            WITH q AS (SELECT websearch_to_tsquery('english', :q) AS q),
+            candidates AS (
+                SELECT p.id FROM prompts p, q WHERE p.title_vector @@ q.q
+                UNION
+                SELECT p.id FROM prompt_bodies b JOIN prompts p ON p.content_hash = b.hash, q
+                WHERE b.search_vector @@ q.q
+            )
+            SELECT p.id, p.title, b.text, b.compressed,
+                   ts_rank_cd(p.title_vector || coalesce(b.search_vector, ''::tsvector), q.q) AS rank
+            FROM candidates c
+            JOIN prompts p ON p.id = c.id
+            LEFT JOIN prompt_bodies b ON b.hash = p.content_hash
+            CROSS JOIN q
+            ORDER BY rank DESC, p.id
+            LIMIT :limit OFFSET :skip
+        """), params)
+        return _results(rows, query)
+
+    if dialect == "sqlite" and _sqlite_has_index(db):
+        params["q"] = _fts5_query(query)
+        if not params["q"]:
+            return []
+        rows = db.execute(text("""
+            WITH hits AS (
+                SELECT p.id, -10.0 * bm25(prompt_titles_fts) AS score
+                FROM prompt_titles_fts JOIN prompts p ON p.rowid = prompt_titles_fts.rowid
+                WHERE prompt_titles_fts MATCH :q
+                UNION ALL
+                SELECT p.id, -bm25(prompt_bodies_fts) AS score
+                FROM prompt_bodies_fts
+                JOIN prompt_bodies b ON b.rowid = prompt_bodies_fts.rowid
+                JOIN prompts p ON p.content_hash = b.hash
+                WHERE prompt_bodies_fts MATCH :q
+            ),
+            ranked AS (
+                SELECT id, sum(score) AS rank FROM hits
+                GROUP BY id
+                ORDER BY rank DESC, id
+                LIMIT :limit OFFSET :skip
+            )
+            SELECT p.id, p.title, b.text, b.compressed, r.rank
+            FROM ranked r
+            JOIN prompts p ON p.id = r.id
+            LEFT JOIN prompt_bodies b ON b.hash = p.content_hash
+            ORDER BY r.rank DESC, p.id
+        """), params)
+        return _results(rows, query)
+
+    # No full-text engine: unranked substring match
+    prompts = (
+        db.query(models.Prompt)
+        .outerjoin(models.PromptBody, models.PromptBody.hash == models.Prompt.content_hash)
+        .filter(or_(
+            models.Prompt.title.icontains(query, autoescape=True),
+            models.PromptBody.text.icontains(query, autoescape=True),
+        ))
+        .order_by(models.Prompt.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+    return [
+        {"id": p.id, "title": p.title, "rank": 0.0, "snippet": make_snippet(p.content, query)}
+        for p in prompts
+    ]
@@ -1,11 +1,32 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from .config import settings
+from .config import get_settings, once
 
-# Setup for password hashing using bcrypt algorithm
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Setup for password hashing using bcrypt algorithm.
+# Hashes created with a different number of rounds are flagged for update,
+# which lets login transparently rehash them (see verify_and_update_password).
+@once
+def get_pwd_context() -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=get_settings().BCRYPT_ROUNDS)
+
+# bcrypt is deliberately slow, so it runs on its own small pool instead of the
+# threadpool shared by every sync endpoint. The semaphore caps running plus
+# queued jobs; once it is exhausted new logins are rejected instead of piling up.
+@once
+def get_hash_pool() -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+    settings = get_settings()
+    executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+    slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_LIMIT)
+    return executor, slots
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the password hashing pool is saturated."""
 
 # Constants for JWT configuration
 ALGORITHM = "HS256"
@@ -13,11 +34,38 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 1440 # The token will be valid for 60 minutes
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Compares a plain-text password with its hashed version."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Generates a bcrypt hash for a plain-text password."""
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+def verify_and_update_password(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verifies a password and, if the stored hash uses outdated settings
+    (e.g. a different BCRYPT_ROUNDS), also returns a replacement hash.
+    """
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
+
+async def run_in_hash_pool(func, *args):
+    """
+    Runs a hashing function on the dedicated password pool.
+
+    Raises:
+        PasswordHasherBusy: If the pool and its queue are already full.
+    """
+    executor, slots = get_hash_pool()
+    if not slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        future = executor.submit(func, *args)
+    except BaseException:
+        slots.release()
+        raise
+    future.add_done_callback(lambda _: slots.release())
+    return await asyncio.wrap_future(future)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """
@@ -37,5 +85,12 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    encoded_jwt = jwt.encode(to_encode, get_settings().SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+def token_subject(token: str) -> Optional[str]:
+    """The username a valid, unexpired token was issued to, or None."""
+    try:
+        return jwt.decode(token, get_settings().SECRET_KEY, algorithms=[ALGORITHM]).get("sub")
+    except JWTError:
+        return None
\ No newline at end of file
@@ -0,0 +1,103 @@
+import datetime
+import json
+import typing
+from typing import Iterable, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError: # Optional; the stdlib encoder is used instead
+    orjson = None
+
+# Fast path for large list responses. The routes still declare their
+# response_model (for the OpenAPI schema), but return rows encoded here
+# instead of letting FastAPI validate and re-serialize every ORM object
+# through pydantic. Rows come straight from our own queries, so they are
+# trusted to match the schema.
+
+
+def _list_item_model(annotation) -> Optional[Type[BaseModel]]:
+    """Returns Model for a List[Model] annotation, otherwise None."""
+    if typing.get_origin(annotation) is list:
+        args = typing.get_args(annotation)
+        if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+            return args[0]
+    return None
+
+
+class RowEncoder:
+    """
+    Converts ORM rows to plain dicts with the fields (and field order) of a
+    pydantic schema. Nested List[Model] fields get their own encoder, and a
+    row reached more than once in a response (such as a prompt assigned to
+    many agents) is converted only once.
+    """
+
+    def __init__(self, schema: Type[BaseModel]):
+        self.fields = []
+        for name, field in schema.model_fields.items():
+            nested = _list_item_model(field.annotation)
+            self.fields.append((name, encoder_for(nested) if nested else None))
+
+    def encode(self, row, memo: dict) -> dict:
+        key = (id(self), id(row))
+        encoded = memo.get(key)
+        if encoded is None:
+            encoded = {}
+            for name, nested in self.fields:
+                value = getattr(row, name)
+                if nested is not None:
+                    value = [nested.encode(item, memo) for item in value]
+                encoded[name] = value
+            memo[key] = encoded
+        return encoded
+
+
+_encoders: dict = {}
+
+def encoder_for(schema: Type[BaseModel]) -> RowEncoder:
+    """Returns the (cached) RowEncoder for a schema."""
+    encoder = _encoders.get(schema)
+    if encoder is None:
+        encoder = _encoders[schema] = RowEncoder(schema)
+    return encoder
+
+
+def _json_default(value):
+    if isinstance(value, datetime.datetime) and value.utcoffset() == datetime.timedelta(0):
+        return value.replace(tzinfo=None).isoformat() + "Z"
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def dumps(value) -> bytes:
+    """
+    Compact JSON as UTF-8, with a Z suffix for UTC datetimes as pydantic
+    writes them. The stdlib fallback produces the same bytes as orjson,
+    except for floats written in exponent form ("1e+21" rather than "1e21").
+    """
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)
+    return json.dumps(value, default=_json_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+def encode_rows(rows: Iterable, schema: Type[BaseModel]) -> bytes:
+    """Serializes ORM rows as a JSON array of `schema` objects."""
+    encoder, memo = encoder_for(schema), {}
+    return dumps([encoder.encode(row, memo) for row in rows])
+
+def list_response(rows: Iterable, schema: Type[BaseModel], headers: Optional[dict] = None) -> Response:
+    """A JSON response for a list endpoint, bypassing response_model validation."""
+    return Response(content=encode_rows(rows, schema), media_type="application/json", headers=headers)
+
+def bundle_batch(documents: Iterable[bytes], unchanged: list, missing: list) -> bytes:
+    """
+    Serializes a schemas.AgentBundleBatch around bundle documents that are
+    already JSON, splicing them in rather than decoding and re-encoding them.
+    """
+    return b"".join((
+        b'{"bundles":[', b",".join(documents),
+        b'],"unchanged":', dumps(unchanged),
+        b',"missing":', dumps(missing), b"}",
+    ))
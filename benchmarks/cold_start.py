@@ -0,0 +1,151 @@
+"""
+Cold-start benchmark: measures, in fresh interpreters, how long the app
+takes to import and to answer its first requests, and checks the result
+against a budget.
+
+    python -m benchmarks.cold_start --runs 10 --output cold_start.json
+
+Each run imports `app.main`, then sends a first unauthenticated request and
+a first database-backed request through an app built by `create_app()`.
+Importing must not create a database engine (let alone connect); a run
+that does counts as a failure. The
+report has the same shape as `benchmarks.run`, so two of them can be diffed
+with `python -m benchmarks.compare`.
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import time
+
+from benchmarks.run import BENCH_USERNAME, BENCH_PASSWORD, configure_environment, git_revision, percentile
+
+# Runs in the child interpreter; prints one JSON line of timings.
+PROBE = """
+import json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+from app import database, security
+engines_at_import = len(database.created_engines())
+
+from fastapi.testclient import TestClient
+client = TestClient(app.main.create_app())
+before = time.perf_counter()
+client.get("/").raise_for_status()
+first_request = time.perf_counter() - before
+
+headers = {"Authorization": "Bearer " + security.create_access_token({"sub": %(username)r})}
+before = time.perf_counter()
+client.get("/prompts/", params={"limit": 1}, headers=headers).raise_for_status()
+first_db_request = time.perf_counter() - before
+
+print(json.dumps({
+    "import": imported - started,
+    "first_request": first_request,
+    "first_db_request": first_db_request,
+    "engines_at_import": engines_at_import,
+}))
+"""
+
+# Phase name in the report -> key printed by the probe
+PHASES = {
+    "cold start: import": "import",
+    "cold start: first request": "first_request",
+    "cold start: first DB request": "first_db_request",
+    "cold start: process total": "process",
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to start.")
+    parser.add_argument("--import-budget-ms", type=float, default=2000.0,
+                        help="Allowed p95 for importing app.main.")
+    parser.add_argument("--first-request-budget-ms", type=float, default=500.0,
+                        help="Allowed p95 for each of the first two requests.")
+    parser.add_argument("--output", default="cold_start_report.json")
+    return parser.parse_args(argv)
+
+
+def run_probe(repo_root: str) -> dict:
+    started = time.perf_counter()
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE % {"username": BENCH_USERNAME}],
+        cwd=repo_root, env=dict(os.environ, PYTHONPATH=repo_root), text=True,
+    )
+    result = json.loads(output.strip().splitlines()[-1])
+    result["process"] = time.perf_counter() - started
+    return result
+
+
+def summarize(values: list) -> dict:
+    values = sorted(values)
+    return {
+        "requests": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 3),
+        "p50_ms": round(percentile(values, 50) * 1000, 3),
+        "p95_ms": round(percentile(values, 95) * 1000, 3),
+        "p99_ms": round(percentile(values, 99) * 1000, 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment()
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, repo_root)
+
+    # Schema and admin are set up here, as a deploy would, not by the app
+    from app import config, crud, database, migrations, schemas
+    migrations.upgrade(database.get_engine())
+    with database.SessionLocal() as db:
+        if not crud.get_admin_by_username(db, BENCH_USERNAME):
+            crud.create_admin(db, schemas.AdminCreate(username=BENCH_USERNAME, password=BENCH_PASSWORD))
+    database.get_engine().dispose()
+
+    runs = [run_probe(repo_root) for _ in range(args.runs)]
+
+    budgets = {
+        "cold start: import": args.import_budget_ms,
+        "cold start: first request": args.first_request_budget_ms,
+        "cold start: first DB request": args.first_request_budget_ms,
+    }
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "database": database.get_engine().dialect.name,
+            "async_database": config.get_settings().ASYNC_DATABASE,
+            "runs": args.runs,
+        },
+        "endpoints": {},
+        "budget_failures": [],
+    }
+    for name, key in PHASES.items():
+        result = summarize([run[key] for run in runs])
+        if name in budgets:
+            result["budget_ms"] = budgets[name]
+            if result["p95_ms"] > budgets[name]:
+                report["budget_failures"].append(name)
+        report["endpoints"][name] = result
+        print(f"{name:32s} p50 {result['p50_ms']:9.2f}ms  p95 {result['p95_ms']:9.2f}ms"
+              + (f"  budget {budgets[name]:.0f}ms" if name in budgets else ""))
+    if any(run["engines_at_import"] for run in runs):
+        report["budget_failures"].append("database engine created at import")
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    if report["budget_failures"]:
+        print(f"Cold-start budget exceeded: {', '.join(report['budget_failures'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
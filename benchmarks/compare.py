@@ -0,0 +1,50 @@
+"""
+Compares two benchmark reports from `benchmarks.run` and flags regressions.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 20
+"""
+import argparse
+import json
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--metric", default="p95_ms", choices=["p50_ms", "p95_ms", "p99_ms", "mean_ms"])
+    parser.add_argument("--threshold", type=float, default=20.0, help="Allowed slowdown in percent.")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)["endpoints"]
+    with open(args.candidate) as f:
+        candidate = json.load(f)["endpoints"]
+
+    regressions = []
+    print(f"{'endpoint':40s} {'before':>10s} {'after':>10s} {'change':>8s}  statements")
+    for name in sorted(set(baseline) & set(candidate)):
+        before, after = baseline[name][args.metric], candidate[name][args.metric]
+        change = (after - before) / before * 100 if before else 0.0
+        statements = ""
+        if "max_statements" in baseline[name] and "max_statements" in candidate[name]:
+            statements = f"{baseline[name]['max_statements']} -> {candidate[name]['max_statements']}"
+            if candidate[name]["max_statements"] > baseline[name]["max_statements"]:
+                regressions.append(f"{name} (statements)")
+        flag = ""
+        if change > args.threshold:
+            regressions.append(f"{name} ({args.metric} +{change:.0f}%)")
+            flag = "  <-- slower"
+        print(f"{name:40s} {before:10.2f} {after:10.2f} {change:+7.1f}%  {statements}{flag}")
+
+    for name in sorted(set(baseline) ^ set(candidate)):
+        print(f"{name:40s} only in {'baseline' if name in baseline else 'candidate'}")
+
+    if regressions:
+        print("\nRegressions: " + ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""
+Endpoint benchmark: seeds a synthetic catalog and measures every router
+endpoint, writing a JSON report that can be diffed between releases with
+`python -m benchmarks.compare`.
+
+    python -m benchmarks.run --dataset 10k --requests 200 --output bench.json
+
+By default the app runs in-process (FastAPI TestClient) against a throwaway
+SQLite database. Set DATABASE_URL to benchmark against Postgres instead.
+In-process runs also count the SQL statements each request runs and check
+them against the budgets below. The counts must not grow with the
+dataset, so a blown budget usually means an N+1 query. With --base-url
+the requests go to a running server (which must use the same
+DATABASE_URL) from --concurrency threads.
+"""
+import argparse
+import datetime
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_USERNAME = "benchmark-admin"
+BENCH_PASSWORD = "benchmark-password"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", choices=["1k", "10k", "100k"], default="1k")
+    parser.add_argument("--requests", type=int, default=100, help="Timed requests per endpoint.")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per endpoint.")
+    parser.add_argument("--only", action="append", default=[], help="Run only endpoints whose name contains this.")
+    parser.add_argument("--base-url", help="Benchmark a running server instead of the in-process app.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Client threads (with --base-url).")
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in the database.")
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="Allow seeding to wipe the catalog of a configured DATABASE_URL.",
+    )
+    parser.add_argument("--output", default="bench_report.json")
+    return parser.parse_args(argv)
+
+
+# Names the database configure_environment created; seeding any other
+# database needs --reset
+SCRATCH_DATABASE_ENV = "SUKHI_BENCH_SCRATCH_DATABASE"
+
+def configure_environment():
+    """Points the app at a scratch SQLite database unless one was configured."""
+    if "DATABASE_URL" not in os.environ:
+        path = os.path.join(tempfile.mkdtemp(prefix="sukhi-bench-"), "bench.db")
+        os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+        os.environ[SCRATCH_DATABASE_ENV] = os.environ["DATABASE_URL"]
+    os.environ.setdefault("SECRET_KEY", "benchmark-secret")
+
+
+# ==================================
+# Endpoint Scenarios
+# ==================================
+# Each scenario: (name, method, path, request kwargs, SQL statement budget).
+# Budgets are per request and must not depend on the dataset size. A
+# callable "json" is called for every request's body.
+
+def build_scenarios(ctx: dict) -> list:
+    agent_id, prompt_id = ctx["agent_id"], ctx["prompt_id"]
+    edits = itertools.count()
+    return [
+        ("POST /token", "POST", "/token",
+         {"data": {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}, "auth": False}, 1),
+        ("GET /me", "GET", "/me", {}, 0),
+        ("GET /sukhi-profile/", "GET", "/sukhi-profile/", {}, 0),
+        ("GET /agents/?limit=100", "GET", "/agents/", {"params": {"limit": 100}}, 2),
+        ("GET /agents/?cursor", "GET", "/agents/", {"params": {"cursor": "", "limit": 100}}, 2),
+        ("GET /agents/{id}", "GET", f"/agents/{agent_id}", {}, 1),
+        ("GET /agents/{id}/unassigned-prompts", "GET", f"/agents/{agent_id}/unassigned-prompts",
+         {"params": {"limit": 100}}, 2),
+        ("GET /prompts/?limit=100", "GET", "/prompts/", {"params": {"limit": 100}}, 1),
+        ("GET /prompts/?skip=deep", "GET", "/prompts/",
+         {"params": {"skip": ctx["deep_offset"], "limit": 100}}, 1),
+        ("GET /prompts/?cursor=deep", "GET", "/prompts/",
+         {"params": {"cursor": ctx["deep_cursor"], "limit": 100}}, 1),
+        ("GET /prompts/search", "GET", "/prompts/search", {"params": {"q": "triage", "limit": 20}}, 2),
+        ("GET /prompts/{id}", "GET", f"/prompts/{prompt_id}", {}, 1),
+        ("GET /prompts/{id} If-None-Match", "GET", f"/prompts/{prompt_id}",
+         {"headers": {"If-None-Match": ctx["prompt_etag"]}}, 1),
+        ("GET /agents/{id}/bundle", "GET", f"/agents/{agent_id}/bundle", {}, 1),
+        ("POST /agents/bundles", "POST", "/agents/bundles",
+         {"json": {"agents": dict.fromkeys(ctx["agent_ids"][:100])}}, 1),
+        # New content every time, on a prompt assigned to several agents, so
+        # the body, revision, bundle rebuild and change log writes count
+        ("PUT /prompts/{id}", "PUT", f"/prompts/{ctx['assigned_prompt_id']}",
+         {"json": lambda: {"content": f"Benchmarked edit {next(edits)}"}}, 12),
+        ("PUT /agents/{id}", "PUT", f"/agents/{agent_id}", {"json": {"about": "Benchmarked"}}, 7),
+        ("PUT /sukhi-profile/", "PUT", "/sukhi-profile/", {"json": {"about": "Benchmarked"}}, 2),
+        ("POST /agents/bulk-assign", "POST", "/agents/bulk-assign",
+         {"json": {"agent_ids": ctx["agent_ids"][:10], "prompt_ids": ctx["prompt_ids"][:10]}}, 9),
+        ("GET /catalog/export", "GET", "/catalog/export", {"iterations": 3}, 3),
+    ]
+
+
+# ==================================
+# Measurement
+# ==================================
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class StatementCounter:
+    """Counts SQL statements on the app's engines (in-process runs only)."""
+
+    def __init__(self):
+        self.count = 0
+        self._engines = []
+
+    def attach(self, engine):
+        from sqlalchemy import event
+        if engine is not None and engine not in self._engines:
+            event.listen(engine, "before_cursor_execute", self._increment)
+            self._engines.append(engine)
+
+    def _increment(self, *args):
+        self.count += 1
+
+
+def run_scenario(client, headers, scenario, args, counter):
+    name, method, path, options, budget = scenario
+    options = dict(options)
+    iterations = min(options.pop("iterations", args.requests), args.requests)
+    if name == "POST /token":
+        iterations = min(iterations, 20) # bcrypt is deliberately slow
+    request_headers = {} if not options.pop("auth", True) else dict(headers)
+    request_headers.update(options.pop("headers", {}))
+
+    def send():
+        started = time.perf_counter()
+        kwargs = dict(options)
+        if callable(kwargs.get("json")):
+            kwargs["json"] = kwargs["json"]()
+        response = client.request(method, path, headers=request_headers, **kwargs)
+        response.read()
+        return time.perf_counter() - started, response.status_code
+
+    for _ in range(min(args.warmup, iterations)):
+        send()
+
+    statuses, max_statements = {}, 0
+    started = time.perf_counter()
+    if args.base_url and args.concurrency > 1:
+        with ThreadPoolExecutor(args.concurrency) as pool:
+            results = list(pool.map(lambda _: send(), range(iterations)))
+    else:
+        results = []
+        for _ in range(iterations):
+            before = counter.count if counter else 0
+            results.append(send())
+            if counter:
+                max_statements = max(max_statements, counter.count - before)
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(duration for duration, _ in results)
+    for _, status_code in results:
+        statuses[str(status_code)] = statuses.get(str(status_code), 0) + 1
+    result = {
+        "requests": iterations,
+        "throughput_rps": round(iterations / elapsed, 2) if elapsed else None,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "status_codes": statuses,
+    }
+    if counter:
+        result["max_statements"] = max_statements
+        result["statement_budget"] = budget
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app import config, crud, database, migrations, models, pagination, schemas
+    from benchmarks.seed import seed
+
+    migrations.upgrade(database.get_engine())
+    counts = None
+    if not args.skip_seed:
+        print(f"--- Seeding {args.dataset} dataset ---")
+        counts = seed(database.get_engine(), args.dataset, reset=args.reset)
+        print(counts)
+    with database.SessionLocal() as db:
+        if not crud.get_admin_by_username(db, BENCH_USERNAME):
+            crud.create_admin(db, schemas.AdminCreate(username=BENCH_USERNAME, password=BENCH_PASSWORD))
+
+    counter = None
+    if args.base_url:
+        import httpx
+        client = httpx.Client(base_url=args.base_url, timeout=60)
+    else:
+        from fastapi.testclient import TestClient
+        from app.main import create_app
+        client = TestClient(create_app())
+        counter = StatementCounter()
+        counter.attach(database.get_engine())
+
+    token = client.post("/token", data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+    token.raise_for_status()
+    headers = {"Authorization": f"Bearer {token.json()['access_token']}"}
+    if counter:
+        async_engine = database.get_async_engine()
+        counter.attach(async_engine.sync_engine if async_engine else None)
+
+    # Pick representative IDs and a cursor/offset roughly 90% of the way in
+    with database.SessionLocal() as db:
+        agent_ids = [row.id for row in db.query(models.Agent.id).order_by(models.Agent.id).limit(50)]
+        prompt_ids = [row.id for row in db.query(models.Prompt.id).order_by(models.Prompt.id).limit(50)]
+        deep_offset = max(0, int(db.query(models.Prompt).count() * 0.9) - 100)
+        deep_id = db.query(models.Prompt.id).order_by(models.Prompt.id).offset(deep_offset).limit(1).scalar()
+        assoc = models.agent_prompt_association
+        assigned_id = db.query(assoc.c.prompt_id).filter(assoc.c.agent_id.in_(agent_ids)) \
+            .order_by(assoc.c.prompt_id).limit(1).scalar()
+    ctx = {
+        "agent_id": agent_ids[0],
+        "agent_ids": agent_ids,
+        "prompt_id": prompt_ids[0],
+        "prompt_ids": prompt_ids,
+        "assigned_prompt_id": assigned_id or prompt_ids[0],
+        "deep_offset": deep_offset,
+        "deep_cursor": pagination.encode_cursor(deep_id) if deep_id else "",
+        "prompt_etag": client.get(f"/prompts/{prompt_ids[0]}", headers=headers).headers.get("etag", ""),
+    }
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "database": database.get_engine().dialect.name,
+            "async_database": config.get_settings().ASYNC_DATABASE,
+            "dataset": args.dataset,
+            "rows": counts,
+            "mode": "http" if args.base_url else "in-process",
+            "concurrency": args.concurrency if args.base_url else 1,
+        },
+        "endpoints": {},
+        "budget_failures": [],
+    }
+    for scenario in build_scenarios(ctx):
+        name = scenario[0]
+        if args.only and not any(part in name for part in args.only):
+            continue
+        result = run_scenario(client, headers, scenario, args, counter)
+        report["endpoints"][name] = result
+        print(f"{name:40s} p50 {result['p50_ms']:9.2f}ms  p95 {result['p95_ms']:9.2f}ms  "
+              f"p99 {result['p99_ms']:9.2f}ms  {result['throughput_rps']} req/s"
+              + (f"  stmts {result['max_statements']}/{result['statement_budget']}" if counter else ""))
+        if counter and result["max_statements"] > result["statement_budget"]:
+            report["budget_failures"].append(name)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    if report["budget_failures"]:
+        print(f"SQL statement budget exceeded: {', '.join(report['budget_failures'])}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
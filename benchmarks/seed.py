@@ -0,0 +1,100 @@
+import os
+import random
+
+from sqlalchemy import delete, insert
+
+from app import migrations, models, prompt_bodies
+from benchmarks.run import SCRATCH_DATABASE_ENV
+
+# Named dataset sizes: (prompts, agents, max prompts per agent)
+DATASETS = {
+    "1k": (1_000, 50, 20),
+    "10k": (10_000, 200, 50),
+    "100k": (100_000, 500, 100),
+}
+
+INSERT_CHUNK = 5_000
+
+
+class SeedRefused(RuntimeError):
+    """Raised instead of wiping a database that wasn't created for the benchmark."""
+
+
+def _chunks(rows, size=INSERT_CHUNK):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def is_scratch_database(engine) -> bool:
+    """True for the throwaway database configure_environment created."""
+    url = engine.url.render_as_string(hide_password=False)
+    return os.environ.get(SCRATCH_DATABASE_ENV) == url
+
+def seed(engine, dataset: str, random_seed: int = 42, reset: bool = False) -> dict:
+    """
+    Replaces the catalog with a synthetic one: prompts with realistic-sized
+    bodies (about five prompts share each body) and agents whose prompt fan-out varies from 0 up to the dataset's
+    maximum. Rows are written with bulk Core inserts. Returns the row counts.
+
+    Everything in the catalog (including revisions, bundles and the change
+    log) is deleted first, so unless `engine` is the benchmark's own scratch
+    database this refuses to run without `reset=True`.
+    """
+    if not reset and not is_scratch_database(engine):
+        raise SeedRefused(
+            f"Refusing to replace the catalog in {engine.url.render_as_string(hide_password=True)}; "
+            "pass --reset to wipe it, or unset DATABASE_URL to use a scratch database."
+        )
+    prompt_count, agent_count, max_fanout = DATASETS[dataset]
+    rng = random.Random(random_seed)
+    body = "You are a helpful assistant. " * 40
+
+    bodies = {}
+    prompts = []
+    for i in range(prompt_count):
+        text = f"{body}Variant {i % max(1, prompt_count // 5)}."
+        content_hash = prompt_bodies.body_hash(text)
+        if content_hash in bodies:
+            bodies[content_hash]["ref_count"] += 1
+        else:
+            bodies[content_hash] = {"hash": content_hash, "ref_count": 1, **prompt_bodies.encode_body(text)}
+        prompts.append({
+            "id": f"prompt-{i:06d}",
+            "title": f"Prompt {i} {rng.choice(['greeting', 'triage', 'summary', 'escalation'])}",
+            "content_hash": content_hash,
+            "content": "",
+        })
+    agents = [
+        {"id": f"agent-{i:05d}", "name": f"Agent {i}", "about": f"Synthetic agent {i}", "photo_url": None}
+        for i in range(agent_count)
+    ]
+    assignments = []
+    for agent in agents:
+        fanout = rng.randint(0, max_fanout)
+        for prompt in rng.sample(prompts, fanout):
+            assignments.append({"agent_id": agent["id"], "prompt_id": prompt["id"]})
+
+    with engine.begin() as conn:
+        # Children before the rows they reference
+        for table in (
+            models.ChangeLogEntry.__table__,
+            models.AgentBundle.__table__,
+            models.PromptRevision.__table__,
+            models.agent_prompt_association,
+            models.Agent.__table__,
+            models.Prompt.__table__,
+            models.PromptBody.__table__,
+        ):
+            conn.execute(delete(table))
+        for table, rows in (
+            (models.PromptBody.__table__, list(bodies.values())),
+            (models.Prompt.__table__, prompts),
+            (models.Agent.__table__, agents),
+            (models.agent_prompt_association, assignments),
+        ):
+            for chunk in _chunks(rows):
+                conn.execute(insert(table), chunk)
+    # Writes through the API build bundles; these rows bypassed it
+    migrations.build_agent_bundles(engine)
+
+    return {"prompts": len(prompts), "prompt_bodies": len(bodies), "agents": len(agents), "assignments": len(assignments)}
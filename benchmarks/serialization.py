@@ -0,0 +1,123 @@
+"""
+Serialization benchmark: rows/sec for the list endpoints' response bodies,
+through FastAPI's response_model path (pydantic validation from ORM
+attributes, then JSON) and through app.serialization's fast path.
+
+    python -m benchmarks.serialization --dataset 10k --output serialization.json
+
+Only serialization is timed: rows are loaded once and reused, so the
+numbers don't include the database. The report has the benchmarks.run
+format, so two runs can be diffed with `python -m benchmarks.compare`.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from typing import List
+
+from benchmarks.run import configure_environment, git_revision, percentile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dataset", choices=["1k", "10k", "100k"], default="10k")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in the database.")
+    parser.add_argument(
+        "--reset", action="store_true",
+        help="Allow seeding to wipe the catalog of a configured DATABASE_URL.",
+    )
+    parser.add_argument("--output", default="serialization_report.json")
+    return parser.parse_args(argv)
+
+
+def response_model_path(schema):
+    """What FastAPI does for `response_model=List[schema]` with a JSONResponse."""
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    adapter = TypeAdapter(List[schema])
+
+    def serialize(rows):
+        validated = adapter.validate_python(rows, from_attributes=True)
+        return json.dumps(jsonable_encoder(adapter.dump_python(validated, mode="json"))).encode()
+    return serialize
+
+
+def fast_path(schema):
+    from app import serialization
+    return lambda rows: serialization.encode_rows(rows, schema)
+
+
+def measure(serialize, rows, iterations: int) -> dict:
+    serialize(rows) # warm up
+    durations = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        serialize(rows)
+        durations.append(time.perf_counter() - started)
+    durations.sort()
+    mean = sum(durations) / len(durations)
+    return {
+        "requests": iterations,
+        "rows": len(rows),
+        "rows_per_sec": round(len(rows) / mean),
+        "mean_ms": round(mean * 1000, 3),
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    configure_environment()
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app import crud, database, migrations, schemas
+    from benchmarks.seed import seed
+
+    migrations.upgrade(database.get_engine())
+    if not args.skip_seed:
+        print(f"--- Seeding {args.dataset} dataset ---")
+        print(seed(database.get_engine(), args.dataset, reset=args.reset))
+
+    db = database.SessionLocal()
+    lists = {
+        "/agents/?limit=100": (schemas.Agent, crud.get_agents(db, limit=100)),
+        "/prompts/?limit=1000": (schemas.Prompt, crud.get_prompts(db, limit=1000)),
+    }
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": sys.version.split()[0],
+            "dataset": args.dataset,
+        },
+        "endpoints": {},
+    }
+    for path, (schema, rows) in lists.items():
+        if schema is schemas.Agent:
+            # Count nested prompts too; they dominate the work
+            rows_label = f"{len(rows)} agents, {sum(len(agent.prompts) for agent in rows)} prompts"
+        else:
+            rows_label = f"{len(rows)} prompts"
+        print(f"{path} ({rows_label})")
+        for label, make in (("response_model", response_model_path), ("fast path", fast_path)):
+            result = measure(make(schema), rows, args.iterations)
+            report["endpoints"][f"{path} {label}"] = result
+            print(f"  {label:16s} p50 {result['p50_ms']:9.2f}ms  p95 {result['p95_ms']:9.2f}ms  "
+                  f"{result['rows_per_sec']:>9} rows/s")
+    db.close()
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
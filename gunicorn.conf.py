@@ -0,0 +1,59 @@
+"""
+Production server configuration. Gunicorn loads this file automatically
+when started from the project root:
+
+    python migrate.py && gunicorn
+
+The app is imported once in the master (preload_app) and forked into
+workers, so startup work and read-only memory are shared. Every worker
+then drops the connection pools it inherited (see post_fork) so that no
+database connection is ever used by two processes.
+
+Sizing, overridable through the environment:
+- WEB_CONCURRENCY: worker processes. Defaults to 2 x CPUs + 1, capped so
+  that workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW) stays within
+  DB_MAX_CONNECTIONS.
+- Each worker runs sync database work on a threadpool sized to its
+  connection pool (THREADPOOL_SIZE, see app/main.py). Extra threads would
+  only queue for a connection.
+"""
+import multiprocessing
+import os
+
+from app.config import get_settings
+
+wsgi_app = "app.main:create_app()"
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "uvicorn_worker.UvicornWorker")
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+preload_app = True
+
+# ==================================
+# Worker Sizing
+# ==================================
+settings = get_settings()
+connections_per_worker = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+max_workers_for_db = max(1, settings.DB_MAX_CONNECTIONS // max(1, connections_per_worker))
+workers = int(os.environ.get("WEB_CONCURRENCY", min(multiprocessing.cpu_count() * 2 + 1, max_workers_for_db)))
+# Only used by threaded worker classes; async workers size their threadpool in the app
+threads = settings.THREADPOOL_SIZE or connections_per_worker
+
+# ==================================
+# Timeouts and Recycling
+# ==================================
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60)) # A silent worker is killed and replaced
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30)) # In-flight requests may finish
+keepalive = 5
+# Recycle workers periodically; the jitter keeps them from restarting together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", max_requests // 10))
+
+accesslog = "-"
+errorlog = "-"
+
+
+def post_fork(server, worker):
+    """Forget the connections inherited from the master without closing them."""
+    from app import database
+
+    database.dispose_after_fork()
+    server.log.info("Worker %s: database pools reset after fork", worker.pid)
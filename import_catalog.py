@@ -0,0 +1,27 @@
+import argparse
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.database import SessionLocal
+from app import importer
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk create-or-replace prompts or agents from an NDJSON file.")
+    parser.add_argument("kind", choices=sorted(importer.IMPORTERS), help="What the file contains.")
+    parser.add_argument("path", help="NDJSON file, one object per line.")
+    parser.add_argument("--batch-size", type=int, default=get_settings().IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    print(f"--- Importing {args.kind} from {args.path} ---")
+    db: Session = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8") as lines:
+            report = importer.import_lines(db, args.kind, lines, args.batch_size)
+    finally:
+        db.close()
+
+    print(f"Inserted: {report.inserted}  Updated: {report.updated}  Rejected: {report.rejected}")
+    for error in report.errors:
+        print(f"  line {error.line}: {error.error}")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
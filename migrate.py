@@ -0,0 +1,33 @@
+import argparse
+import datetime
+
+from app import crud, migrations, search
+from app.database import SessionLocal, get_engine
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Create or upgrade the database schema. Run before starting the API and after every deploy."
+    )
+    parser.add_argument("--rebuild-search-index", action="store_true", help="Also re-index every prompt (SQLite).")
+    parser.add_argument(
+        "--prune-change-log", type=float, metavar="DAYS",
+        help="Also delete change feed entries older than DAYS days.",
+    )
+    args = parser.parse_args()
+    engine = get_engine()
+
+    print(f"--- Upgrading schema on {engine.url.render_as_string(hide_password=True)} ---")
+    added = migrations.upgrade(engine)
+    for column in added:
+        print(f"  added column {column}")
+    if args.rebuild_search_index:
+        search.rebuild_search_index(engine)
+        print("  rebuilt search index")
+    if args.prune_change_log is not None:
+        cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=args.prune_change_log)
+        with SessionLocal() as db:
+            print(f"  pruned {crud.prune_change_log(db, cutoff)} change log entries")
+    print("Schema is up to date.")
+
+if __name__ == "__main__":
+    main()
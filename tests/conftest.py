@@ -0,0 +1,81 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+# Settings are read from the environment; point them at a scratch SQLite
+# database before anything from `app` is imported.
+_DB_DIR = tempfile.mkdtemp(prefix="sukhi-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ["BCRYPT_ROUNDS"] = "4"
+os.environ["ASYNC_DATABASE"] = "false"
+os.environ["DATABASE_REPLICA_URLS"] = ""
+os.environ["INVALIDATION_BUS"] = "local"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import crud, migrations, schemas
+from app.config import get_settings
+from app.database import SessionLocal, get_engine
+
+ADMIN_USERNAME = "admin"
+ADMIN_PASSWORD = "admin-password"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    engine = get_engine()
+    migrations.upgrade(engine)
+    with SessionLocal() as db:
+        crud.create_admin(db, schemas.AdminCreate(username=ADMIN_USERNAME, password=ADMIN_PASSWORD))
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture(scope="session")
+def client(database):
+    from app.main import create_app
+
+    with TestClient(create_app()) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def auth_headers(client):
+    response = client.post("/token", data={"username": ADMIN_USERNAME, "password": ADMIN_PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(params=[False, True], ids=["sync", "async"])
+def session_mode(request, monkeypatch):
+    """Runs a test once with sync Sessions and once with ASYNC_DATABASE's AsyncSessions."""
+    monkeypatch.setattr(get_settings(), "ASYNC_DATABASE", request.param)
+    return "async" if request.param else "sync"
+
+
+@pytest.fixture
+def count_statements():
+    """Returns a context manager collecting the SQL sent to the primary engine inside it."""
+    @contextmanager
+    def counting():
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(get_engine(), "before_cursor_execute", record)
+        try:
+            yield statements
+        finally:
+            event.remove(get_engine(), "before_cursor_execute", record)
+
+    return counting
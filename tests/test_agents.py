@@ -0,0 +1,120 @@
+from app import crud, models, pagination, schemas
+
+PROMPTS_PER_AGENT = 3
+
+
+def add_agents_with_prompts(db, start: int, stop: int) -> None:
+    for i in range(start, stop):
+        agent_id = f"n1-agent-{i:03d}"
+        crud.create_agent(db, schemas.AgentCreate(id=agent_id, name=f"Agent {i}"))
+        prompt_ids = [f"n1-prompt-{i:03d}-{j}" for j in range(PROMPTS_PER_AGENT)]
+        for prompt_id in prompt_ids:
+            crud.create_prompt(db, schemas.PromptCreate(id=prompt_id, title=prompt_id, content=f"Body of {prompt_id}"))
+        crud.bulk_assign_prompts(db, [agent_id], prompt_ids)
+
+
+def test_listing_agents_with_prompts_is_constant_in_queries(client, auth_headers, db, count_statements):
+    # Warm the authenticated-admin cache so only the listing is counted
+    client.get("/me", headers=auth_headers)
+    counts, existing = [], 0
+    for agents in (2, 20):
+        add_agents_with_prompts(db, existing, agents)
+        existing = agents
+        with count_statements() as statements:
+            response = client.get("/agents/", params={"limit": 100}, headers=auth_headers)
+        assert response.status_code == 200
+        listed = [agent for agent in response.json() if agent["id"].startswith("n1-agent-")]
+        assert len(listed) == agents
+        assert all(len(agent["prompts"]) == PROMPTS_PER_AGENT for agent in listed)
+        counts.append(len(statements))
+    assert counts[0] == counts[1], counts
+
+
+def test_get_agents_loads_prompts_up_front(db, count_statements):
+    add_agents_with_prompts(db, 100, 110)
+    with count_statements() as statements:
+        agents = crud.get_agents(db, limit=1000)
+        loaded = len(statements)
+        prompt_count = sum(len(agent.prompts) for agent in agents)
+    assert prompt_count >= 10 * PROMPTS_PER_AGENT
+    assert loaded == 2 # the agents, then one IN query for all their prompts
+    assert len(statements) == loaded
+
+
+def test_bulk_assignment_is_idempotent_and_reports_unknown_ids(client, auth_headers, db):
+    crud.create_agent(db, schemas.AgentCreate(id="bulk-agent", name="Bulk"))
+    for prompt_id in ("bulk-prompt-a", "bulk-prompt-b"):
+        crud.create_prompt(db, schemas.PromptCreate(id=prompt_id, title=prompt_id, content="Body."))
+    body = {"agent_ids": ["bulk-agent", "bulk-ghost", "bulk-agent"], "prompt_ids": ["bulk-prompt-a", "bulk-prompt-b", "bulk-missing"]}
+
+    def statuses(path):
+        response = client.post(f"/agents/{path}", json=body, headers=auth_headers)
+        assert response.status_code == 200, response.text
+        return [(outcome["agent_id"], outcome["prompt_id"], outcome["status"]) for outcome in response.json()["results"]]
+
+    assert statuses("bulk-assign") == [
+        ("bulk-agent", "bulk-prompt-a", "assigned"),
+        ("bulk-agent", "bulk-prompt-b", "assigned"),
+        ("bulk-agent", "bulk-missing", "prompt_not_found"),
+        ("bulk-ghost", "bulk-prompt-a", "agent_not_found"),
+        ("bulk-ghost", "bulk-prompt-b", "agent_not_found"),
+        ("bulk-ghost", "bulk-missing", "agent_not_found"),
+    ]
+    assert [status for *_, status in statuses("bulk-assign")][:2] == ["already_assigned", "already_assigned"]
+    db.expire_all()
+    assert sorted(prompt.id for prompt in crud.get_agent(db, "bulk-agent").prompts) == ["bulk-prompt-a", "bulk-prompt-b"]
+
+    assert [status for *_, status in statuses("bulk-unassign")][:3] == ["removed", "removed", "prompt_not_found"]
+    assert [status for *_, status in statuses("bulk-unassign")][:2] == ["not_assigned", "not_assigned"]
+    db.expire_all()
+    assert crud.get_agent(db, "bulk-agent").prompts == []
+
+
+def test_unassigned_prompts_are_filtered_in_sql(db, count_statements):
+    for agent_id in ("unassigned-agent", "unassigned-other"):
+        crud.create_agent(db, schemas.AgentCreate(id=agent_id, name=agent_id))
+    for suffix in ("a", "b", "c", "d"):
+        crud.create_prompt(db, schemas.PromptCreate(id=f"unassigned-{suffix}", title=f"Unassigned 100% {suffix}", content="Body."))
+    crud.create_prompt(db, schemas.PromptCreate(id="unassigned-e", title="Unassigned 100 e", content="Body."))
+    crud.bulk_assign_prompts(db, ["unassigned-agent"], ["unassigned-a", "unassigned-c"])
+    crud.bulk_assign_prompts(db, ["unassigned-other"], ["unassigned-b"])
+
+    with count_statements() as statements:
+        prompts = crud.get_unassigned_prompts_for_agent(db, "unassigned-agent", limit=100, title="unassigned 100%")
+    # Assigned elsewhere still counts as unassigned here; "%" is matched literally
+    assert [prompt.id for prompt in prompts] == ["unassigned-b", "unassigned-d"]
+    assert len(statements) == 2 # the agent check, then one page query
+    assert "NOT (EXISTS" in statements[1]
+
+    first, cursor = crud.get_unassigned_prompts_for_agent(db, "unassigned-agent", limit=1, title="unassigned 100", keyset=True)
+    rest, _ = crud.get_unassigned_prompts_for_agent(
+        db, "unassigned-agent", limit=10, title="unassigned 100", after_id=pagination.decode_cursor(cursor), keyset=True
+    )
+    assert [prompt.id for prompt in first + rest] == ["unassigned-b", "unassigned-d", "unassigned-e"]
+    assert crud.get_unassigned_prompts_for_agent(db, "unassigned-ghost") is None
+
+
+def test_write_responses_match_the_stored_rows(client, auth_headers, db, session_mode):
+    agent_id, prompt_id = f"{session_mode}-returning-agent", f"{session_mode}-returning-prompt"
+    created = client.post("/agents/", json={"id": agent_id, "name": "Returning", "about": "First"}, headers=auth_headers)
+    assert created.json() == {"id": agent_id, "name": "Returning", "about": "First", "photo_url": None, "prompts": []}
+    assert client.post("/agents/", json={"id": agent_id, "name": "Again"}, headers=auth_headers).status_code == 400
+
+    prompt = client.post("/prompts/", json={"id": prompt_id, "title": "Returning", "content": "Body."}, headers=auth_headers)
+    assert prompt.json() == client.get(f"/prompts/{prompt_id}", headers=auth_headers).json()
+    updated_prompt = client.put(f"/prompts/{prompt_id}", json={"content": "New body."}, headers=auth_headers)
+    assert updated_prompt.json()["title"] == "Returning" and updated_prompt.json()["content"] == "New body."
+    assert updated_prompt.json() == client.get(f"/prompts/{prompt_id}", headers=auth_headers).json()
+
+    client.post(f"/agents/{agent_id}/assign-prompt/{prompt_id}", headers=auth_headers)
+    version = db.query(models.Agent.version).filter_by(id=agent_id).scalar()
+    updated = client.put(f"/agents/{agent_id}", json={"about": "Second"}, headers=auth_headers).json()
+    assert (updated["name"], updated["about"]) == ("Returning", "Second")
+    assert [prompt["content"] for prompt in updated["prompts"]] == ["New body."]
+    assert updated == client.get(f"/agents/{agent_id}", headers=auth_headers).json()
+    assert db.query(models.Agent.version).filter_by(id=agent_id).scalar() == version + 1
+    assert client.put("/agents/returning-ghost", json={"about": "x"}, headers=auth_headers).status_code == 404
+
+    deleted = client.delete(f"/prompts/{prompt_id}", headers=auth_headers)
+    assert deleted.json() == updated_prompt.json()
+    assert client.delete(f"/prompts/{prompt_id}", headers=auth_headers).status_code == 404
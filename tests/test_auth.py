@@ -0,0 +1,53 @@
+from passlib.hash import bcrypt
+
+from app import crud, schemas, security
+from app.config import get_settings
+
+
+def test_me_after_write_with_same_token(client, auth_headers, db):
+    # Warms the admin cache, then writes with the same token: the commit
+    # must not leave the cached admin expired and detached.
+    response = client.post(
+        "/prompts/", json={"id": "auth-write", "title": "Write", "content": "body"}, headers=auth_headers
+    )
+    assert response.status_code == 201
+
+    response = client.get("/me", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == "admin"
+
+    # create_admin invalidates the cache by username, which reads every cached admin
+    created = crud.create_admin(db, schemas.AdminCreate(username="second-admin", password="pw"))
+    assert created.username == "second-admin"
+    assert client.get("/me", headers=auth_headers).status_code == 200
+
+
+def test_login_is_rejected_while_the_hash_pool_is_saturated(client):
+    _, slots = security.get_hash_pool()
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        response = client.post("/token", data={"username": "admin", "password": "admin-password"})
+    finally:
+        for _ in range(taken):
+            slots.release()
+    assert taken > 0
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+    assert client.post("/token", data={"username": "admin", "password": "admin-password"}).status_code == 200
+
+
+def test_login_upgrades_a_legacy_hash(client, db, session_mode):
+    username = f"{session_mode}-legacy-admin"
+    admin = crud.create_admin(db, schemas.AdminCreate(username=username, password="legacy-password"))
+    legacy_hash = bcrypt.using(rounds=get_settings().BCRYPT_ROUNDS + 1).hash("legacy-password")
+    crud.update_admin_password_hash(db, admin, legacy_hash)
+
+    response = client.post("/token", data={"username": username, "password": "legacy-password"})
+    assert response.status_code == 200
+    db.expire_all()
+    upgraded = crud.get_admin_by_username(db, username).hashed_password
+    assert upgraded != legacy_hash
+    assert upgraded.startswith(f"$2b${get_settings().BCRYPT_ROUNDS:02d}$")
+    assert security.verify_password("legacy-password", upgraded)
@@ -0,0 +1,77 @@
+from sqlalchemy import text
+
+from app import crud, migrations, schemas
+
+
+def read_bundle(client, auth_headers, agent_id: str):
+    response = client.get(f"/agents/{agent_id}/bundle", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_bundle_follows_prompt_changes(client, auth_headers, db):
+    crud.create_agent(db, schemas.AgentCreate(id="bundle-prompt-agent", name="Bundled"))
+    crud.create_prompt(db, schemas.PromptCreate(id="bundle-prompt", title="Greeting", content="Hello."))
+    crud.bulk_assign_prompts(db, ["bundle-prompt-agent"], ["bundle-prompt"])
+    before = read_bundle(client, auth_headers, "bundle-prompt-agent")
+    assert [prompt["content"] for prompt in before["prompts"]] == ["Hello."]
+
+    crud.update_prompt(db, "bundle-prompt", schemas.PromptUpdate(content="Hello again."))
+    after = read_bundle(client, auth_headers, "bundle-prompt-agent")
+    assert after["version"] == before["version"] + 1
+    assert [prompt["content"] for prompt in after["prompts"]] == ["Hello again."]
+
+    crud.delete_prompt(db, "bundle-prompt")
+    assert read_bundle(client, auth_headers, "bundle-prompt-agent")["prompts"] == []
+
+
+def test_bundle_follows_assignment_changes(client, auth_headers, db):
+    crud.create_agent(db, schemas.AgentCreate(id="bundle-assign-agent", name="Bundled"))
+    for prompt_id in ("bundle-assign-a", "bundle-assign-b"):
+        crud.create_prompt(db, schemas.PromptCreate(id=prompt_id, title=prompt_id, content="Body."))
+    assert read_bundle(client, auth_headers, "bundle-assign-agent")["prompts"] == []
+
+    crud.assign_prompt_to_agent(db, "bundle-assign-agent", "bundle-assign-b")
+    crud.bulk_assign_prompts(db, ["bundle-assign-agent"], ["bundle-assign-a"])
+    bundle = read_bundle(client, auth_headers, "bundle-assign-agent")
+    assert [prompt["id"] for prompt in bundle["prompts"]] == ["bundle-assign-a", "bundle-assign-b"]
+
+    crud.bulk_remove_prompts(db, ["bundle-assign-agent"], ["bundle-assign-b"])
+    bundle = read_bundle(client, auth_headers, "bundle-assign-agent")
+    assert [prompt["id"] for prompt in bundle["prompts"]] == ["bundle-assign-a"]
+
+    crud.delete_agent(db, "bundle-assign-agent")
+    assert client.get("/agents/bundle-assign-agent/bundle", headers=auth_headers).status_code == 404
+
+
+def test_reading_bundles_never_writes(client, auth_headers, db, count_statements):
+    crud.create_agent(db, schemas.AgentCreate(id="bundle-read-agent", name="Read only"))
+    with count_statements() as statements:
+        response = client.post(
+            "/agents/bundles", json={"agents": {"bundle-read-agent": None, "bundle-unknown": None}},
+            headers=auth_headers,
+        )
+    assert response.status_code == 200
+    assert response.json()["missing"] == ["bundle-unknown"]
+    assert all(sql.lstrip().upper().startswith("SELECT") for sql in statements), statements
+
+
+def test_upgrade_builds_bundles_for_existing_agents(client, auth_headers, db, database):
+    crud.create_agent(db, schemas.AgentCreate(id="bundle-legacy-agent", name="Legacy"))
+    with database.begin() as conn:
+        conn.execute(text("DELETE FROM agent_bundles WHERE agent_id = 'bundle-legacy-agent'"))
+    migrations.upgrade(database)
+    assert read_bundle(client, auth_headers, "bundle-legacy-agent")["name"] == "Legacy"
+
+
+def test_upgrade_clears_stale_bundles_of_deleted_agents(client, auth_headers, db, database):
+    crud.create_agent(db, schemas.AgentCreate(id="bundle-stale-agent", name="Stale"))
+    with database.begin() as conn:
+        # Left behind by the old build-on-read scheme: deleted, never rebuilt
+        conn.execute(text("DELETE FROM agents WHERE id = 'bundle-stale-agent'"))
+        conn.execute(text(
+            "UPDATE agent_bundles SET change_count = change_count + 1 WHERE agent_id = 'bundle-stale-agent'"
+        ))
+    migrations.upgrade(database)
+    db.expire_all()
+    assert crud.get_agent_bundles(db, ["bundle-stale-agent"]) == {}
@@ -0,0 +1,45 @@
+import json
+
+from sqlalchemy import event
+
+from app import crud, exporter, schemas
+from app.database import get_engine
+
+
+def test_import_reads_existing_prompts_once(db, count_statements):
+    crud.create_prompt(db, schemas.PromptCreate(id="import-old", title="Old", content="Old body."))
+    batch = [
+        schemas.PromptCreate(id="import-old", title="Old", content="Replaced body."),
+        schemas.PromptCreate(id="import-new", title="New", content="New body."),
+    ]
+    with count_statements() as statements:
+        assert crud.upsert_prompts(db, batch) == (1, 1)
+    reads = [sql for sql in statements if sql.lstrip().startswith("SELECT") and "FROM prompts" in sql]
+    assert len(reads) == 1
+    assert crud.get_prompt(db, "import-old").content == "Replaced body."
+    assert crud.get_prompt(db, "import-old").version == 2
+
+
+def test_export_reads_one_transaction(db):
+    crud.create_agent(db, schemas.AgentCreate(id="export-agent", name="Export"))
+    crud.create_prompt(db, schemas.PromptCreate(id="export-prompt", title="Export", content="Exported body."))
+    crud.bulk_assign_prompts(db, ["export-agent"], ["export-prompt"])
+
+    events = []
+    listeners = {
+        "before_cursor_execute": lambda conn, cursor, statement, *args: events.append("select"),
+        "commit": lambda conn: events.append("end"),
+        "rollback": lambda conn: events.append("end"),
+    }
+    for name, listener in listeners.items():
+        event.listen(get_engine(), name, listener)
+    try:
+        records = [json.loads(line) for line in exporter.iter_catalog_ndjson()]
+    finally:
+        for name, listener in listeners.items():
+            event.remove(get_engine(), name, listener)
+
+    assert events == ["select", "select", "select", "end"]
+    assert {"type": "assignment", "agent_id": "export-agent", "prompt_id": "export-prompt"} in records
+    prompt = next(record for record in records if record.get("id") == "export-prompt")
+    assert (prompt["type"], prompt["content"]) == ("prompt", "Exported body.")
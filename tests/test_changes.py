@@ -0,0 +1,132 @@
+import asyncio
+import datetime
+import threading
+
+from sqlalchemy import create_engine, event
+
+from app import crud, database, migrations, models, schemas
+from app.database import SessionLocal
+from app.routers import changes as changes_router
+
+
+def head(db) -> int:
+    return crud.get_change_head(db)
+
+
+def test_changes_are_returned_in_write_order(db):
+    since = head(db)
+    crud.create_agent(db, schemas.AgentCreate(id="feed-agent", name="Feed"))
+    crud.create_prompt(db, schemas.PromptCreate(id="feed-prompt", title="Feed", content="Body."))
+    crud.bulk_assign_prompts(db, ["feed-agent"], ["feed-prompt"])
+    crud.update_prompt(db, "feed-prompt", schemas.PromptUpdate(title="Feed 2"))
+    crud.delete_agent(db, "feed-agent")
+
+    entries = crud.get_changes(db, since=since)
+    assert [(entry.entity, entry.action, entry.entity_id) for entry in entries] == [
+        ("agent", "created", "feed-agent"),
+        ("prompt", "created", "feed-prompt"),
+        ("assignment", "assigned", "feed-agent"),
+        ("prompt", "updated", "feed-prompt"),
+        ("agent", "deleted", "feed-agent"),
+    ]
+    assert entries[2].related_id == "feed-prompt"
+    assert [entry.seq for entry in entries] == list(range(since + 1, since + 6))
+    # Paging resumes from the last seq seen
+    first, rest = crud.get_changes(db, since=since, limit=2), crud.get_changes(db, since=since + 2)
+    assert [entry.seq for entry in first + rest] == [entry.seq for entry in entries]
+
+
+def test_prune_keeps_the_cursor_valid(db):
+    crud.create_prompt(db, schemas.PromptCreate(id="prune-prompt", title="Prune", content="Body."))
+    crud.update_prompt(db, "prune-prompt", schemas.PromptUpdate(title="Prune 2"))
+    newest = head(db)
+
+    future = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    assert crud.prune_change_log(db, older_than=future) > 0
+    assert db.query(models.ChangeLogEntry).count() == 1
+    # A consumer that saw everything (or all but the newest) carries on
+    assert crud.get_changes(db, since=newest) == []
+    assert [entry.seq for entry in crud.get_changes(db, since=newest - 1)] == [newest]
+    # One further behind has to resynchronize
+    assert crud.get_changes(db, since=newest - 2) is None
+
+    crud.delete_prompt(db, "prune-prompt")
+    assert [entry.seq for entry in crud.get_changes(db, since=newest)] == [newest + 1]
+
+
+def test_long_poll_wakes_on_a_commit(client, auth_headers, db):
+    since = head(db)
+    idle = client.get("/changes/", params={"since": since, "wait": 0.1}, headers=auth_headers)
+    assert idle.json() == {"changes": [], "last_seq": since}
+
+    responses = []
+    poll = threading.Thread(target=lambda: responses.append(
+        client.get("/changes/", params={"since": since, "wait": 10}, headers=auth_headers)
+    ))
+    started = datetime.datetime.now()
+    poll.start()
+    crud.create_agent(db, schemas.AgentCreate(id="poll-agent", name="Poll"))
+    poll.join(timeout=10)
+    assert responses and (datetime.datetime.now() - started).total_seconds() < 5
+    batch = responses[0].json()
+    assert [change["entity_id"] for change in batch["changes"]] == ["poll-agent"]
+    assert batch["last_seq"] == since + 1
+
+
+class ConnectedRequest:
+    async def is_disconnected(self) -> bool:
+        return False
+
+
+async def first_event(since: int) -> bytes:
+    response = await changes_router.stream_changes(ConnectedRequest(), since=since, last_event_id=None, db=SessionLocal())
+    events = response.body_iterator
+    try:
+        return await events.__anext__()
+    finally:
+        await events.aclose()
+
+
+def test_stream_sends_changes_and_reset(db):
+    since = head(db)
+    crud.create_agent(db, schemas.AgentCreate(id="stream-agent", name="Stream"))
+    event_bytes = asyncio.run(first_event(since))
+    assert event_bytes.startswith(b"id: %d\nevent: change\ndata: " % (since + 1))
+    assert b'"entity_id":"stream-agent"' in event_bytes
+
+    future = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(days=1)
+    crud.prune_change_log(db, older_than=future)
+    assert asyncio.run(first_event(since - 1)) == b"event: reset\ndata: {}\n\n"
+
+
+def test_postgres_locks_are_per_entity_type(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'locks.db'}")
+    locks = []
+
+    # Stand-ins for Postgres' advisory lock functions
+    @event.listens_for(engine, "connect")
+    def _add_advisory_locks(dbapi_connection, connection_record):
+        dbapi_connection.create_function(
+            "pg_advisory_xact_lock", 2, lambda namespace, key: locks.append(("exclusive", key))
+        )
+        dbapi_connection.create_function(
+            "pg_advisory_xact_lock_shared", 2, lambda namespace, key: locks.append(("shared", key))
+        )
+
+    migrations.upgrade(engine)
+    engine.dialect.name = "postgresql"
+    session = database.RoutingSession(bind=engine)
+    try:
+        crud._log_changes(session, [("prompt", "updated", "p"), ("agent", "updated", "a"), ("prompt", "deleted", "q")])
+        session.commit()
+        writer_locks = list(locks)
+        locks.clear()
+        crud.get_changes(session, since=0)
+    finally:
+        session.close()
+        engine.dialect.name = "sqlite"
+        engine.dispose()
+
+    agent, prompt = crud.CHANGE_LOG_ENTITIES.index("agent"), crud.CHANGE_LOG_ENTITIES.index("prompt")
+    assert writer_locks == [("exclusive", agent), ("exclusive", prompt)]
+    assert locks == [("shared", key) for key in range(len(crud.CHANGE_LOG_ENTITIES))]
@@ -0,0 +1,26 @@
+from sqlalchemy import create_engine, event
+
+from app import database, invalidation
+
+
+def test_postgres_bus_notifies_on_the_primary(tmp_path):
+    primary = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    notified = []
+
+    # Stand-in for Postgres' pg_notify, available on the primary only
+    @event.listens_for(primary, "connect")
+    def _add_pg_notify(dbapi_connection, connection_record):
+        dbapi_connection.create_function("pg_notify", 2, lambda channel, payload: notified.append(channel))
+
+    bus = invalidation.PostgresBus(primary, "test_channel")
+    session = database.RoutingSession(bind=primary)
+    session.info[database._REPLICA_BIND] = replica
+    try:
+        bus.publish(session, {("profile", None)})
+        session.commit()
+    finally:
+        session.close()
+        primary.dispose()
+        replica.dispose()
+    assert notified == ["test_channel"]
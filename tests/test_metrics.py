@@ -0,0 +1,21 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app import metrics
+
+
+def test_failed_statements_are_counted_and_not_left_behind():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    stats = metrics.RequestStats()
+    token = metrics.current_request_stats.set(stats)
+    try:
+        with engine.connect() as conn:
+            with pytest.raises(exc.OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+            conn.execute(text("SELECT 1"))
+    finally:
+        metrics.current_request_stats.reset(token)
+        engine.dispose()
+    assert stats.queries == 2
+    assert stats.db_time > 0
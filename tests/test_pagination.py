@@ -0,0 +1,27 @@
+import pytest
+
+from app import models, pagination
+
+
+def test_keyset_page_with_zero_limit(db):
+    query = db.query(models.Prompt)
+    assert pagination.keyset_page(query, models.Prompt.id, None, 0) == ([], None)
+
+
+@pytest.mark.parametrize("path", ["/prompts/", "/agents/", "/agents/page-agent/unassigned-prompts"])
+def test_cursor_routes_reject_out_of_range_limits(client, auth_headers, path):
+    client.post("/agents/", json={"id": "page-agent", "name": "Pager"}, headers=auth_headers)
+    for limit in (0, -1, pagination.MAX_PAGE_SIZE + 1):
+        response = client.get(path, params={"cursor": "", "limit": limit}, headers=auth_headers)
+        assert response.status_code == 422
+    response = client.get(path, params={"cursor": "", "limit": 1}, headers=auth_headers)
+    assert response.status_code == 200
+
+
+def test_search_and_revisions_reject_bad_paging(client, auth_headers):
+    client.post("/prompts/", json={"id": "paging-bounds", "title": "Bounds", "content": "Body."}, headers=auth_headers)
+    for path, query in (("/prompts/search", {"q": "body"}), ("/prompts/paging-bounds/revisions", {})):
+        for params in ({"limit": 0}, {"limit": -1}, {"skip": -1}):
+            response = client.get(path, params={**query, **params}, headers=auth_headers)
+            assert response.status_code == 422, (path, params)
+        assert client.get(path, params={**query, "skip": 0, "limit": 1}, headers=auth_headers).status_code == 200
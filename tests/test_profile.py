@@ -0,0 +1,37 @@
+from sqlalchemy import text
+
+from app import cache, invalidation, models
+
+
+def test_profile_update_returns_the_stored_row(client, auth_headers, db, session_mode):
+    version = db.query(models.SukhiProfile.version).filter_by(id=1).scalar() or 0
+    updated = client.put("/sukhi-profile/", json={"about": f"About, {session_mode}"}, headers=auth_headers)
+    assert updated.status_code == 200
+    assert updated.json()["about"] == f"About, {session_mode}"
+    assert updated.json()["name"] # not reset by a partial update
+    assert db.query(models.SukhiProfile.version).filter_by(id=1).scalar() == version + 1
+    assert client.get("/sukhi-profile/", headers=auth_headers).json() == updated.json()
+
+
+def read_about(client, auth_headers) -> str:
+    return client.get("/sukhi-profile/", headers=auth_headers).json()["about"]
+
+
+def test_profile_cache_follows_updates(client, auth_headers, database, count_statements, monkeypatch):
+    client.put("/sukhi-profile/", json={"about": "Cached"}, headers=auth_headers)
+    with count_statements() as statements:
+        assert read_about(client, auth_headers) == "Cached"
+    assert not [sql for sql in statements if "sukhi_profile" in sql] # written through by the PUT
+
+    # Another worker's update reaches this one as an invalidation message
+    with database.begin() as conn:
+        conn.execute(text("UPDATE sukhi_profile SET about = 'Elsewhere', version = version + 1 WHERE id = 1"))
+    assert read_about(client, auth_headers) == "Cached"
+    invalidation.get_bus().deliver(invalidation.encode("other-worker", {("profile", None)}))
+    assert read_about(client, auth_headers) == "Elsewhere"
+
+    # If that message is lost, the version check catches it once the cache is stale
+    with database.begin() as conn:
+        conn.execute(text("UPDATE sukhi_profile SET about = 'Lost', version = version + 1 WHERE id = 1"))
+    monkeypatch.setattr(cache.get_profile_cache(), "max_staleness", 0)
+    assert read_about(client, auth_headers) == "Lost"
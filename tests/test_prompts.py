@@ -0,0 +1,16 @@
+def test_etag_changes_on_every_edit_within_a_second(client, auth_headers):
+    response = client.post(
+        "/prompts/", json={"id": "etag-prompt", "title": "ETag", "content": "First."}, headers=auth_headers
+    )
+    assert response.status_code == 201
+    tags = [client.get("/prompts/etag-prompt", headers=auth_headers).headers["etag"]]
+    for content in ("Second.", "Third."):
+        assert client.put("/prompts/etag-prompt", json={"content": content}, headers=auth_headers).status_code == 200
+        tags.append(client.get("/prompts/etag-prompt", headers=auth_headers).headers["etag"])
+    assert len(set(tags)) == 3
+
+    stale = client.get("/prompts/etag-prompt", headers={**auth_headers, "If-None-Match": tags[1]})
+    assert stale.status_code == 200
+    assert stale.json()["content"] == "Third."
+    current = client.get("/prompts/etag-prompt", headers={**auth_headers, "If-None-Match": tags[2]})
+    assert current.status_code == 304
@@ -0,0 +1,51 @@
+import sqlite3
+
+import pytest
+
+from app import cache, crud, database, schemas
+from app.database import get_engine
+
+
+@pytest.fixture
+def lagging_replica(tmp_path, monkeypatch):
+    """A replica holding a copy of the primary that never catches up."""
+    path = tmp_path / "replica.db"
+    with sqlite3.connect(get_engine().url.database) as primary, sqlite3.connect(path) as replica:
+        primary.backup(replica)
+    replicas = database.ReplicaSet([f"sqlite:///{path}"])
+    monkeypatch.setattr(database, "_replicas", replicas)
+    yield
+    cache.get_recent_writers().clear()
+    for replica in replicas.engines:
+        replica.dispose()
+    for replica in replicas.async_engines or ():
+        replica.sync_engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def other_admin_headers(client):
+    with database.SessionLocal() as db:
+        crud.create_admin(db, schemas.AdminCreate(username="replica-reader", password="reader-password"))
+    response = client.post("/token", data={"username": "replica-reader", "password": "reader-password"})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_reads_after_a_write_go_to_the_primary(client, auth_headers, other_admin_headers, lagging_replica, session_mode):
+    agent_id = f"{session_mode}-sticky-agent"
+    assert client.post("/agents/", json={"id": agent_id, "name": "Sticky"}, headers=auth_headers).status_code == 201
+    # The writer reads its write back, with no cookie to carry
+    client.cookies.clear()
+    assert client.get(f"/agents/{agent_id}", headers=auth_headers).status_code == 200
+
+    # Other admins, and the writer once the window has passed, read the replica
+    assert client.get(f"/agents/{agent_id}", headers=other_admin_headers).status_code == 404
+    cache.get_recent_writers().clear()
+    assert client.get(f"/agents/{agent_id}", headers=auth_headers).status_code == 404
+
+
+def test_pool_status_reports_replica_pools(client, auth_headers, lagging_replica):
+    client.get("/agents/", headers=auth_headers)
+    status = client.get("/system/db-pool", headers=auth_headers).json()
+    assert status["replica0"]["healthy"] is True
+    assert status["replica0"]["pool_class"] == "TimedQueuePool"
+    assert status["replica0"]["idle"] >= 1
@@ -0,0 +1,72 @@
+import pytest
+
+from app import crud, models, revisions, schemas
+from app.config import get_settings
+
+SNAPSHOT_INTERVAL = 3
+
+
+@pytest.fixture
+def short_snapshot_interval(monkeypatch):
+    monkeypatch.setattr(get_settings(), "PROMPT_REVISION_SNAPSHOT_INTERVAL", SNAPSHOT_INTERVAL)
+
+
+def body_ref_count(db, text: str):
+    db.expire_all()
+    body = db.get(models.PromptBody, crud.prompt_bodies.body_hash(text))
+    return None if body is None else body.ref_count
+
+
+def test_delta_round_trip():
+    old = "You are a helpful assistant.\nAnswer briefly and cite sources."
+    new = "You are a terse assistant.\nAnswer briefly, cite sources and  keep spacing."
+    assert revisions.apply_delta(old, revisions.make_delta(old, new)) == new
+    assert revisions.apply_delta(old, revisions.make_delta(old, "")) == ""
+    assert revisions.apply_delta("", revisions.make_delta("", new)) == new
+
+
+def test_every_revision_is_rebuilt_across_snapshots(db, short_snapshot_interval):
+    contents = [f"Step {i}: answer in {i} sentences.\nAlways be polite." for i in range(11)]
+    crud.create_prompt(db, schemas.PromptCreate(id="rev-history", title="v1", content=contents[0]))
+    for i, content in enumerate(contents[1:], start=2):
+        crud.update_prompt(db, "rev-history", schemas.PromptUpdate(title=f"v{i}", content=content))
+
+    stored = {row.revision: row.snapshot_revision for row in crud.get_prompt_revisions(db, "rev-history")}
+    assert sorted(stored) == list(range(1, len(contents) + 1))
+    snapshots = sorted(revision for revision, snapshot in stored.items() if revision == snapshot)
+    assert snapshots == [1, 4, 7, 10]
+
+    for revision, content in enumerate(contents, start=1):
+        rebuilt = crud.get_prompt_revision(db, "rev-history", revision)
+        assert rebuilt["title"] == f"v{revision}"
+        assert rebuilt["content"] == content
+    assert crud.get_prompt_revision(db, "rev-history", len(contents) + 1) is None
+
+
+def test_rollback_records_a_new_revision_and_keeps_refcounts(db, short_snapshot_interval):
+    original, edited = "Original body for rollback.", "Edited body for rollback."
+    crud.create_prompt(db, schemas.PromptCreate(id="rev-rollback", title="Original", content=original))
+    crud.update_prompt(db, "rev-rollback", schemas.PromptUpdate(title="Edited", content=edited))
+    assert body_ref_count(db, original) is None
+    assert body_ref_count(db, edited) == 1
+
+    restored = crud.rollback_prompt(db, "rev-rollback", 1)
+    assert (restored.title, restored.content) == ("Original", original)
+    assert [row.revision for row in crud.get_prompt_revisions(db, "rev-rollback")] == [3, 2, 1]
+    latest = crud.get_prompt_revision(db, "rev-rollback", 3)
+    assert (latest["title"], latest["content"]) == ("Original", original)
+    assert body_ref_count(db, original) == 1
+    assert body_ref_count(db, edited) is None
+
+    assert crud.rollback_prompt(db, "rev-rollback", 99) is None
+    assert body_ref_count(db, original) == 1
+
+
+def test_rollback_route(client, auth_headers):
+    client.post("/prompts/", json={"id": "rev-route", "title": "A", "content": "First."}, headers=auth_headers)
+    client.put("/prompts/rev-route", json={"content": "Second."}, headers=auth_headers)
+    response = client.post("/prompts/rev-route/revisions/1/rollback", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["content"] == "First."
+    assert client.get("/prompts/rev-route/revisions/3", headers=auth_headers).json()["content"] == "First."
+    assert client.post("/prompts/rev-route/revisions/9/rollback", headers=auth_headers).status_code == 404
@@ -0,0 +1,33 @@
+from sqlalchemy import create_engine, inspect, text
+
+from app import crud, migrations, schemas
+from app.database import SessionLocal
+
+
+def test_upgrade_replaces_the_prompts_only_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    migrations.upgrade(engine)
+    # What the first search version left behind
+    with engine.begin() as conn:
+        conn.execute(text("CREATE VIRTUAL TABLE prompts_fts USING fts5(title, content, content='prompts')"))
+        conn.execute(text(
+            "CREATE TRIGGER prompts_fts_insert AFTER INSERT ON prompts BEGIN "
+            "INSERT INTO prompts_fts(rowid, title, content) VALUES (new.rowid, new.title, new.content); END"
+        ))
+    try:
+        migrations.upgrade(engine)
+        inspector = inspect(engine)
+        assert "prompts_fts" not in inspector.get_table_names()
+        assert "prompt_bodies_fts" in inspector.get_table_names()
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'prompts_fts_insert'")).first() is None
+    finally:
+        engine.dispose()
+
+
+def test_search_matches_titles_and_bodies(db):
+    crud.create_prompt(db, schemas.PromptCreate(id="search-title", title="Escalation ladder", content="Steps."))
+    crud.create_prompt(db, schemas.PromptCreate(id="search-body", title="Other", content="When to escalation-check."))
+    with SessionLocal() as fresh:
+        found = {row["id"] for row in crud.search_prompts(fresh, "escalation")}
+    assert {"search-title", "search-body"} <= found
@@ -0,0 +1,43 @@
+import datetime
+
+import pytest
+
+from app import crud, schemas, serialization
+
+UTC = datetime.timezone.utc
+PAYLOADS = [
+    {"id": "p1", "title": "Café ✓ \"quoted\"\n", "rank": 0.1, "count": 3, "about": None, "ok": True},
+    [datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC), datetime.datetime(2024, 1, 2, 3, 4, 5, 600, tzinfo=UTC)],
+    [datetime.datetime(2024, 1, 2, 3, 4, 5), datetime.date(2024, 1, 2)],
+    [datetime.datetime(2024, 7, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=1)))],
+    {"nested": [{"values": [1, 2.5, -0.0, 123456.789]}], "empty": {}},
+]
+
+
+@pytest.fixture
+def stdlib_json(monkeypatch):
+    monkeypatch.setattr(serialization, "orjson", None)
+
+
+@pytest.mark.parametrize("payload", PAYLOADS)
+def test_fallback_matches_orjson(payload, monkeypatch):
+    pytest.importorskip("orjson")
+    fast = serialization.dumps(payload)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert serialization.dumps(payload) == fast
+
+
+def test_utc_datetimes_are_written_like_pydantic(stdlib_json):
+    prompt = schemas.Prompt(
+        id="p", title="t", content="c", created_at=datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC)
+    )
+    assert serialization.dumps(prompt.model_dump()) == prompt.model_dump_json().encode()
+
+
+def test_list_responses_match_across_encoders(db, monkeypatch):
+    pytest.importorskip("orjson")
+    crud.create_prompt(db, schemas.PromptCreate(id="encoded-prompt", title="Encodé", content="Body ✓"))
+    rows = [crud.get_prompt(db, "encoded-prompt")]
+    fast = serialization.encode_rows(rows, schemas.Prompt)
+    monkeypatch.setattr(serialization, "orjson", None)
+    assert serialization.encode_rows(rows, schemas.Prompt) == fast
@@ -0,0 +1,74 @@
+from app import database
+
+# The same route round trips with ASYNC_DATABASE off and on, so the
+# AsyncSession path through async_crud is exercised as well.
+
+
+def test_prompt_round_trip(client, auth_headers, session_mode):
+    prompt_id = f"{session_mode}-prompt"
+    created = client.post(
+        "/prompts/", json={"id": prompt_id, "title": "Mode", "content": "First body."}, headers=auth_headers
+    )
+    assert created.status_code == 201
+    duplicate = client.post(
+        "/prompts/", json={"id": prompt_id, "title": "Mode", "content": "Again."}, headers=auth_headers
+    )
+    assert duplicate.status_code == 400
+
+    response = client.get(f"/prompts/{prompt_id}", headers=auth_headers)
+    assert response.json()["content"] == "First body."
+    cached = client.get(f"/prompts/{prompt_id}", headers={**auth_headers, "If-None-Match": response.headers["etag"]})
+    assert cached.status_code == 304
+
+    updated = client.put(f"/prompts/{prompt_id}", json={"content": "Second body."}, headers=auth_headers)
+    assert updated.json()["content"] == "Second body."
+    listed = client.get("/prompts/", params={"cursor": "", "limit": 1000}, headers=auth_headers)
+    assert {"id": prompt_id, "content": "Second body."}.items() <= next(
+        prompt for prompt in listed.json() if prompt["id"] == prompt_id
+    ).items()
+    found = client.get("/prompts/search", params={"q": "second"}, headers=auth_headers).json()
+    assert prompt_id in [result["id"] for result in found]
+
+    revisions = client.get(f"/prompts/{prompt_id}/revisions", headers=auth_headers).json()
+    assert [revision["revision"] for revision in revisions] == [2, 1]
+    rolled_back = client.post(f"/prompts/{prompt_id}/revisions/1/rollback", headers=auth_headers)
+    assert rolled_back.json()["content"] == "First body."
+
+    assert client.delete(f"/prompts/{prompt_id}", headers=auth_headers).status_code == 200
+    assert client.get(f"/prompts/{prompt_id}", headers=auth_headers).status_code == 404
+    assert (database.get_async_engine() is not None) or session_mode == "sync"
+
+
+def test_agent_round_trip(client, auth_headers, session_mode):
+    agent_id, prompt_ids = f"{session_mode}-agent", [f"{session_mode}-agent-prompt-{i}" for i in range(2)]
+    assert client.post("/agents/", json={"id": agent_id, "name": "Mode"}, headers=auth_headers).status_code == 201
+    for prompt_id in prompt_ids:
+        client.post("/prompts/", json={"id": prompt_id, "title": prompt_id, "content": "Body."}, headers=auth_headers)
+
+    agent = client.post(f"/agents/{agent_id}/assign-prompt/{prompt_ids[0]}", headers=auth_headers).json()
+    assert [prompt["id"] for prompt in agent["prompts"]] == [prompt_ids[0]]
+    unassigned = client.get(f"/agents/{agent_id}/unassigned-prompts", params={"limit": 1000}, headers=auth_headers)
+    assert prompt_ids[1] in [prompt["id"] for prompt in unassigned.json()]
+
+    result = client.post(
+        "/agents/bulk-assign", json={"agent_ids": [agent_id], "prompt_ids": prompt_ids}, headers=auth_headers
+    ).json()
+    assert [outcome["status"] for outcome in result["results"]] == ["already_assigned", "assigned"]
+    bundle = client.get(f"/agents/{agent_id}/bundle", headers=auth_headers).json()
+    assert [prompt["id"] for prompt in bundle["prompts"]] == prompt_ids
+
+    updated = client.put(f"/agents/{agent_id}", json={"about": "Updated"}, headers=auth_headers)
+    assert updated.json()["about"] == "Updated"
+    assert client.delete(f"/agents/{agent_id}", headers=auth_headers).status_code == 200
+    assert client.get(f"/agents/{agent_id}", headers=auth_headers).status_code == 404
+
+
+def test_profile_and_change_feed(client, auth_headers, session_mode):
+    head = client.get("/changes/", headers=auth_headers).json()["last_seq"]
+    about = f"Profile written in {session_mode} mode"
+    assert client.put("/sukhi-profile/", json={"about": about}, headers=auth_headers).json()["about"] == about
+    assert client.get("/sukhi-profile/", headers=auth_headers).json()["about"] == about
+
+    batch = client.get("/changes/", params={"since": head}, headers=auth_headers).json()
+    assert [(change["entity"], change["action"]) for change in batch["changes"]] == [("sukhi_profile", "updated")]
+    assert batch["last_seq"] > head
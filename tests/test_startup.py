@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+PROBE = """
+import app.main
+from app import config, database
+assert config.get_settings.cache_info().currsize == 0, "settings read at import"
+assert database.created_engines() == [], "engine created at import"
+assert not hasattr(app.main, "app"), "app built at import"
+"""
+
+
+def test_importing_the_app_reads_no_settings_and_builds_nothing():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key not in ("DATABASE_URL", "SECRET_KEY")}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=root, env=dict(env, PYTHONPATH=root),
+        capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stderr